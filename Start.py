@@ -1,12 +1,17 @@
+import os
 import streamlit as st
 from streamlit_extras.switch_page_button import switch_page
 
 from src.utils import *
 from src.tennis import Match
+from src.point_log import PointLog
+from src.replay import replay_winners
+from src.journal import MatchJournal, discard_journal, list_journals, read_journal, read_journal_metadata
 
 
 # Application page - 'Start':
 # Generate initial session state variables upon start-up.
+# Offer to recover matches which were being tracked when their session was lost.
 # Include general information about the application as well as contact details for bugs and features.
 
 
@@ -18,8 +23,6 @@ if __name__ == "__main__":
         st.session_state['match'] = Match()
     if 'match_winner' not in st.session_state:
         st.session_state['match_winner'] = Players.NONE.value
-    if 'match_data' not in st.session_state:
-        st.session_state['match_data'] = create_backend_df()
     if 'player1_name' not in st.session_state:
         st.session_state['player1_name'] = st.session_state['match'].player1_name
     if 'player2_name' not in st.session_state:
@@ -29,6 +32,8 @@ if __name__ == "__main__":
     if 'match_metadata' not in st.session_state:
         st.session_state['match_metadata'] = st.session_state['match'].get_initial_inputs()
         st.session_state['match_metadata']['datetime'] = st.session_state['match_datetime'].strftime('%Y-%m-%d %H:%M:%S')
+    if 'match_data' not in st.session_state:
+        st.session_state['match_data'] = PointLog(st.session_state['match_metadata'])
 
     st.set_page_config(
         page_title="Start",
@@ -38,6 +43,63 @@ if __name__ == "__main__":
 
     st.title("Welcome! :wave:")
 
+    # Matches being tracked are journalled, and journals of active sessions are leased, so any listed journal is from a lost or inactive session.
+    recoverable_journals = list_journals()
+    if recoverable_journals:
+        with st.container(key="recover_match"):
+            st.header("Recover a Match")
+            st.write("The following matches were being tracked when their session ended or became inactive. Recover a match to continue tracking it, or discard it.")
+
+            for journal_path in recoverable_journals:
+                # Only the journal header is read to list the match, and the points are only replayed if it is recovered.
+                try:
+                    journal_metadata = read_journal_metadata(journal_path)
+                except (OSError, ValueError):
+                    continue
+
+                match_column, recover_column, discard_column = st.columns([3, 1, 1])
+                match_column.write(
+                    f"{journal_metadata['player1_name']} vs {journal_metadata['player2_name']}"
+                    f" - {journal_metadata['datetime']} (last changed {datetime.fromtimestamp(os.path.getmtime(journal_path)).strftime('%d/%m/%Y %H:%M:%S')})"
+                )
+
+                if recover_column.button("Recover", key=f"recover_{journal_path}"):
+                    # Reopening the journal leases it to this session, so it cannot be recovered or discarded elsewhere.
+                    try:
+                        recovered_journal = MatchJournal.reopen(journal_path)
+                    except (OSError, ValueError):
+                        st.error("This match could not be recovered, as it is being tracked in another session or has been discarded.")
+                        st.stop()
+                    try:
+                        recovered_point_log = read_journal(journal_path)
+                    except ValueError:
+                        recovered_journal.close()
+                        st.error("This match could not be recovered, as its journal is damaged.")
+                        st.stop()
+
+                    # Replay points to rebuild the match state, and continue appending to the same journal.
+                    recovered_metadata = recovered_point_log.metadata
+                    recovered_match, _ = replay_winners(recovered_point_log.column('winner'), recovered_metadata)
+                    recovered_point_log.journal = recovered_journal
+
+                    discard_match_journal(st.session_state)
+                    st.session_state['match_data'] = recovered_point_log
+                    st.session_state['match'] = recovered_match
+                    st.session_state['match_winner'] = recovered_match.match_winner
+                    st.session_state['match_metadata'] = recovered_metadata
+                    st.session_state['match_datetime'] = datetime.strptime(recovered_metadata['datetime'], '%Y-%m-%d %H:%M:%S')
+                    st.session_state['player1_name'] = recovered_metadata['player1_name']
+                    st.session_state['player2_name'] = recovered_metadata['player2_name']
+                    switch_page("Track Match")
+
+                if discard_column.button("Discard", key=f"discard_{journal_path}"):
+                    try:
+                        discard_journal(journal_path)
+                    except ValueError:
+                        st.error("This match could not be discarded, as it is being tracked in another session.")
+                        st.stop()
+                    st.rerun()
+
     # State general information about the application's history, intended usage, and contact details for issues/ideas.
 
     with st.container(key="about"):
@@ -70,7 +132,6 @@ if __name__ == "__main__":
             "\n- Complete logging for application to better diagnose bugs."
             "\n- Prevent the submit point form from resetting if an error is encountered."
             "\n- Show the results of previous sets on the scoreboard."
-            "\n- A back button to undo the latest point."
             "\n- The ability to edit the scores."
             "\n- Additional/Improved statistics & analysis."
             "\n- Ability to display both player's statistics/analysis side-by-side."
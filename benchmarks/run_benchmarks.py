@@ -0,0 +1,190 @@
+import argparse
+from datetime import datetime, timezone
+import io
+import platform
+import time
+
+import numpy as np
+
+from src.bitmap import BitmapIndex
+from src.generator import PlayerProfile, generate_match
+from src.match_io import load_csv, load_match_file, load_parquet, save_parquet
+from src.point_log import OPTIONAL_COLUMNS, POINT_LOG_DTYPES, PointLog
+from src.replay import replay_winners
+from src.stats import MatchStats
+from src.tennis import Match
+from src.utils import Players, Serve, ServeTarget, add_point
+
+
+"""
+This file contains the benchmarks for the scoring engine, the data layer and the analysis, which run without Streamlit.
+Run from the repository root with: python -m benchmarks.run_benchmarks
+
+Each benchmark prints the best time over the repeats and the points processed per second, so results can be compared across commits.
+"""
+
+
+EXAMPLE_PATH = "example/AO_Final-Jannik_Sinner_vs_Alexander_Zverev-20250126_083000.csv"
+
+DEFAULT_SIZES: tuple[int, ...] = (100, 10_000, 1_000_000)
+
+# Point recording goes through the same calls as the Track page, one point at a time, so it is only run up to this many points.
+MAX_RECORDING_POINTS = 100_000
+
+BENCHMARK_CONFIG: dict = {
+    'player1_name': "Player 1",
+    'player2_name': "Player 2",
+    'server': Players.PLAYER_1.value,
+    'match_best_of': 5,
+    'set_num_games': 6,
+    'set_tiebreak_to': 7,
+    'match_tiebreak': True,
+    'match_tiebreak_to': 10,
+    'datetime': '2025-01-01 00:00:00',
+}
+
+
+def synthetic_point_log(num_points: int, seed: int = 0) -> tuple[PointLog, list[np.ndarray]]:
+    """
+    Builds a point log of back to back generated matches.
+
+    :param num_points: total number of points.
+    :param seed: seed for the match generator.
+    :return: point log containing every point, and the winners of the points in each match.
+    """
+    player1, player2 = PlayerProfile(), PlayerProfile(first_serve_win=0.68, ace=0.04)
+
+    seed_sequence = np.random.SeedSequence(seed)
+
+    point_logs = []
+    total = 0
+    while total < num_points:
+        point_log = generate_match(player1, player2, BENCHMARK_CONFIG, seed_sequence.spawn(1)[0])
+        point_logs.append(point_log)
+        total += len(point_log)
+
+    columns = {name: np.concatenate([point_log.column(name) for point_log in point_logs])[:num_points] for name in POINT_LOG_DTYPES}
+    match_winners = [np.asarray(point_log.column('winner')) for point_log in point_logs]
+    match_winners[-1] = match_winners[-1][:len(match_winners[-1]) - (total - num_points)]
+    return PointLog.from_columns(columns, BENCHMARK_CONFIG), match_winners
+
+
+def example_point_log() -> tuple[PointLog, list[np.ndarray]]:
+    point_log = load_match_file(EXAMPLE_PATH)
+    return point_log, [np.asarray(point_log.column('winner'))]
+
+
+def _best_time(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _record_points(point_log: PointLog, num_points: int) -> None:
+    # Records points through src.utils.add_point and Match.add_point, as the Track page does, with a plain dictionary as the session state.
+    columns = {name: point_log.column(name) for name in POINT_LOG_DTYPES}
+    session_state = {
+        'match': Match.from_initial_inputs(point_log.metadata),
+        'match_data': PointLog(point_log.metadata),
+    }
+    for row in range(num_points):
+        if session_state['match'].match_winner != Players.NONE.value:
+            session_state['match'] = Match.from_initial_inputs(point_log.metadata)
+        for name in OPTIONAL_COLUMNS:
+            session_state[name] = int(columns[name][row]) or None
+        session_state['net_approach'] = bool(columns['net_approach'][row])
+        session_state['winner'] = int(columns['winner'][row])
+
+        add_point(session_state)
+        session_state['match'].add_point(session_state['winner'])
+
+
+def _replay_matches(point_log: PointLog, match_winners: list[np.ndarray]) -> None:
+    for winners in match_winners:
+        replay_winners(winners, point_log.metadata)
+
+
+def _csv_round_trip(point_log: PointLog) -> None:
+    # Exports are cached by the point log, so a new log is exported each time.
+    exported_log = PointLog.from_columns({name: point_log.column(name) for name in POINT_LOG_DTYPES}, point_log.metadata)
+    load_csv(io.BytesIO(exported_log.to_csv()))
+
+
+def _csv_export_after_point(point_log: PointLog) -> None:
+    # Appends a copy of the last point and exports again, as the Track page does when downloads are shown during a match.
+    point_log.append(
+        datetime.now(timezone.utc),
+        **{name: point_log.column(name)[-1] for name in POINT_LOG_DTYPES if name != 'point_datetime'},
+    )
+    point_log.to_csv()
+
+
+def _parquet_round_trip(point_log: PointLog) -> None:
+    load_parquet(io.BytesIO(save_parquet(point_log)))
+
+
+def _overview(point_log: PointLog) -> None:
+    MatchStats.from_columns({name: point_log.column(name) for name in POINT_LOG_DTYPES}).overview_table()
+
+
+def _overview_from_df(point_log: PointLog) -> None:
+    MatchStats.from_df(point_log.to_df()).overview_table()
+
+
+def _bitmap_index(point_log: PointLog) -> BitmapIndex:
+    return BitmapIndex.from_columns({name: point_log.column(name) for name in POINT_LOG_DTYPES})
+
+
+def _bitmap_query(index: BitmapIndex) -> None:
+    # Second serve points to the body won by player 1 in the third set.
+    index.count(serve=Serve.SECOND_SERVE.value, serve_target=ServeTarget.BODY.value, winner=Players.PLAYER_1.value, set_id=3)
+
+
+def run_fixture(name: str, point_log: PointLog, match_winners: list[np.ndarray], repeat: int) -> None:
+    num_points = len(point_log)
+    recording_points = min(num_points, MAX_RECORDING_POINTS)
+    bitmap_index = _bitmap_index(point_log)
+    export_log = PointLog.from_columns({name: point_log.column(name) for name in POINT_LOG_DTYPES}, point_log.metadata)
+    export_log.to_csv()
+
+    benchmarks = [
+        ('record points', recording_points, lambda: _record_points(point_log, recording_points)),
+        ('replay', num_points, lambda: _replay_matches(point_log, match_winners)),
+        ('csv round trip', num_points, lambda: _csv_round_trip(point_log)),
+        ('csv export after point', 1, lambda: _csv_export_after_point(export_log)),
+        ('parquet round trip', num_points, lambda: _parquet_round_trip(point_log)),
+        ('overview stats', num_points, lambda: _overview(point_log)),
+        ('overview stats from df', num_points, lambda: _overview_from_df(point_log)),
+        ('bitmap index', num_points, lambda: _bitmap_index(point_log)),
+        ('bitmap query', num_points, lambda: _bitmap_query(bitmap_index)),
+    ]
+
+    for benchmark_name, benchmark_points, func in benchmarks:
+        seconds = _best_time(func, repeat)
+        print(f"{name:>12} {benchmark_name:<24} {benchmark_points:>10} points {seconds:>10.4f} s {benchmark_points / seconds:>14,.0f} points/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the Tennis Tracker benchmarks.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="numbers of synthetic points to benchmark")
+    parser.add_argument('--repeat', type=int, default=3, help="number of times each benchmark is run, keeping the best time")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the synthetic matches")
+    parser.add_argument('--skip-example', action='store_true', help="skip the example match fixture")
+    args = parser.parse_args()
+
+    print(f"Python {platform.python_version()}, numpy {np.__version__}, {platform.machine()}")
+
+    if not args.skip_example:
+        point_log, match_winners = example_point_log()
+        run_fixture('example', point_log, match_winners, args.repeat)
+
+    for size in args.sizes:
+        point_log, match_winners = synthetic_point_log(size, args.seed)
+        run_fixture(f"{size:,}", point_log, match_winners, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ from streamlit_extras.switch_page_button import switch_page
 
 from src.utils import *
 from src.tennis import Match
+from src.point_log import PointLog
 
 
 # Application page - 'New Match':
@@ -97,11 +98,12 @@ if __name__ == "__main__":
                     match_tiebreak=match_tiebreak,
                     match_tiebreak_to=match_tiebreak_to
                 )
+                discard_match_journal(st.session_state)
                 st.session_state['match'] = new_match
                 st.session_state['match_winner'] = Players.NONE.value
                 st.session_state['match_metadata'] = new_match.get_initial_inputs()
                 st.session_state['match_metadata']['datetime'] = st.session_state['match_datetime'].strftime('%Y-%m-%d %H:%M:%S')
-                st.session_state['match_data'] = create_backend_df()
+                st.session_state['match_data'] = PointLog(st.session_state['match_metadata'])
 
     with st.container(key="page_navigation"):
         st.write("###")
@@ -1,14 +1,21 @@
 from datetime import datetime
-import pandas as pd
 import streamlit as st
 from streamlit_extras.switch_page_button import switch_page
 
-from src.tennis import Match
-from src.utils import Players, create_backend_df
+from src.replay import replay_winners
+from src.match_io import load_match_file, stream_match_file
+from src.store import MatchStore
+from src.utils import discard_match_journal
 
 
 # Application page - 'Load Match':
-# Let user load a previously created match data csv file and set appropriate session state variables.
+# Let user load a previously created match data csv, parquet or binary file, or a match saved in the local match library, and set appropriate session state variables.
+
+
+@st.cache_resource
+def get_match_store() -> MatchStore:
+    # The store opens a connection for each operation, so one store is shared by every session and rerun rather than created on each run.
+    return MatchStore()
 
 
 if __name__ == "__main__":
@@ -25,43 +32,30 @@ if __name__ == "__main__":
         st.header("Upload a File")
 
         uploaded_file = st.file_uploader(
-            "Choose a CSV file",
-            type=['csv'],
+            "Choose a CSV, Parquet or binary file",
+            type=['csv', 'parquet', 'ttp'],
             accept_multiple_files=False
         )
         if uploaded_file:
+            # Large files are read a chunk of points at a time, replaying each chunk to rebuild the match state as it is read.
+            load_progress = st.progress(0.0, text="Loading match file...")
             try:
-                loaded_match_data = pd.read_csv(uploaded_file)
+                loaded_point_log, loaded_match = stream_match_file(
+                    uploaded_file,
+                    progress=lambda fraction_loaded: load_progress.progress(fraction_loaded, text="Loading match file..."),
+                )
             except:
+                load_progress.empty()
                 st.error("File is not compatible. Please make sure you are uploading a file generated by this application.")
                 st.stop()
+            load_progress.empty()
 
-            temp_backend_df = create_backend_df()
-            if loaded_match_data.columns.values.shape[0] != temp_backend_df.columns.values.shape[0] \
-                    or loaded_match_data.columns.intersection(temp_backend_df.columns).shape[0] != temp_backend_df.columns.values.shape[0]:
-                st.error("File is not compatible. Please make sure you are uploading a file generated by this application.")
-                st.stop()
-
-            loaded_match_metadata = loaded_match_data['metadata'].apply(eval).iloc[0]
-
-            loaded_match = Match(
-                player1_name=loaded_match_metadata['player1_name'],
-                player2_name=loaded_match_metadata['player2_name'],
-                server=loaded_match_metadata['server'],
-                match_best_of=loaded_match_metadata['match_best_of'],
-                set_num_games=loaded_match_metadata['set_num_games'],
-                set_tiebreak_to=loaded_match_metadata['set_tiebreak_to'],
-                match_tiebreak=loaded_match_metadata['match_tiebreak'],
-                match_tiebreak_to=loaded_match_metadata['match_tiebreak_to']
-            )
-
-            # Add points to new match.
-            for _, row in loaded_match_data.iterrows():
-                loaded_match.add_point(row.winner)
+            loaded_match_metadata = loaded_point_log.metadata
 
-            st.session_state['match_data'] = loaded_match_data
+            discard_match_journal(st.session_state)
+            st.session_state['match_data'] = loaded_point_log
             st.session_state['match'] = loaded_match
-            st.session_state['match_winner'] = example_match.match_winner
+            st.session_state['match_winner'] = loaded_match.match_winner
             st.session_state['match_metadata'] = loaded_match_metadata
             st.session_state['match_datetime'] = datetime.strptime(loaded_match_metadata['datetime'], '%Y-%m-%d %H:%M:%S')
             st.session_state['player1_name'] = loaded_match_metadata['player1_name']
@@ -69,6 +63,45 @@ if __name__ == "__main__":
 
         st.caption("Note that loading a file will overwrite any previous information added in the 'New Match' page.  \nConsider saving the file first.")
 
+    with st.container(key="load_library"):
+        st.header("Load from Library")
+
+        match_store = get_match_store()
+        library_matches = match_store.matches()
+        if library_matches.empty:
+            st.write("No matches have been saved to the library yet. Matches can be saved from the 'Track Match' page.")
+        else:
+            library_match_id = st.selectbox(
+                "Saved Matches",
+                options=library_matches.index,
+                format_func=lambda match_id: (
+                    f"{library_matches.at[match_id, 'player1_name']} vs {library_matches.at[match_id, 'player2_name']}"
+                    f" - {library_matches.at[match_id, 'datetime']} ({library_matches.at[match_id, 'num_points']} points)"
+                ),
+            )
+
+            if st.button("Load Saved Match"):
+                library_point_log = match_store.load_match(library_match_id)
+                library_match_metadata = library_point_log.metadata
+
+                # Replay points to rebuild the match state.
+                library_match, _ = replay_winners(library_point_log.column('winner'), library_match_metadata)
+
+                discard_match_journal(st.session_state)
+                st.session_state['match_data'] = library_point_log
+                st.session_state['match'] = library_match
+                st.session_state['match_winner'] = library_match.match_winner
+                st.session_state['match_metadata'] = library_match_metadata
+                st.session_state['match_datetime'] = datetime.strptime(library_match_metadata['datetime'], '%Y-%m-%d %H:%M:%S')
+                st.session_state['player1_name'] = library_match_metadata['player1_name']
+                st.session_state['player2_name'] = library_match_metadata['player2_name']
+
+            library_player_name = st.selectbox(
+                "Player Summary",
+                options=sorted(set(library_matches['player1_name']) | set(library_matches['player2_name'])),
+            )
+            st.dataframe(match_store.player_summary(library_player_name), use_container_width=True)
+
     with st.container(key="upload_example"):
         st.header("Load Example File")
 
@@ -77,26 +110,14 @@ if __name__ == "__main__":
             "This is meant as a way show the capabilities of the application without having to track a new match.")
 
         if st.button("Load Example File"):
-            example_match_data = pd.read_csv("example/AO_Final-Jannik_Sinner_vs_Alexander_Zverev-20250126_083000.csv")
-
-            example_match_metadata = example_match_data['metadata'].apply(eval).iloc[0]
-
-            example_match = Match(
-                player1_name=example_match_metadata['player1_name'],
-                player2_name=example_match_metadata['player2_name'],
-                server=example_match_metadata['server'],
-                match_best_of=example_match_metadata['match_best_of'],
-                set_num_games=example_match_metadata['set_num_games'],
-                set_tiebreak_to=example_match_metadata['set_tiebreak_to'],
-                match_tiebreak=example_match_metadata['match_tiebreak'],
-                match_tiebreak_to=example_match_metadata['match_tiebreak_to']
-            )
+            example_point_log = load_match_file("example/AO_Final-Jannik_Sinner_vs_Alexander_Zverev-20250126_083000.csv")
+            example_match_metadata = example_point_log.metadata
 
-            # Add points to new match.
-            for _, row in example_match_data.iterrows():
-                example_match.add_point(row.winner)
+            # Replay points to rebuild the match state.
+            example_match, _ = replay_winners(example_point_log.column('winner'), example_match_metadata)
 
-            st.session_state['match_data'] = example_match_data
+            discard_match_journal(st.session_state)
+            st.session_state['match_data'] = example_point_log
             st.session_state['match'] = example_match
             st.session_state['match_winner'] = example_match.match_winner
             st.session_state['match_metadata'] = example_match_metadata
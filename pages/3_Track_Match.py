@@ -5,12 +5,22 @@ from streamlit_extras.switch_page_button import switch_page
 
 from src.utils import *
 from src.tennis import MatchSections
+from src.match_io import export_match
+from src.store import MatchStore
+from src.journal import MatchJournal
+from src.probability import estimate_serve_probability, match_win_probability
 
 
 # Application page - 'Track Match':
 # Display the scoreboard for the current match.
 # Let the user add points to the match using the current point form, which sends data to the backend and updates scoreboard.
-# Let the user save the match data csv file to be used and analysed later.
+# Let the user save the match data csv file to be used and analysed later, or save the match to the local match library.
+
+
+@st.cache_resource
+def get_match_store() -> MatchStore:
+    # The store opens a connection for each operation, so one store is shared by every session and rerun rather than created on each run.
+    return MatchStore()
 
 
 if __name__ == "__main__":
@@ -23,6 +33,16 @@ if __name__ == "__main__":
 
     st.title("Track Current Match :memo:")
 
+    # Journal every change to the match data, so the match can be recovered from the 'Start' page if the session is lost.
+    # A won match no longer needs recovering, so its journal is removed, and a new one is only started if points are undone.
+    # The session's lease on its journal is renewed on every run, so the journal is only offered for recovery once the session is inactive.
+    if st.session_state['match_winner'] != Players.NONE.value:
+        discard_match_journal(st.session_state)
+    elif st.session_state['match_data'].journal is None:
+        st.session_state['match_data'].journal = MatchJournal(st.session_state['match_data'].metadata)
+    else:
+        st.session_state['match_data'].journal.heartbeat()
+
     with st.container(key="scoreboard"):
         st.header("Scoreboard")
 
@@ -40,25 +60,76 @@ if __name__ == "__main__":
         scoreboard_df = scoreboard_df.set_index(scoreboard_df.columns[0])
         scoreboard = st.table(scoreboard_df)
 
+    with st.container(key="win_probability"):
+        st.subheader("Win Probability")
+
+        player_data = st.session_state['match_data'].stats.overview_table()
+        player1_serve, player2_serve = (
+            estimate_serve_probability(player_data[player]['serve_points_won'], player_data[player]['serves'])
+            for player in (Players.PLAYER_1.value, Players.PLAYER_2.value)
+        )
+        player1_probability = match_win_probability(st.session_state['match'], player1_serve, player2_serve)
+
+        probability_left, probability_right = st.columns(2)
+        probability_left.metric(st.session_state['match'].player1_name, f"{player1_probability:.1%}")
+        probability_right.metric(st.session_state['match'].player2_name, f"{1 - player1_probability:.1%}")
+        st.progress(player1_probability)
+
+        st.caption("Chance of each player winning the match from the current score, based on how often each player has won points on their serve so far.")
+
+    with st.container(key="score_corrections"):
+        undo_left, rewind_middle, rewind_right = st.columns(3, vertical_alignment='bottom')
+
+        if undo_left.button("Undo Last Point", disabled=st.session_state['match_data'].empty):
+            undo_point(st.session_state)
+            st.rerun()
+
+        rewind_point = rewind_middle.number_input(
+            "Rewind to Before Point",
+            min_value=1,
+            max_value=st.session_state['match'].point_number,
+            value=st.session_state['match'].point_number,
+            disabled=st.session_state['match_data'].empty,
+        )
+
+        if rewind_right.button("Rewind", disabled=st.session_state['match_data'].empty):
+            rewind_to_point(st.session_state, rewind_point)
+            st.rerun()
+
+        st.caption("Undo the last point, or rewind to before an earlier point, if a point was added incorrectly. Removed points are also removed from the match data.")
+
     with st.container(key="point_form"):
         st.header("Current Point")
 
         left, middle, right = st.columns(3)
 
         if left.button("Ace - Inside (Flat)", disabled=(st.session_state['match_winner'] in (Players.PLAYER_1.value, Players.PLAYER_2.value))):
-            add_ace(st.session_state, ServeTarget.INSIDE.value)
-            st.session_state['match_winner'] = st.session_state['match'].add_point(st.session_state['match'].current_server)
-            st.rerun()
+            # The score is only updated once the point is in the match data, so the two never disagree.
+            try:
+                add_ace(st.session_state, ServeTarget.INSIDE.value)
+            except (ValueError, OSError) as error:
+                st.error(f"The point could not be added: {error}")
+            else:
+                st.session_state['match_winner'] = st.session_state['match'].add_point(st.session_state['match'].current_server)
+                st.rerun()
 
         if middle.button("Ace - Outside (Flat)", disabled=(st.session_state['match_winner'] in (Players.PLAYER_1.value, Players.PLAYER_2.value))):
-            add_ace(st.session_state, ServeTarget.OUTSIDE.value)
-            st.session_state['match_winner'] = st.session_state['match'].add_point(st.session_state['match'].current_server)
-            st.rerun()
+            try:
+                add_ace(st.session_state, ServeTarget.OUTSIDE.value)
+            except (ValueError, OSError) as error:
+                st.error(f"The point could not be added: {error}")
+            else:
+                st.session_state['match_winner'] = st.session_state['match'].add_point(st.session_state['match'].current_server)
+                st.rerun()
 
         if right.button("Double Fault", disabled=(st.session_state['match_winner'] in (Players.PLAYER_1.value, Players.PLAYER_2.value))):
-            add_double_fault(st.session_state)
-            st.session_state['match_winner'] = st.session_state['match'].add_point(other_player(st.session_state['match'].current_server))
-            st.rerun()
+            try:
+                add_double_fault(st.session_state)
+            except (ValueError, OSError) as error:
+                st.error(f"The point could not be added: {error}")
+            else:
+                st.session_state['match_winner'] = st.session_state['match'].add_point(other_player(st.session_state['match'].current_server))
+                st.rerun()
 
         st.caption("Quick-press buttons to mark the point as an ace (on first serve) or double fault, without having to submit the point below.")
 
@@ -203,9 +274,13 @@ if __name__ == "__main__":
                 if st.session_state['winner'] is None:
                     st.warning("No winner was selected so the point was not added. Please try again.")
                 else:
-                    add_point(st.session_state)
-                    st.session_state['match_winner'] = st.session_state['match'].add_point(winner)
-                    st.rerun()
+                    try:
+                        add_point(st.session_state)
+                    except (ValueError, OSError) as error:
+                        st.error(f"The point could not be added: {error}")
+                    else:
+                        st.session_state['match_winner'] = st.session_state['match'].add_point(winner)
+                        st.rerun()
 
     with st.container(key="save_data"):
         st.header("Save Match")
@@ -217,14 +292,46 @@ if __name__ == "__main__":
 
         st.caption("Press enter in above text box to ensure the file name is saved.")
 
-        st.download_button(
-            label="Download Match Data to CSV",
-            data=st.session_state['match_data'].to_csv(index=False).encode("utf-8"),
-            file_name=f"{output_file_name}.csv",
-            mime="text/csv",
-            disabled=st.session_state['match_data'].empty  # Do not allow saving if no data has yet been inputted.
+        # Match files are only serialised when downloads are requested, and each file is built once for each version of the match data.
+        # The downloads are hidden again once points change, so adding points does not rebuild them on every run.
+        match_data = st.session_state['match_data']
+        match_data_version = (match_data.log_id, match_data.version)
+        if st.button("Prepare Downloads", key="prepare_downloads", disabled=match_data.empty):
+            st.session_state['downloads_version'] = match_data_version
+
+        if not match_data.empty and st.session_state.get('downloads_version') == match_data_version:
+            csv_left, parquet_middle, encoded_right = st.columns(3)
+
+            csv_left.download_button(
+                label="Download Match Data to CSV",
+                data=export_match(match_data, 'csv'),
+                file_name=f"{output_file_name}.csv",
+                mime="text/csv",
+            )
+
+            parquet_middle.download_button(
+                label="Download Match Data to Parquet",
+                data=export_match(match_data, 'parquet'),
+                file_name=f"{output_file_name}.parquet",
+                mime="application/vnd.apache.parquet",
+            )
+
+            encoded_right.download_button(
+                label="Download Match Data to Binary",
+                data=export_match(match_data, 'ttp'),
+                file_name=f"{output_file_name}.ttp",
+                mime="application/octet-stream",
+            )
+
+        st.caption(
+            "Parquet files are smaller and faster to load than CSV files, and binary files are smaller still, taking around a tenth of the space of a CSV file for sending between devices. "
+            "All three can be loaded in the 'Load Match' page."
         )
 
+        if st.button("Save Match to Library", disabled=st.session_state['match_data'].empty):
+            get_match_store().save_match(st.session_state['match_data'])
+            st.success("Match saved to the library. Saving again later updates the saved match with any new points.")
+
     with st.container(key="page_navigation"):
         st.write("###")
         st.divider()
@@ -1,15 +1,8 @@
-import pandas as pd
 import streamlit as st
 from streamlit_extras.switch_page_button import switch_page
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MaxNLocator
-import numpy as np
 
 from src.utils import *
-
-
-plt.style.use('dark_background')
-np.seterr(divide='ignore', invalid='ignore')
+from src import analysis, charts
 
 
 # Application page - 'Match Analysis':
@@ -41,19 +34,19 @@ if __name__ == "__main__":
         st.warning("There is no match data to analyse.")
         st.stop()
 
+    point_log = st.session_state['match_data']
+    set_ids = point_log.stats.set_ids
+
     with st.container(key="overview"):
         st.header("Overview")
 
-        overview_match_data = st.session_state['match_data']
-
         overview_set_filter = st.pills(
             "Select All Sets To Show Statistics For",
-            options=st.session_state['match_data'].set_id.unique(),
+            options=set_ids,
             selection_mode="multi",
-            default=st.session_state['match_data'].set_id.unique(),
+            default=set_ids,
             key='overview_set_filter',
         )
-        overview_match_data = overview_match_data[overview_match_data['set_id'].isin(overview_set_filter)]
 
         overview_title_left, overview_title_middle, overview_title_right = st.columns(3)
 
@@ -63,10 +56,7 @@ if __name__ == "__main__":
 
         st.divider()
 
-        player_data = {
-            Players.PLAYER_1.value: add_player_data(Players.PLAYER_1.value, overview_match_data),
-            Players.PLAYER_2.value: add_player_data(Players.PLAYER_2.value, overview_match_data)
-        }
+        player_data = analysis.overview_table(point_log, overview_set_filter)
 
         overview_body_left, overview_body_middle, overview_body_right = st.columns(3)
 
@@ -77,99 +67,111 @@ if __name__ == "__main__":
 
         add_stat(
             "Points Won",
-            str(player_data[Players.PLAYER_1.value]['points_won'].shape[0]),
-            str(player_data[Players.PLAYER_2.value]['points_won'].shape[0])
+            str(player_data[Players.PLAYER_1.value]['points_won']),
+            str(player_data[Players.PLAYER_2.value]['points_won'])
         )
 
         add_stat(
             "Break Points",
-            f"{player_data[Players.PLAYER_1.value]['break_points_won'].shape[0]}/{player_data[Players.PLAYER_1.value]['break_points'].shape[0]}",
-            f"{player_data[Players.PLAYER_2.value]['break_points_won'].shape[0]}/{player_data[Players.PLAYER_2.value]['break_points'].shape[0]}",
+            f"{player_data[Players.PLAYER_1.value]['break_points_won']}/{player_data[Players.PLAYER_1.value]['break_points']}",
+            f"{player_data[Players.PLAYER_2.value]['break_points_won']}/{player_data[Players.PLAYER_2.value]['break_points']}",
         )
 
         add_stat(
             "Set Points",
-            f"{player_data[Players.PLAYER_1.value]['set_points_won'].shape[0]}/{player_data[Players.PLAYER_1.value]['set_points'].shape[0]}",
-            f"{player_data[Players.PLAYER_2.value]['set_points_won'].shape[0]}/{player_data[Players.PLAYER_2.value]['set_points'].shape[0]}",
+            f"{player_data[Players.PLAYER_1.value]['set_points_won']}/{player_data[Players.PLAYER_1.value]['set_points']}",
+            f"{player_data[Players.PLAYER_2.value]['set_points_won']}/{player_data[Players.PLAYER_2.value]['set_points']}",
         )
 
         add_stat(
             "Match Points",
-            f"{player_data[Players.PLAYER_1.value]['match_points_won'].shape[0]}/{player_data[Players.PLAYER_1.value]['match_points'].shape[0]}",
-            f"{player_data[Players.PLAYER_2.value]['match_points_won'].shape[0]}/{player_data[Players.PLAYER_2.value]['match_points'].shape[0]}",
+            f"{player_data[Players.PLAYER_1.value]['match_points_won']}/{player_data[Players.PLAYER_1.value]['match_points']}",
+            f"{player_data[Players.PLAYER_2.value]['match_points_won']}/{player_data[Players.PLAYER_2.value]['match_points']}",
         )
 
         add_stat(
             "Aces",
-            str(player_data[Players.PLAYER_1.value]['aces'].shape[0]),
-            str(player_data[Players.PLAYER_2.value]['aces'].shape[0])
+            str(player_data[Players.PLAYER_1.value]['aces']),
+            str(player_data[Players.PLAYER_2.value]['aces'])
         )
 
         add_stat(
             "Double Faults",
-            str(player_data[Players.PLAYER_1.value]['double_faults'].shape[0]),
-            str(player_data[Players.PLAYER_2.value]['double_faults'].shape[0])
+            str(player_data[Players.PLAYER_1.value]['double_faults']),
+            str(player_data[Players.PLAYER_2.value]['double_faults'])
         )
 
         add_stat(
             "First Serve %",
-            f"{((player_data[Players.PLAYER_1.value]['first_serves'].shape[0] / player_data[Players.PLAYER_1.value]['serves'].shape[0]) * 100):.1f}%" if player_data[Players.PLAYER_1.value]['serves'].shape[0] > 0 else '-',
-            f"{((player_data[Players.PLAYER_2.value]['first_serves'].shape[0] / player_data[Players.PLAYER_2.value]['serves'].shape[0]) * 100):.1f}%" if player_data[Players.PLAYER_2.value]['serves'].shape[0] > 0 else '-'
+            f"{((player_data[Players.PLAYER_1.value]['first_serves'] / player_data[Players.PLAYER_1.value]['serves']) * 100):.1f}%" if player_data[Players.PLAYER_1.value]['serves'] > 0 else '-',
+            f"{((player_data[Players.PLAYER_2.value]['first_serves'] / player_data[Players.PLAYER_2.value]['serves']) * 100):.1f}%" if player_data[Players.PLAYER_2.value]['serves'] > 0 else '-'
         )
 
         add_stat(
             "Serve Win %",
-            f"{((player_data[Players.PLAYER_1.value]['serve_points_won'].shape[0] / player_data[Players.PLAYER_1.value]['serves'].shape[0]) * 100):.1f}%" if player_data[Players.PLAYER_1.value]['first_serves'].shape[0] > 0 else '-',
-            f"{((player_data[Players.PLAYER_2.value]['serve_points_won'].shape[0] / player_data[Players.PLAYER_2.value]['serves'].shape[0]) * 100):.1f}%" if player_data[Players.PLAYER_2.value]['first_serves'].shape[0] > 0 else '-'
+            f"{((player_data[Players.PLAYER_1.value]['serve_points_won'] / player_data[Players.PLAYER_1.value]['serves']) * 100):.1f}%" if player_data[Players.PLAYER_1.value]['first_serves'] > 0 else '-',
+            f"{((player_data[Players.PLAYER_2.value]['serve_points_won'] / player_data[Players.PLAYER_2.value]['serves']) * 100):.1f}%" if player_data[Players.PLAYER_2.value]['first_serves'] > 0 else '-'
         )
 
         add_stat(
             "First Serve Win %",
-            f"{((player_data[Players.PLAYER_1.value]['first_serve_points_won'].shape[0] / player_data[Players.PLAYER_1.value]['first_serves'].shape[0]) * 100):.1f}%" if player_data[Players.PLAYER_1.value]['first_serves'].shape[0] > 0 else '-',
-            f"{((player_data[Players.PLAYER_2.value]['first_serve_points_won'].shape[0] / player_data[Players.PLAYER_2.value]['first_serves'].shape[0]) * 100):.1f}%" if player_data[Players.PLAYER_2.value]['first_serves'].shape[0] > 0 else '-'
+            f"{((player_data[Players.PLAYER_1.value]['first_serve_points_won'] / player_data[Players.PLAYER_1.value]['first_serves']) * 100):.1f}%" if player_data[Players.PLAYER_1.value]['first_serves'] > 0 else '-',
+            f"{((player_data[Players.PLAYER_2.value]['first_serve_points_won'] / player_data[Players.PLAYER_2.value]['first_serves']) * 100):.1f}%" if player_data[Players.PLAYER_2.value]['first_serves'] > 0 else '-'
         )
 
         add_stat(
             "Second Serve Win %",
-            f"{((player_data[Players.PLAYER_1.value]['second_serve_points_won'].shape[0] / player_data[Players.PLAYER_1.value]['second_serves'].shape[0]) * 100):.1f}%" if player_data[Players.PLAYER_1.value]['second_serves'].shape[0] > 0 else '-',
-            f"{((player_data[Players.PLAYER_2.value]['second_serve_points_won'].shape[0] / player_data[Players.PLAYER_2.value]['second_serves'].shape[0]) * 100):.1f}%" if player_data[Players.PLAYER_2.value]['second_serves'].shape[0] > 0 else '-',
+            f"{((player_data[Players.PLAYER_1.value]['second_serve_points_won'] / player_data[Players.PLAYER_1.value]['second_serves']) * 100):.1f}%" if player_data[Players.PLAYER_1.value]['second_serves'] > 0 else '-',
+            f"{((player_data[Players.PLAYER_2.value]['second_serve_points_won'] / player_data[Players.PLAYER_2.value]['second_serves']) * 100):.1f}%" if player_data[Players.PLAYER_2.value]['second_serves'] > 0 else '-',
         )
 
         add_stat(
             "Winners",
-            str(player_data[Players.PLAYER_1.value]['winners'].shape[0]),
-            str(player_data[Players.PLAYER_2.value]['winners'].shape[0])
+            str(player_data[Players.PLAYER_1.value]['winners']),
+            str(player_data[Players.PLAYER_2.value]['winners'])
         )
 
         add_stat(
             "Errors",
-            str(player_data[Players.PLAYER_1.value]['errors'].shape[0]),
-            str(player_data[Players.PLAYER_2.value]['errors'].shape[0])
+            str(player_data[Players.PLAYER_1.value]['errors']),
+            str(player_data[Players.PLAYER_2.value]['errors'])
         )
 
         add_stat(
             "Unforced Errors",
-            str(player_data[Players.PLAYER_1.value]['unforced_errors'].shape[0]),
-            str(player_data[Players.PLAYER_2.value]['unforced_errors'].shape[0])
+            str(player_data[Players.PLAYER_1.value]['unforced_errors']),
+            str(player_data[Players.PLAYER_2.value]['unforced_errors'])
         )
 
         add_stat(
             "Net Approach %",
-            f"{((player_data[Players.PLAYER_1.value]['net_approach_points'].shape[0] / player_data[Players.PLAYER_1.value]['all_points'].shape[0]) * 100):.1f}%" if player_data[Players.PLAYER_1.value]['all_points'].shape[0] > 0 else '-',
-            f"{((player_data[Players.PLAYER_2.value]['net_approach_points'].shape[0] / player_data[Players.PLAYER_2.value]['all_points'].shape[0]) * 100):.1f}%" if player_data[Players.PLAYER_2.value]['all_points'].shape[0] > 0 else '-',
+            f"{((player_data[Players.PLAYER_1.value]['net_approach_points'] / player_data[Players.PLAYER_1.value]['all_points']) * 100):.1f}%" if player_data[Players.PLAYER_1.value]['all_points'] > 0 else '-',
+            f"{((player_data[Players.PLAYER_2.value]['net_approach_points'] / player_data[Players.PLAYER_2.value]['all_points']) * 100):.1f}%" if player_data[Players.PLAYER_2.value]['all_points'] > 0 else '-',
         )
 
         add_stat(
             "Net Approach Win %",
-            f"{((player_data[Players.PLAYER_1.value]['net_approach_points_won'].shape[0] / player_data[Players.PLAYER_1.value]['net_approach_points'].shape[0]) * 100):.1f}%" if player_data[Players.PLAYER_1.value]['net_approach_points'].shape[0] > 0 else '-',
-            f"{((player_data[Players.PLAYER_2.value]['net_approach_points_won'].shape[0] / player_data[Players.PLAYER_2.value]['net_approach_points'].shape[0]) * 100):.1f}%" if player_data[Players.PLAYER_2.value]['net_approach_points'].shape[0] > 0 else '-',
+            f"{((player_data[Players.PLAYER_1.value]['net_approach_points_won'] / player_data[Players.PLAYER_1.value]['net_approach_points']) * 100):.1f}%" if player_data[Players.PLAYER_1.value]['net_approach_points'] > 0 else '-',
+            f"{((player_data[Players.PLAYER_2.value]['net_approach_points_won'] / player_data[Players.PLAYER_2.value]['net_approach_points']) * 100):.1f}%" if player_data[Players.PLAYER_2.value]['net_approach_points'] > 0 else '-',
         )
 
+    with st.container(key="match_flow"):
+        st.header("Match Flow")
+
+        # Win probability and momentum after every point, with the Players enum values of any break, set or match point holders.
+        timeline = analysis.win_probability_timeline(point_log)
+
+        st.vega_lite_chart(
+            timeline.reset_index(),
+            charts.win_probability_timeline(st.session_state['player1_name'], st.session_state['player2_name']),
+            use_container_width=True,
+        )
+
+        st.caption("Win probability is based on how often each player won points on their serve across the whole match. Momentum is an average of recent points won, weighted towards the latest points. Break, set and match points are marked after they were played.")
+
     with st.container(key="analysis"):
         st.header("Analysis")
 
-        analysis_match_data = st.session_state['match_data']
-
         analysis_filter_left, analysis_filter_right = st.columns(2)
 
         player_map = {
@@ -185,47 +187,31 @@ if __name__ == "__main__":
 
         analysis_set_filter = analysis_filter_right.pills(
             "Select All Sets To Show Analysis For",
-            options=st.session_state['match_data'].set_id.unique(),
+            options=set_ids,
             selection_mode="multi",
-            default=st.session_state['match_data'].set_id.unique(),
+            default=set_ids,
             key='analysis_set_filter',
         )
-        analysis_match_data = analysis_match_data[analysis_match_data['set_id'].isin(analysis_set_filter)]
+        analysis_opponent = other_player(analysis_player_filter)
+
+        player_name = player_map[analysis_player_filter]
 
         with st.container(key="serve_analysis"):
             st.subheader("Serve")
 
-            serve_data = analysis_match_data[analysis_match_data['server'] == analysis_player_filter]
+            # Counts of serves by the player, indexed by serve, serve type and serve target.
+            serve_counts = analysis.serve_counts(point_log, analysis_player_filter, analysis_set_filter)
 
             serve_analysis_left, serve_analysis_right = st.columns(2, vertical_alignment='center')
 
             try:
-                serve_pie_fig, serve_pie_ax = plt.subplots()
-
-                serve_pie_data = []
-                serve_pie_labels = []
-                for enum in Serve:
-                    enum_count = serve_data[serve_data['serve'] == enum.value].shape[0]
-                    if enum_count > 0:
-                        serve_pie_data.append(enum_count)
-                        serve_pie_labels.append(format_enum_name(enum.name))
-
-                # pie chart
-                serve_pie_ax.pie(
-                    serve_pie_data,
-                    explode=[0.1 for _ in serve_pie_data],
-                    labels=serve_pie_labels,
-                    autopct='%1.1f%%',
-                    shadow=True,
-                    startangle=90,
-                    colors=plt.cm.Set3.colors,
-                )
-
-                serve_pie_ax.set_title(f"Serve Percentages for {player_map[analysis_player_filter]}")
-
-                serve_analysis_left.pyplot(
-                    serve_pie_fig,
-                    facecolor='#0F1116',
+                serve_analysis_left.image(
+                    charts.serve_pie(
+                        tuple(int(serve_counts[enum.value].sum()) for enum in Serve),
+                        tuple(format_enum_name(enum.name) for enum in Serve),
+                        player_name,
+                    ),
+                    use_container_width=True,
                 )
             except:
                 serve_analysis_left.warning("There is no relevant match data to analyse.")
@@ -240,45 +226,14 @@ if __name__ == "__main__":
                     key='serve_filter',
                 )
 
-                serve_hm_fig, serve_hm_ax = plt.subplots()
-
-                serve_hm_data = [[serve_data[(serve_data['serve'] == serve_filter) & (serve_data['serve_type'] == serve_type.value) & (serve_data['serve_target'] == serve_target.value)].shape[0] for serve_target in ServeTarget] for serve_type in ServeType]
-                serve_targets = [format_enum_name(enum.name) for enum in ServeTarget]
-                serve_types = [format_enum_name(enum.name) for enum in ServeType]
-
-                im = serve_hm_ax.imshow(
-                    serve_hm_data,
-                    cmap='YlGn',
-                )
-
-                serve_hm_ax.set_xticks(
-                    range(len(serve_targets)),
-                    labels=serve_targets,
-                    rotation=45,
-                    ha="right",
-                    rotation_mode="anchor",
-                )
-                serve_hm_ax.set_yticks(
-                    range(len(serve_types)),
-                    labels=serve_types,
-                )
-
-                for i in range(len(serve_types)):
-                    for j in range(len(serve_targets)):
-                        text = serve_hm_ax.text(
-                            j,
-                            i,
-                            serve_hm_data[i][j],
-                            ha="center",
-                            va="center",
-                            color="k",
-                        )
-
-                serve_hm_ax.set_title(f"Serve Types & Targets by Serve for {player_map[analysis_player_filter]}")
-
-                serve_analysis_right.pyplot(
-                    serve_hm_fig,
-                    facecolor='#0F1116',
+                serve_analysis_right.image(
+                    charts.serve_heatmap(
+                        tuple(map(tuple, serve_counts[serve_filter, 1:, 1:].tolist())),
+                        tuple(format_enum_name(enum.name) for enum in ServeType),
+                        tuple(format_enum_name(enum.name) for enum in ServeTarget),
+                        player_name,
+                    ),
+                    use_container_width=True,
                 )
             except:
                 serve_analysis_right.warning("There is no relevant match data to analyse.")
@@ -286,105 +241,37 @@ if __name__ == "__main__":
         with st.container(key="net_analysis"):
             st.subheader("Net")
 
+            # Counts of points indexed by server, net approach, first net approacher and net approach type.
+            net_counts = analysis.net_counts(point_log, analysis_set_filter)
+
             net_analysis_left, net_analysis_right = st.columns(2, vertical_alignment='center')
 
             try:
-                rp_data = [
-                    0,
-                    analysis_match_data[(analysis_match_data['server'] == other_player(analysis_player_filter)) & (analysis_match_data['first_net_approacher'] == analysis_player_filter)].shape[0] * 100 / analysis_match_data[analysis_match_data['server'] == other_player(analysis_player_filter)].shape[0] if analysis_match_data[analysis_match_data['server'] == other_player(analysis_player_filter)].shape[0] > 0 else 0,
-                    analysis_match_data[(analysis_match_data['server'] == analysis_player_filter) & (analysis_match_data['first_net_approacher'] == analysis_player_filter)].shape[0] * 100 / analysis_match_data[analysis_match_data['server'] == analysis_player_filter].shape[0] if analysis_match_data[analysis_match_data['server'] == analysis_player_filter].shape[0] > 0 else 0
-                ]
-
-                rp_bg_data = [0, 1, 1]
-                rp_labels = ["", "Returner", "Server"]
-
-                net_rb_fig = plt.figure()
-
-                net_rb_bg_polar_ax = net_rb_fig.add_axes((1.0, 1.0, 1.0, 1.0), polar=True, frameon=False)
-                net_rb_bg_polar_ax.set_theta_zero_location('N')
-                net_rb_bg_polar_ax.set_theta_direction(-1)
-
-                for i in range(len(rp_data)):
-                    net_rb_bg_polar_ax.barh(
-                        i,
-                        rp_bg_data[i]*2*np.pi,
-                        color='grey',
-                        alpha=0.1,
-                    )
-                net_rb_bg_polar_ax.axis('off')
-
-                net_rb_polar_ax = net_rb_fig.add_axes((1.0, 1.0, 1.0, 1.0), polar=True, frameon=False)
-                net_rb_polar_ax.set_theta_zero_location('N')
-                net_rb_polar_ax.set_theta_direction(-1)
-                net_rb_polar_ax.set_rgrids(
-                    [0, 1, 2],
-                    labels=[""] + [f"{val:.1f}%" for val in rp_data[1:]],
-                    angle=0,
-                    fontsize=12,
-                    fontweight='bold',
-                    color='black',
-                    verticalalignment='center',
-                )
-
-                rb_color_map = plt.cm.Set3.colors[:3][::-1]
-                for i in range(len(rp_data)):
-                    net_rb_polar_ax.barh(
-                        i,
-                        rp_data[i]*2*np.pi/100,
-                        color=rb_color_map[i],
-                        label=rp_labels[i],
-                    )
-
-                net_rb_polar_ax.grid(False)
-                net_rb_polar_ax.tick_params(
-                    axis='both',
-                    left=False,
-                    bottom=False,
-                    labelbottom=False,
-                    labelleft=True,
-                )
-
-                handles, labels = net_rb_polar_ax.get_legend_handles_labels()
-                net_rb_polar_ax.legend(handles[::-1], labels[::-1], loc='upper left')
-                net_rb_polar_ax.set_title(f"Net Approach by Service for {player_map[analysis_player_filter]}")
-
-                net_analysis_left.pyplot(
-                    net_rb_fig,
-                    facecolor='#0F1116',
+                return_points = int(net_counts[analysis_opponent].sum())
+                serve_points = int(net_counts[analysis_player_filter].sum())
+
+                net_analysis_left.image(
+                    charts.net_approach_rings(
+                        int(net_counts[analysis_opponent, :, analysis_player_filter].sum()) * 100 / return_points if return_points > 0 else 0,
+                        int(net_counts[analysis_player_filter, :, analysis_player_filter].sum()) * 100 / serve_points if serve_points > 0 else 0,
+                        player_name,
+                    ),
+                    use_container_width=True,
                 )
             except:
                 net_analysis_left.warning("There is no relevant match data to analyse.")
 
             try:
-                net_server_data = analysis_match_data[analysis_match_data['server'] == analysis_player_filter]
-                net_returner_data = analysis_match_data[analysis_match_data['server'] == other_player(analysis_player_filter)]
-                net_data = {
-                    'Server': [net_server_data[net_server_data.net_approach_type == enum.value].shape[0] for enum in NetApproachType],
-                    'Returner': [net_returner_data[net_returner_data.net_approach_type == enum.value].shape[0] for enum in NetApproachType],
-                }
-
-                net_x_labels = [format_enum_name(enum.name) for enum in NetApproachType]
-
-                net_bar_fig, net_bar_ax = plt.subplots()
-
-                net_x = np.arange(len(net_x_labels))  # the label locations
-                net_width = 0.4  # width of the bars
-                net_multiplier = 0
-
-                for net_attribute, net_measurement in net_data.items():
-                    net_offset = net_width * net_multiplier
-                    net_rects = net_bar_ax.bar(net_x + net_offset, net_measurement, net_width, label=net_attribute)
-                    net_bar_ax.bar_label(net_rects, padding=3)
-                    net_multiplier += 1
-
-                net_bar_ax.set_xticks(net_x + (net_width / 2), net_x_labels)
-                net_bar_ax.yaxis.set_major_locator(MaxNLocator(integer=True))
-                net_bar_ax.legend(loc='upper right')
-                net_bar_ax.set_title(f"Net Approach Counts by Type and Service for {player_map[analysis_player_filter]}")
-
-                net_analysis_right.pyplot(
-                    net_bar_fig,
-                    facecolor='#0F1116',
+                net_type_counts = net_counts.sum(axis=(1, 2))
+
+                net_analysis_right.image(
+                    charts.net_approach_bars(
+                        tuple(net_type_counts[analysis_player_filter, 1:].tolist()),
+                        tuple(net_type_counts[analysis_opponent, 1:].tolist()),
+                        tuple(format_enum_name(enum.name) for enum in NetApproachType),
+                        player_name,
+                    ),
+                    use_container_width=True,
                 )
             except:
                 net_analysis_right.warning("There is no relevant match data to analyse.")
@@ -394,61 +281,32 @@ if __name__ == "__main__":
 
             rally_analysis_left, rally_analysis_right = st.columns(2, vertical_alignment='center')
 
-            rally_length_x_labels = [format_enum_name(enum.name, True) for enum in RallyLength]
-
-            try:
-                rally_length_server_data = analysis_match_data[analysis_match_data.server == analysis_player_filter]
-                rally_length_data = [rally_length_server_data[rally_length_server_data.rally_length == enum.value].shape[0] for enum in RallyLength]
-
-                rally_length_serve_fig, rally_length_serve_ax = plt.subplots()
-
-                rally_length_serve_ax.bar(
-                    rally_length_x_labels,
-                    rally_length_data,
-                    color=plt.cm.Set3.colors,
-                )
+            rally_length_x_labels = tuple(format_enum_name(enum.name, True) for enum in RallyLength)
 
-                rally_length_serve_ax.yaxis.set_major_locator(MaxNLocator(integer=True))
-                rally_length_serve_ax.set_title(f"Count of Rally Lengths When {player_map[analysis_player_filter]} is Serving")
+            # Counts of points indexed by server, winner and rally length.
+            rally_length_counts = analysis.rally_length_counts(point_log, analysis_set_filter)
 
-                rally_analysis_left.pyplot(
-                    rally_length_serve_fig,
-                    facecolor='#0F1116',
+            try:
+                rally_analysis_left.image(
+                    charts.rally_length_serve_bars(
+                        tuple(rally_length_counts[analysis_player_filter, :, 1:].sum(axis=0).tolist()),
+                        rally_length_x_labels,
+                        player_name,
+                    ),
+                    use_container_width=True,
                 )
             except:
                 rally_analysis_left.warning("There is no relevant match data to analyse.")
 
             try:
-                rally_length_all_data = [analysis_match_data[analysis_match_data.rally_length == enum.value].shape[0] for enum in RallyLength]
-                rally_length_all_win_data = [analysis_match_data[(analysis_match_data.winner == analysis_player_filter) & (analysis_match_data.rally_length == enum.value)].shape[0] for enum in RallyLength]
-                rally_length_all_win_labels = [f"{((win_count/all_count)*100):.1f}%" for (win_count, all_count) in zip(rally_length_all_win_data, rally_length_all_data)]
-
-                rally_length_all_fig, rally_length_all_ax = plt.subplots()
-
-                rally_length_all_ax.bar(
-                    rally_length_x_labels,
-                    rally_length_all_data,
-                    color='dimgrey',
-                )
-
-                vbar = rally_length_all_ax.bar(
-                    rally_length_x_labels,
-                    rally_length_all_win_data,
-                    color=plt.cm.Set3.colors,
-                )
-
-                def add_labels(ax: plt.Axes, x: list[str], y: list[int], text_label: list[str]):
-                    for i in range(len(x)):
-                        ax.text(i, y[i]//2, text_label[i], ha='center', color='k')
-
-                add_labels(rally_length_all_ax, rally_length_x_labels, rally_length_all_win_data, rally_length_all_win_labels)
-
-                rally_length_all_ax.yaxis.set_major_locator(MaxNLocator(integer=True))
-                rally_length_all_ax.set_title(f"Points Won by Rally Length for {player_map[analysis_player_filter]}")
-
-                rally_analysis_right.pyplot(
-                    rally_length_all_fig,
-                    facecolor='#0F1116',
+                rally_analysis_right.image(
+                    charts.rally_length_win_bars(
+                        tuple(rally_length_counts[:, :, 1:].sum(axis=(0, 1)).tolist()),
+                        tuple(rally_length_counts[:, analysis_player_filter, 1:].sum(axis=0).tolist()),
+                        rally_length_x_labels,
+                        player_name,
+                    ),
+                    use_container_width=True,
                 )
             except:
                 rally_analysis_right.warning("There is no relevant match data to analyse.")
@@ -458,66 +316,25 @@ if __name__ == "__main__":
 
             fs_analysis_left, fs_analysis_right = st.columns(2, vertical_alignment='center')
 
-            fs_winner_data = analysis_match_data[
-                (analysis_match_data['winner'] == analysis_player_filter)
-                & (analysis_match_data['final_shot'] == FinalShot.WINNER.value)
-            ]
-            fs_error_data = analysis_match_data[
-                (analysis_match_data['winner'] == other_player(analysis_player_filter))
-                & (analysis_match_data['final_shot'] == FinalShot.ERROR.value)
-            ]
-            fs_unforced_error_data = analysis_match_data[
-                (analysis_match_data['winner'] == other_player(analysis_player_filter))
-                & (analysis_match_data['final_shot'] == FinalShot.UNFORCED_ERROR.value)
-            ]
+            # Counts of final shots for each point winner, indexed by final shot hand and final shot type.
+            fs_counts = analysis.final_shot_counts(point_log, analysis_set_filter)
 
             winerr_data_map = {
-                FinalShot.WINNER.value: fs_winner_data,
-                FinalShot.ERROR.value: fs_error_data,
-                FinalShot.UNFORCED_ERROR.value: fs_unforced_error_data,
+                FinalShot.WINNER.value: fs_counts[analysis_player_filter, FinalShot.WINNER.value],
+                FinalShot.ERROR.value: fs_counts[analysis_opponent, FinalShot.ERROR.value],
+                FinalShot.UNFORCED_ERROR.value: fs_counts[analysis_opponent, FinalShot.UNFORCED_ERROR.value],
             }
+            fs_hands = tuple(format_enum_name(enum.name) for enum in FinalShotHand)
 
             try:
-                fs_x_labels = [format_enum_name(enum.name) for enum in FinalShot]
-
-                fs_mbar_data = {
-                    format_enum_name(FinalShotHand.FOREHAND.name): [
-                        fs_winner_data[fs_winner_data['final_shot_hand'] == FinalShotHand.FOREHAND.value].shape[0],
-                        fs_error_data[fs_error_data['final_shot_hand'] == FinalShotHand.FOREHAND.value].shape[0],
-                        fs_unforced_error_data[fs_unforced_error_data['final_shot_hand'] == FinalShotHand.FOREHAND.value].shape[0],
-                    ],
-                    format_enum_name(FinalShotHand.BACKHAND.name): [
-                        fs_winner_data[fs_winner_data['final_shot_hand'] == FinalShotHand.BACKHAND.value].shape[0],
-                        fs_error_data[fs_error_data['final_shot_hand'] == FinalShotHand.BACKHAND.value].shape[0],
-                        fs_unforced_error_data[fs_unforced_error_data['final_shot_hand'] == FinalShotHand.BACKHAND.value].shape[0],
-                    ],
-                    format_enum_name(FinalShotHand.OTHER.name): [
-                        fs_winner_data[fs_winner_data['final_shot_hand'] == FinalShotHand.OTHER.value].shape[0],
-                        fs_error_data[fs_error_data['final_shot_hand'] == FinalShotHand.OTHER.value].shape[0],
-                        fs_unforced_error_data[fs_unforced_error_data['final_shot_hand'] == FinalShotHand.OTHER.value].shape[0],
-                    ],
-                }
-
-                fs_mbar_fig, fs_mbar_ax = plt.subplots()
-
-                fs_x = np.arange(len(fs_x_labels))  # the label locations
-                fs_width = 0.25  # width of the bars
-                fs_multiplier = 0
-
-                for fs_attribute, fs_measurement in fs_mbar_data.items():
-                    fs_offset = fs_width * fs_multiplier
-                    fs_rects = fs_mbar_ax.bar(fs_x + fs_offset, fs_measurement, fs_width, label=fs_attribute)
-                    fs_mbar_ax.bar_label(fs_rects, padding=3)
-                    fs_multiplier += 1
-
-                fs_mbar_ax.set_xticks(fs_x + fs_width, fs_x_labels)
-                fs_mbar_ax.yaxis.set_major_locator(MaxNLocator(integer=True))
-                fs_mbar_ax.legend(loc='upper right')
-                fs_mbar_ax.set_title(f"Counts of Winners & Errors for {player_map[analysis_player_filter]}")
-
-                fs_analysis_left.pyplot(
-                    fs_mbar_fig,
-                    facecolor='#0F1116',
+                fs_analysis_left.image(
+                    charts.final_shot_hand_bars(
+                        tuple(tuple(int(winerr_data_map[enum.value][hand.value].sum()) for enum in FinalShot) for hand in FinalShotHand),
+                        fs_hands,
+                        tuple(format_enum_name(enum.name) for enum in FinalShot),
+                        player_name,
+                    ),
+                    use_container_width=True,
                 )
             except:
                 fs_analysis_left.warning("There is no relevant match data to analyse.")
@@ -531,33 +348,59 @@ if __name__ == "__main__":
                     key='winerr_filter',
                 )
 
-                winerr_data = winerr_data_map[winerr_filter]
-
-                fs_sbar_fig, fs_sbar_ax = plt.subplots()
-
-                shot_types = [format_enum_name(enum.name) for enum in FinalShotType]
-                fs_sbar_data = {
-                    format_enum_name(FinalShotHand.FOREHAND.name): [winerr_data[(winerr_data['final_shot_hand'] == FinalShotHand.FOREHAND.value) & (winerr_data['final_shot_type'] == enum.value)].shape[0] for enum in FinalShotType],
-                    format_enum_name(FinalShotHand.BACKHAND.name): [winerr_data[(winerr_data['final_shot_hand'] == FinalShotHand.BACKHAND.value) & (winerr_data['final_shot_type'] == enum.value)].shape[0] for enum in FinalShotType],
-                    format_enum_name(FinalShotHand.OTHER.name): [winerr_data[(winerr_data['final_shot_hand'] == FinalShotHand.OTHER.value) & (winerr_data['final_shot_type'] == enum.value)].shape[0] for enum in FinalShotType],
-                }
-                base = [0 for shot_type in shot_types]
-
-                for label, vals in fs_sbar_data.items():
-                    p = fs_sbar_ax.bar(shot_types, vals, 0.75, label=label, bottom=base)
-                    base = [sum(i) for i in zip(base, vals)]
-
-                fs_sbar_ax.yaxis.set_major_locator(MaxNLocator(integer=True))
-                fs_sbar_ax.legend(loc="upper right")
-                fs_sbar_ax.set_title(f"Count of Types of Winners & Errors by Shot for {player_map[analysis_player_filter]}")
-
-                fs_analysis_right.pyplot(
-                    fs_sbar_fig,
-                    facecolor='#0F1116',
+                fs_analysis_right.image(
+                    charts.final_shot_type_bars(
+                        tuple(tuple(winerr_data_map[winerr_filter][hand.value, 1:].tolist()) for hand in FinalShotHand),
+                        fs_hands,
+                        tuple(format_enum_name(enum.name) for enum in FinalShotType),
+                        player_name,
+                    ),
+                    use_container_width=True,
                 )
             except:
                 fs_analysis_right.warning("There is no relevant match data to analyse.")
 
+    with st.container(key="point_finder"):
+        st.header("Point Finder")
+
+        point_filter_options = {
+            'set_id': ("Sets", {set_id: f"Set {set_id}" for set_id in set_ids}),
+            'server': ("Server", player_map),
+            'serve': ("Serve", {enum.value: format_enum_name(enum.name) for enum in Serve}),
+            'serve_type': ("Serve Type", {enum.value: format_enum_name(enum.name) for enum in ServeType}),
+            'serve_target': ("Serve Target", {enum.value: format_enum_name(enum.name) for enum in ServeTarget}),
+            'first_net_approacher': ("First Net Approacher", player_map),
+            'rally_length': ("Rally Length", {enum.value: format_enum_name(enum.name, True) for enum in RallyLength}),
+            'final_shot': ("Winner/Error", {enum.value: format_enum_name(enum.name) for enum in FinalShot}),
+            'final_shot_hand': ("Final Shot Hand", {enum.value: format_enum_name(enum.name) for enum in FinalShotHand}),
+            'final_shot_type': ("Final Shot Type", {enum.value: format_enum_name(enum.name) for enum in FinalShotType}),
+        }
+
+        # Filters with no values selected include every point.
+        point_filters = {}
+        point_filter_columns = st.columns(3)
+        for position, (name, (label, option_map)) in enumerate(point_filter_options.items()):
+            selected = point_filter_columns[position % 3].multiselect(
+                label,
+                options=option_map.keys(),
+                format_func=lambda val, option_map=option_map: option_map[val],
+                key=f'point_filter_{name}',
+            )
+            if selected:
+                point_filters[name] = selected
+
+        # Counts of the points matching every filter, indexed by winner.
+        winner_counts = analysis.filtered_winner_counts(point_log, **point_filters)
+        matching_points = int(winner_counts.sum())
+
+        point_finder_left, point_finder_middle, point_finder_right = st.columns(3)
+        point_finder_left.metric("Matching Points", matching_points)
+        for column, player in ((point_finder_middle, Players.PLAYER_1.value), (point_finder_right, Players.PLAYER_2.value)):
+            column.metric(
+                f"Won by {player_map[player]}",
+                f"{winner_counts[player]} ({winner_counts[player] * 100 / matching_points:.1f}%)" if matching_points > 0 else '-',
+            )
+
     with st.container(key="page_navigation"):
         st.write("###")
         st.divider()
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+from src.cache import versioned_cache
+from src.point_log import PointLog
+from src.probability import estimate_serve_probability, win_probability_model
+from src.replay import replay_winners
+from src.utils import Players
+
+
+"""
+This file contains the computations behind the Analyse page, cached by the point log version and the selected filters.
+"""
+
+
+# Number of points the momentum is averaged over.
+MOMENTUM_SPAN = 10
+
+
+@versioned_cache()
+def overview_table(point_log: PointLog, sets: tuple[int, ...]) -> pd.DataFrame:
+    """
+    Returns the overview counts for both players.
+
+    :param point_log: point log for the match.
+    :param sets: ids of the sets to include.
+    :return: DataFrame of counts, indexed by statistic name, with a column for each Players enum value.
+    """
+    return point_log.stats.overview_table(list(sets))
+
+
+@versioned_cache()
+def serve_counts(point_log: PointLog, player: int, sets: tuple[int, ...]) -> np.ndarray:
+    """
+    Returns counts of the serves by a player.
+
+    :param point_log: point log for the match.
+    :param player: Players enum value of the server.
+    :param sets: ids of the sets to include.
+    :return: array of counts indexed by serve, serve type and serve target.
+    """
+    return point_log.stats.counts('serve', list(sets))[player].sum(axis=0)
+
+
+@versioned_cache()
+def net_counts(point_log: PointLog, sets: tuple[int, ...]) -> np.ndarray:
+    """
+    Returns counts of the points by their net approaches.
+
+    :param point_log: point log for the match.
+    :param sets: ids of the sets to include.
+    :return: array of counts indexed by server, net approach, first net approacher and net approach type.
+    """
+    return point_log.stats.counts('net', list(sets)).sum(axis=1)
+
+
+@versioned_cache()
+def rally_length_counts(point_log: PointLog, sets: tuple[int, ...]) -> np.ndarray:
+    """
+    Returns counts of the points by their rally length.
+
+    :param point_log: point log for the match.
+    :param sets: ids of the sets to include.
+    :return: array of counts indexed by server, winner and rally length.
+    """
+    return point_log.stats.counts('rally', list(sets))
+
+
+@versioned_cache()
+def final_shot_counts(point_log: PointLog, sets: tuple[int, ...]) -> np.ndarray:
+    """
+    Returns counts of the final shots of the points.
+
+    :param point_log: point log for the match.
+    :param sets: ids of the sets to include.
+    :return: array of counts indexed by point winner, final shot, final shot hand and final shot type.
+    """
+    return point_log.stats.counts('final_shot', list(sets))
+
+
+@versioned_cache()
+def filtered_winner_counts(point_log: PointLog, **filters) -> np.ndarray:
+    """
+    Returns counts of the points matching a combination of filters, resolved with the bitmap index of the point log.
+
+    :param point_log: point log for the match.
+    :param filters: values to include for each filtered column in BITMAP_COLUMNS, keyed by column name. Columns without a filter include every value.
+    :return: array of counts of the matching points, indexed by winner.
+    """
+    counts = np.zeros(len(Players), dtype=np.int64)
+    for winner, count in point_log.bitmap_index.count_by('winner', **filters).items():
+        counts[winner] = count
+    return counts
+
+
+@versioned_cache()
+def win_probability_timeline(point_log: PointLog) -> pd.DataFrame:
+    """
+    Returns the probability of player 1 winning the match and the momentum after every point.
+    Serve probabilities are estimated from the whole match, and the match is replayed once to give the score before every point,
+    so the probabilities for all points are looked up together.
+
+    :param point_log: point log for the match.
+    :return: DataFrame indexed by point number, starting from 0 for before the first point, with columns for the win probability of player 1,
+        the momentum, from -1 when player 2 has won every recent point to 1 when player 1 has,
+        and the Players enum values for the winner and any break, set or match point holder of the point.
+    """
+    player_data = point_log.stats.overview_table()
+    player1_serve, player2_serve = (
+        estimate_serve_probability(player_data[player]['serve_points_won'], player_data[player]['serves'])
+        for player in (Players.PLAYER_1.value, Players.PLAYER_2.value)
+    )
+
+    match, point_context = replay_winners(point_log.column('winner'), point_log.metadata, scores=True)
+    model = win_probability_model(
+        player1_serve,
+        player2_serve,
+        match.match_best_of,
+        match.set_num_games,
+        match.set_tiebreak_to,
+        match.match_tiebreak,
+        match.match_tiebreak_to,
+    )
+    # Probabilities before each point, followed by the probability after the last point.
+    win_probability = np.append(model.from_scores(point_context), model.match(match))
+
+    # Each point counts as 1 when won by player 1 and -1 when won by player 2, with momentum starting from 0 before the first point.
+    point_values = np.where(point_context['winner'] == Players.PLAYER_1.value, 1.0, -1.0)
+    momentum = pd.Series(np.append(0.0, point_values)).ewm(span=MOMENTUM_SPAN, adjust=False).mean().to_numpy()
+
+    return pd.DataFrame(
+        {
+            'win_probability': win_probability,
+            'momentum': momentum,
+            **{
+                name: np.append(Players.NONE.value, point_context[name])
+                for name in ('winner', 'break_point', 'set_point', 'match_point')
+            },
+        },
+        index=pd.RangeIndex(len(win_probability), name='point'),
+    )
@@ -0,0 +1,91 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.bitmap import BITMAP_COLUMNS, BitmapIndex
+from src.match_io import load_match_file
+from src.point_log import POINT_LOG_DTYPES, PointLog
+from src.replay import replay_winners
+
+
+"""
+This file contains the archive loader, used to load many match files into a single dataset for analysis across matches,
+and the bitmap index used to query the points of the dataset.
+"""
+
+
+def _load_match(path: str) -> tuple[dict[str, np.ndarray], dict, dict]:
+    """
+    Loads and replays a single match file, returning only plain values and arrays so the result can be sent between processes.
+
+    :param path: path to a CSV or Parquet match file.
+    :return: stored column arrays for the points, the match metadata, and a summary of the replayed match.
+    """
+    try:
+        point_log = load_match_file(path)
+        match, _ = replay_winners(point_log.column('winner'), point_log.metadata)
+    except Exception as error:
+        raise ValueError(f"Match file {path} could not be loaded: {error}")
+
+    columns = {name: point_log.column(name).copy() for name in POINT_LOG_DTYPES}
+    summary = {
+        'num_points': len(point_log),
+        'match_winner': match.match_winner,
+        'player1_sets': match.player1_sets,
+        'player2_sets': match.player2_sets,
+    }
+    return columns, point_log.metadata, summary
+
+
+def load_archive(paths: list[str], max_workers: int or None = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Loads and replays many match files concurrently, combining their points into a single dataset.
+    Each match is given a match_id from its position in the given paths.
+
+    :param paths: paths to CSV or Parquet match files.
+    :param max_workers: number of processes to use, defaulting to the number of CPUs. A value of 1 loads the files in the current process.
+    :return: DataFrame of points for all matches in the backend format, with a match_id column in place of the metadata column,
+        and DataFrame with one row of metadata and results per match, indexed by match_id.
+    """
+    paths = [str(path) for path in paths]
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(paths)))
+
+    if max_workers == 1:
+        results = [_load_match(path) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_load_match, paths, chunksize=max(1, len(paths) // (max_workers * 4))))
+
+    columns = {
+        name: np.concatenate([result[0][name] for result in results]) if results else np.zeros(0, dtype=dtype)
+        for name, dtype in POINT_LOG_DTYPES.items()
+    }
+    match_ids = np.repeat(
+        np.arange(len(results), dtype=np.int32),
+        [result[2]['num_points'] for result in results],
+    )
+
+    points = PointLog.from_columns(columns).to_df(include_metadata=False)
+    points.insert(0, 'match_id', match_ids)
+
+    matches = pd.DataFrame(
+        [{'path': path, **metadata, **summary} for path, (_, metadata, summary) in zip(paths, results)],
+        index=pd.RangeIndex(len(results), name='match_id'),
+    )
+    return points, matches
+
+
+def archive_index(points: pd.DataFrame) -> BitmapIndex:
+    """
+    Builds a bitmap index over the points of an archive, so any combination of filters across matches is counted with bitwise operations.
+    The match_id column is indexed as well as BITMAP_COLUMNS, so queries can be limited to some matches,
+    and rows are selected from the points with index.mask(...).
+
+    :param points: DataFrame of points returned by load_archive.
+    :return: bitmap index over the points, in the same order as the rows of the DataFrame.
+    """
+    return BitmapIndex.from_df(points, ('match_id', *BITMAP_COLUMNS))
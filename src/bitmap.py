@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+
+
+"""
+This file contains the bitmap index, used to count and select points matching any combination of filters on low-cardinality columns.
+Each value of each indexed column has a bitset of the points with that value, packed into 64-bit words,
+so a combination of filters is resolved with bitwise ANDs and ORs over the words and counted with popcounts.
+"""
+
+
+BITMAP_COLUMNS: tuple[str, ...] = (
+    'set_id',
+    'server',
+    'winner',
+    'serve',
+    'serve_type',
+    'serve_target',
+    'first_net_approacher',
+    'rally_length',
+    'final_shot',
+    'final_shot_hand',
+    'final_shot_type',
+)
+
+WORD_BITS = 64
+
+
+def _pack(flags: np.ndarray, num_words: int) -> np.ndarray:
+    """
+    Packs boolean flags into 64-bit words, where bit i of word i // 64 holds flag i.
+
+    :param flags: boolean flag for each point.
+    :param num_words: number of words to pack into.
+    :return: array of little-endian uint64 words.
+    """
+    packed = np.zeros(num_words * (WORD_BITS // 8), dtype=np.uint8)
+    packed[:(flags.shape[0] + 7) // 8] = np.packbits(flags, bitorder='little')
+    return packed.view('<u8')
+
+
+class BitmapIndex:
+    """
+    Bitsets of the points with each value of the indexed columns.
+    Filters are given as keyword arguments of column name to a value, or to an iterable of values which are combined with OR.
+    Filters on different columns are combined with AND, so count(serve=2, winner=1, set_id=3) counts the second serve points won by player 1 in set 3.
+    """
+    __slots__ = ('_num_points', '_num_words', '_bitmaps')
+
+    def __init__(self, columns: dict[str, np.ndarray]):
+        """
+        Builds the index from the values of each column.
+
+        :param columns: array of values for each column to index, keyed by column name, which must all be the same length.
+        """
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths {sorted(lengths)}.")
+
+        self._num_points: int = lengths.pop() if lengths else 0
+        self._num_words: int = (self._num_points + WORD_BITS - 1) // WORD_BITS
+        self._bitmaps: dict[str, dict[int, np.ndarray]] = {}
+        for name, values in columns.items():
+            values = np.asarray(values)
+            self._bitmaps[name] = {int(value): _pack(values == value, self._num_words) for value in np.unique(values)}
+
+    @classmethod
+    def from_columns(cls, columns: dict[str, np.ndarray], names: tuple[str, ...] = BITMAP_COLUMNS) -> 'BitmapIndex':
+        """
+        Builds the index for the named columns from a dictionary of column arrays, such as the stored columns of a point log.
+
+        :param columns: array of values for each column, keyed by column name.
+        :param names: names of the columns to index.
+        :return: bitmap index.
+        """
+        return cls({name: columns[name] for name in names})
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame, names: tuple[str, ...] = BITMAP_COLUMNS) -> 'BitmapIndex':
+        """
+        Builds the index for the named columns of a DataFrame in the backend format, such as the points of a loaded archive.
+        Missing values in optional columns are indexed as 0.
+
+        :param df: DataFrame containing the named columns.
+        :param names: names of the columns to index, which may include other low-cardinality columns such as match_id.
+        :return: bitmap index.
+        """
+        return cls({name: df[name].fillna(0).to_numpy(dtype=np.int64) for name in names})
+
+    @property
+    def num_points(self) -> int:
+        return self._num_points
+
+    @property
+    def columns(self) -> tuple[str, ...]:
+        return tuple(self._bitmaps)
+
+    def values(self, name: str) -> tuple[int, ...]:
+        """
+        Returns the values of an indexed column which occur in at least one point.
+
+        :param name: name of an indexed column.
+        :return: values in ascending order.
+        """
+        return tuple(self._column_bitmaps(name))
+
+    def _column_bitmaps(self, name: str) -> dict[int, np.ndarray]:
+        if name not in self._bitmaps:
+            raise ValueError(f"Column {name} is not indexed.")
+        return self._bitmaps[name]
+
+    def _all(self) -> np.ndarray:
+        words = np.full(self._num_words, np.iinfo(np.uint64).max, dtype='<u8')
+        remainder = self._num_points % WORD_BITS
+        if remainder:
+            words[-1] = (1 << remainder) - 1
+        return words
+
+    def _value_bitmap(self, name: str, value) -> np.ndarray:
+        bitmaps = self._column_bitmaps(name)
+        if np.ndim(value) == 0 and not isinstance(value, (set, frozenset)):
+            bitmap = bitmaps.get(int(value))
+            return bitmap if bitmap is not None else np.zeros(self._num_words, dtype='<u8')
+
+        bitmap = np.zeros(self._num_words, dtype='<u8')
+        for single_value in value:
+            if int(single_value) in bitmaps:
+                np.bitwise_or(bitmap, bitmaps[int(single_value)], out=bitmap)
+        return bitmap
+
+    def bitmap(self, **filters) -> np.ndarray:
+        """
+        Returns the bitset of the points matching all of the filters.
+
+        :param filters: value or iterable of values for each filtered column, keyed by column name.
+        :return: array of uint64 words, where bit i of word i // 64 is set if point i matches.
+        """
+        if not filters:
+            return self._all()
+
+        bitmaps = [self._value_bitmap(name, value) for name, value in filters.items()]
+        result = bitmaps[0].copy()
+        for bitmap in bitmaps[1:]:
+            np.bitwise_and(result, bitmap, out=result)
+        return result
+
+    def count(self, **filters) -> int:
+        """
+        Counts the points matching all of the filters.
+
+        :param filters: value or iterable of values for each filtered column, keyed by column name.
+        :return: number of matching points.
+        """
+        return int(np.bitwise_count(self.bitmap(**filters)).sum())
+
+    def count_by(self, name: str, **filters) -> dict[int, int]:
+        """
+        Counts the points matching all of the filters for each value of a column.
+
+        :param name: name of the indexed column to group the counts by.
+        :param filters: value or iterable of values for each filtered column, keyed by column name.
+        :return: number of matching points for each value of the column which occurs in at least one point.
+        """
+        matches = self.bitmap(**filters)
+        return {
+            value: int(np.bitwise_count(np.bitwise_and(matches, bitmap)).sum())
+            for value, bitmap in self._column_bitmaps(name).items()
+        }
+
+    def mask(self, **filters) -> np.ndarray:
+        """
+        Returns a boolean mask of the points matching all of the filters, for selecting rows of the points.
+
+        :param filters: value or iterable of values for each filtered column, keyed by column name.
+        :return: boolean flag for each point.
+        """
+        return np.unpackbits(self.bitmap(**filters).view(np.uint8), count=self._num_points, bitorder='little').view(bool)
+
+    def indices(self, **filters) -> np.ndarray:
+        """
+        Returns the positions of the points matching all of the filters.
+
+        :param filters: value or iterable of values for each filtered column, keyed by column name.
+        :return: array of point positions in ascending order.
+        """
+        return np.flatnonzero(self.mask(**filters))
@@ -0,0 +1,136 @@
+from collections import OrderedDict
+from functools import wraps
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.point_log import PointLog
+
+
+"""
+This file contains the cache used for analysis results, keyed by the point log version so results are reused until the logged points change.
+"""
+
+
+DEFAULT_MAXSIZE = 128
+
+
+class LRUCache:
+    """
+    Bounded mapping which discards the least recently used entry once it is full.
+    """
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        if maxsize < 1:
+            raise ValueError(f"Cache size {maxsize} is invalid.")
+        self._maxsize: int = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+        self._hits: int = 0
+        self._misses: int = 0
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for a key, marking it as the most recently used.
+
+        :param key: hashable cache key.
+        :param default: value returned when the key is not cached.
+        :return: cached value, or the default.
+        """
+        with self._lock:
+            if key not in self._entries:
+                self._misses += 1
+                return default
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value) -> None:
+        """
+        Caches a value, discarding the least recently used entry if the cache is full.
+
+        :param key: hashable cache key.
+        :param value: value to cache.
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+
+
+def _freeze(value):
+    # Filters are often given as lists, so they are converted to tuples to be used in keys.
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _read_only(value):
+    # Cached arrays are shared between reruns, so they are protected from being changed by callers.
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    return value
+
+
+def _copy_out(value):
+    # DataFrames cannot be made read-only, so each caller is given its own copy of a cached DataFrame instead.
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    return value
+
+
+_MISSING = object()
+
+
+def versioned_cache(maxsize: int = DEFAULT_MAXSIZE):
+    """
+    Decorator which caches the results of a function of a point log.
+    Results are keyed by the log id, the log version and the remaining arguments, so a result is reused until the logged points change.
+    Cached arrays are returned read-only, and cached DataFrames are returned as copies, so callers cannot change a cached result.
+
+    :param maxsize: maximum number of results kept for the function.
+    :return: decorator for functions taking a point log as their first argument, with hashable or list remaining arguments.
+    """
+    def decorator(func):
+        cache = LRUCache(maxsize)
+
+        @wraps(func)
+        def wrapper(point_log: PointLog, *args, **kwargs):
+            key = (point_log.log_id, point_log.version, _freeze(args), _freeze(tuple(sorted(kwargs.items()))))
+            result = cache.get(key, _MISSING)
+            if result is _MISSING:
+                result = _read_only(func(point_log, *args, **kwargs))
+                cache.put(key, result)
+            return _copy_out(result)
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
@@ -0,0 +1,437 @@
+from functools import lru_cache
+import io
+import json
+
+import matplotlib
+import matplotlib.colors
+import matplotlib.style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.ticker import MaxNLocator
+import numpy as np
+
+
+"""
+This file contains the charts shown on the Analyse page.
+Each chart is built from plain counts and returned as PNG bytes, so charts can be cached by their inputs.
+The win probability timeline is the exception, and is returned as a Vega-Lite specification for the browser to draw.
+Figures are created without pyplot, so they are never held by its global figure registry, and are cleared as soon as they are rendered.
+"""
+
+
+CHART_STYLE = 'dark_background'
+CHART_FACECOLOR = '#0F1116'
+CHART_DPI = 200
+CHART_CACHE_SIZE = 32
+
+SET3_COLORS = matplotlib.colormaps['Set3'].colors
+SET3_COLORS_HEX = tuple(matplotlib.colors.to_hex(color) for color in SET3_COLORS)
+
+
+def _new_figure() -> Figure:
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    return figure
+
+
+def _render(draw, *args) -> bytes:
+    """
+    Draws a chart onto a new figure and renders it to PNG bytes, clearing the figure afterwards.
+
+    :param draw: function taking the figure and the given arguments, which draws the chart.
+    :param args: arguments for the draw function.
+    :return: PNG image bytes.
+    """
+    with matplotlib.style.context(CHART_STYLE):
+        figure = _new_figure()
+        try:
+            draw(figure, *args)
+            buffer = io.BytesIO()
+            figure.savefig(buffer, format='png', dpi=CHART_DPI, bbox_inches='tight', facecolor=CHART_FACECOLOR)
+        finally:
+            figure.clear()
+    return buffer.getvalue()
+
+
+def _draw_serve_pie(figure: Figure, counts: tuple[int, ...], labels: tuple[str, ...], player_name: str) -> None:
+    ax = figure.subplots()
+
+    pie_data = [count for count in counts if count > 0]
+    pie_labels = [label for count, label in zip(counts, labels) if count > 0]
+
+    ax.pie(
+        pie_data,
+        explode=[0.1 for _ in pie_data],
+        labels=pie_labels,
+        autopct='%1.1f%%',
+        shadow=True,
+        startangle=90,
+        colors=SET3_COLORS,
+    )
+    ax.set_title(f"Serve Percentages for {player_name}")
+
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def serve_pie(counts: tuple[int, ...], labels: tuple[str, ...], player_name: str) -> bytes:
+    """
+    Pie chart of the serves by a player.
+
+    :param counts: count of each serve.
+    :param labels: label for each serve. Serves with no count are left out of the chart.
+    :param player_name: name of the serving player.
+    :return: PNG image bytes.
+    """
+    return _render(_draw_serve_pie, counts, labels, player_name)
+
+
+def _draw_serve_heatmap(figure: Figure, counts: tuple[tuple[int, ...], ...], serve_types: tuple[str, ...], serve_targets: tuple[str, ...], player_name: str) -> None:
+    ax = figure.subplots()
+
+    ax.imshow(
+        counts,
+        cmap='YlGn',
+    )
+
+    ax.set_xticks(
+        range(len(serve_targets)),
+        labels=serve_targets,
+        rotation=45,
+        ha="right",
+        rotation_mode="anchor",
+    )
+    ax.set_yticks(
+        range(len(serve_types)),
+        labels=serve_types,
+    )
+
+    for i in range(len(serve_types)):
+        for j in range(len(serve_targets)):
+            ax.text(
+                j,
+                i,
+                counts[i][j],
+                ha="center",
+                va="center",
+                color="k",
+            )
+
+    ax.set_title(f"Serve Types & Targets by Serve for {player_name}")
+
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def serve_heatmap(counts: tuple[tuple[int, ...], ...], serve_types: tuple[str, ...], serve_targets: tuple[str, ...], player_name: str) -> bytes:
+    """
+    Heatmap of the serve types and targets for one serve by a player.
+
+    :param counts: count for each serve type, then each serve target.
+    :param serve_types: label for each serve type.
+    :param serve_targets: label for each serve target.
+    :param player_name: name of the serving player.
+    :return: PNG image bytes.
+    """
+    return _render(_draw_serve_heatmap, counts, serve_types, serve_targets, player_name)
+
+
+def _draw_net_approach_rings(figure: Figure, return_percentage: float, serve_percentage: float, player_name: str) -> None:
+    rp_data = [0, return_percentage, serve_percentage]
+    rp_bg_data = [0, 1, 1]
+    rp_labels = ["", "Returner", "Server"]
+
+    bg_polar_ax = figure.add_axes((1.0, 1.0, 1.0, 1.0), polar=True, frameon=False)
+    bg_polar_ax.set_theta_zero_location('N')
+    bg_polar_ax.set_theta_direction(-1)
+
+    for i in range(len(rp_data)):
+        bg_polar_ax.barh(
+            i,
+            rp_bg_data[i]*2*np.pi,
+            color='grey',
+            alpha=0.1,
+        )
+    bg_polar_ax.axis('off')
+
+    polar_ax = figure.add_axes((1.0, 1.0, 1.0, 1.0), polar=True, frameon=False)
+    polar_ax.set_theta_zero_location('N')
+    polar_ax.set_theta_direction(-1)
+    polar_ax.set_rgrids(
+        [0, 1, 2],
+        labels=[""] + [f"{val:.1f}%" for val in rp_data[1:]],
+        angle=0,
+        fontsize=12,
+        fontweight='bold',
+        color='black',
+        verticalalignment='center',
+    )
+
+    color_map = SET3_COLORS[:3][::-1]
+    for i in range(len(rp_data)):
+        polar_ax.barh(
+            i,
+            rp_data[i]*2*np.pi/100,
+            color=color_map[i],
+            label=rp_labels[i],
+        )
+
+    polar_ax.grid(False)
+    polar_ax.tick_params(
+        axis='both',
+        left=False,
+        bottom=False,
+        labelbottom=False,
+        labelleft=True,
+    )
+
+    handles, labels = polar_ax.get_legend_handles_labels()
+    polar_ax.legend(handles[::-1], labels[::-1], loc='upper left')
+    polar_ax.set_title(f"Net Approach by Service for {player_name}")
+
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def net_approach_rings(return_percentage: float, serve_percentage: float, player_name: str) -> bytes:
+    """
+    Radial bar chart of how often a player approaches the net first, when returning and when serving.
+
+    :param return_percentage: percentage of return points where the player approached the net first.
+    :param serve_percentage: percentage of serve points where the player approached the net first.
+    :param player_name: name of the player.
+    :return: PNG image bytes.
+    """
+    return _render(_draw_net_approach_rings, return_percentage, serve_percentage, player_name)
+
+
+def _draw_net_approach_bars(figure: Figure, server_counts: tuple[int, ...], returner_counts: tuple[int, ...], labels: tuple[str, ...], player_name: str) -> None:
+    ax = figure.subplots()
+
+    net_data = {
+        'Server': server_counts,
+        'Returner': returner_counts,
+    }
+
+    x = np.arange(len(labels))  # the label locations
+    width = 0.4  # width of the bars
+    multiplier = 0
+
+    for attribute, measurement in net_data.items():
+        offset = width * multiplier
+        rects = ax.bar(x + offset, measurement, width, label=attribute)
+        ax.bar_label(rects, padding=3)
+        multiplier += 1
+
+    ax.set_xticks(x + (width / 2), labels)
+    ax.yaxis.set_major_locator(MaxNLocator(integer=True))
+    ax.legend(loc='upper right')
+    ax.set_title(f"Net Approach Counts by Type and Service for {player_name}")
+
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def net_approach_bars(server_counts: tuple[int, ...], returner_counts: tuple[int, ...], labels: tuple[str, ...], player_name: str) -> bytes:
+    """
+    Grouped bar chart of the net approach types when a player is serving and returning.
+
+    :param server_counts: count of each net approach type when the player is serving.
+    :param returner_counts: count of each net approach type when the player is returning.
+    :param labels: label for each net approach type.
+    :param player_name: name of the player.
+    :return: PNG image bytes.
+    """
+    return _render(_draw_net_approach_bars, server_counts, returner_counts, labels, player_name)
+
+
+def _draw_rally_length_serve_bars(figure: Figure, counts: tuple[int, ...], labels: tuple[str, ...], player_name: str) -> None:
+    ax = figure.subplots()
+
+    ax.bar(
+        labels,
+        counts,
+        color=SET3_COLORS,
+    )
+
+    ax.yaxis.set_major_locator(MaxNLocator(integer=True))
+    ax.set_title(f"Count of Rally Lengths When {player_name} is Serving")
+
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def rally_length_serve_bars(counts: tuple[int, ...], labels: tuple[str, ...], player_name: str) -> bytes:
+    """
+    Bar chart of the rally lengths when a player is serving.
+
+    :param counts: count of each rally length.
+    :param labels: label for each rally length.
+    :param player_name: name of the serving player.
+    :return: PNG image bytes.
+    """
+    return _render(_draw_rally_length_serve_bars, counts, labels, player_name)
+
+
+def _draw_rally_length_win_bars(figure: Figure, all_counts: tuple[int, ...], win_counts: tuple[int, ...], labels: tuple[str, ...], player_name: str) -> None:
+    win_labels = [f"{((win_count/all_count)*100):.1f}%" for (win_count, all_count) in zip(win_counts, all_counts)]
+
+    ax = figure.subplots()
+
+    ax.bar(
+        labels,
+        all_counts,
+        color='dimgrey',
+    )
+    ax.bar(
+        labels,
+        win_counts,
+        color=SET3_COLORS,
+    )
+
+    for i in range(len(labels)):
+        ax.text(i, win_counts[i]//2, win_labels[i], ha='center', color='k')
+
+    ax.yaxis.set_major_locator(MaxNLocator(integer=True))
+    ax.set_title(f"Points Won by Rally Length for {player_name}")
+
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def rally_length_win_bars(all_counts: tuple[int, ...], win_counts: tuple[int, ...], labels: tuple[str, ...], player_name: str) -> bytes:
+    """
+    Bar chart of the points won by a player out of all points, for each rally length.
+
+    :param all_counts: count of all points for each rally length.
+    :param win_counts: count of points won by the player for each rally length.
+    :param labels: label for each rally length.
+    :param player_name: name of the player.
+    :return: PNG image bytes.
+    """
+    return _render(_draw_rally_length_win_bars, all_counts, win_counts, labels, player_name)
+
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def win_probability_timeline(player1_name: str, player2_name: str) -> dict:
+    """
+    Vega-Lite chart of the win probability of player 1 through a match, over bars showing the momentum after each point,
+    with break, set and match points marked.
+    Unlike the other charts, this is drawn by the browser from the timeline data, as rendering a line chart with its axes to PNG costs more than the data behind it.
+
+    :param player1_name: name of player 1.
+    :param player2_name: name of player 2.
+    :return: chart specification for the data from src.analysis.win_probability_timeline, with the point number as a column.
+    """
+    point_axis = {'field': 'point', 'type': 'quantitative', 'title': "Point"}
+    percentage_axis = {'type': 'quantitative', 'scale': {'domain': [0, 1]}, 'axis': {'format': '%'}}
+
+    return {
+        'title': f"Win Probability and Momentum for {player1_name} vs {player2_name}",
+        'resolve': {'scale': {'color': 'independent', 'shape': 'independent'}},
+        'layer': [
+            {
+                # Momentum is drawn as bars from the 50% line, up for player 1 and down for player 2.
+                'transform': [
+                    {'calculate': '0.5 + datum.momentum / 2', 'as': 'momentum_level'},
+                    {'calculate': f"datum.momentum >= 0 ? {json.dumps(player1_name)} : {json.dumps(player2_name)}", 'as': 'momentum_player'},
+                ],
+                'mark': {'type': 'bar', 'opacity': 0.35},
+                'encoding': {
+                    'x': point_axis,
+                    'y': {'field': 'momentum_level', **percentage_axis, 'title': f"{player1_name} Win %"},
+                    'y2': {'datum': 0.5},
+                    'color': {
+                        'field': 'momentum_player',
+                        'type': 'nominal',
+                        'title': "Momentum",
+                        'scale': {'domain': [player1_name, player2_name], 'range': [SET3_COLORS_HEX[0], SET3_COLORS_HEX[3]]},
+                    },
+                },
+            },
+            {
+                'mark': {'type': 'line', 'color': SET3_COLORS_HEX[1]},
+                'encoding': {
+                    'x': point_axis,
+                    'y': {'field': 'win_probability', **percentage_axis},
+                    'tooltip': [
+                        {'field': 'point', 'type': 'quantitative', 'title': "Point"},
+                        {'field': 'win_probability', 'type': 'quantitative', 'format': '.1%', 'title': f"{player1_name} Win %"},
+                    ],
+                },
+            },
+            {
+                # Key points are marked at the win probability after they were played.
+                'transform': [
+                    {
+                        'calculate': "datum.match_point > 0 ? 'Match Point' : datum.set_point > 0 ? 'Set Point' : datum.break_point > 0 ? 'Break Point' : null",
+                        'as': 'key_point',
+                    },
+                    {'filter': 'datum.key_point != null'},
+                ],
+                'mark': {'type': 'point', 'filled': True, 'size': 40},
+                'encoding': {
+                    'x': point_axis,
+                    'y': {'field': 'win_probability', **percentage_axis},
+                    'color': {
+                        'field': 'key_point',
+                        'type': 'nominal',
+                        'title': "Key Point",
+                        'scale': {'domain': ["Break Point", "Set Point", "Match Point"], 'range': list(SET3_COLORS_HEX[4:7])},
+                    },
+                    'tooltip': [
+                        {'field': 'point', 'type': 'quantitative', 'title': "Point"},
+                        {'field': 'key_point', 'type': 'nominal', 'title': "Key Point"},
+                    ],
+                },
+            },
+        ],
+    }
+
+
+def _draw_final_shot_hand_bars(figure: Figure, counts: tuple[tuple[int, ...], ...], hands: tuple[str, ...], final_shots: tuple[str, ...], player_name: str) -> None:
+    ax = figure.subplots()
+
+    x = np.arange(len(final_shots))  # the label locations
+    width = 0.25  # width of the bars
+    multiplier = 0
+
+    for hand, measurement in zip(hands, counts):
+        offset = width * multiplier
+        rects = ax.bar(x + offset, measurement, width, label=hand)
+        ax.bar_label(rects, padding=3)
+        multiplier += 1
+
+    ax.set_xticks(x + width, final_shots)
+    ax.yaxis.set_major_locator(MaxNLocator(integer=True))
+    ax.legend(loc='upper right')
+    ax.set_title(f"Counts of Winners & Errors for {player_name}")
+
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def final_shot_hand_bars(counts: tuple[tuple[int, ...], ...], hands: tuple[str, ...], final_shots: tuple[str, ...], player_name: str) -> bytes:
+    """
+    Grouped bar chart of the winners and errors for a player by final shot hand.
+
+    :param counts: count for each final shot hand, then each final shot.
+    :param hands: label for each final shot hand.
+    :param final_shots: label for each final shot.
+    :param player_name: name of the player.
+    :return: PNG image bytes.
+    """
+    return _render(_draw_final_shot_hand_bars, counts, hands, final_shots, player_name)
+
+
+def _draw_final_shot_type_bars(figure: Figure, counts: tuple[tuple[int, ...], ...], hands: tuple[str, ...], shot_types: tuple[str, ...], player_name: str) -> None:
+    ax = figure.subplots()
+
+    base = [0 for _ in shot_types]
+    for hand, values in zip(hands, counts):
+        ax.bar(shot_types, values, 0.75, label=hand, bottom=base)
+        base = [sum(i) for i in zip(base, values)]
+
+    ax.yaxis.set_major_locator(MaxNLocator(integer=True))
+    ax.legend(loc="upper right")
+    ax.set_title(f"Count of Types of Winners & Errors by Shot for {player_name}")
+
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def final_shot_type_bars(counts: tuple[tuple[int, ...], ...], hands: tuple[str, ...], shot_types: tuple[str, ...], player_name: str) -> bytes:
+    """
+    Stacked bar chart of the final shot types for a player's winners or errors, stacked by final shot hand.
+
+    :param counts: count for each final shot hand, then each final shot type.
+    :param hands: label for each final shot hand.
+    :param shot_types: label for each final shot type.
+    :param player_name: name of the player.
+    :return: PNG image bytes.
+    """
+    return _render(_draw_final_shot_type_bars, counts, hands, shot_types, player_name)
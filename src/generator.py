@@ -0,0 +1,319 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import os
+
+import numpy as np
+
+from src.point_log import POINT_LOG_DTYPES, PointLog
+from src.tennis import Match
+from src.utils import (
+    Players, Serve, ServeType, ServeTarget, NetApproachType, RallyLength, FinalShot, FinalShotHand, FinalShotType
+)
+
+
+"""
+This file contains the synthetic match generator, used to create realistic match data for load and scale testing.
+Points are scored by the Match replay engine, so generated matches follow the same rules as tracked matches.
+"""
+
+
+DEFAULT_CONFIG: dict = {
+    'player1_name': "Player 1",
+    'player2_name': "Player 2",
+    'server': Players.PLAYER_1.value,
+    'match_best_of': 3,
+    'set_num_games': 6,
+    'set_tiebreak_to': 7,
+    'match_tiebreak': False,
+    'match_tiebreak_to': 10,
+    'datetime': '2025-01-01 12:00:00',
+}
+
+# Number of points drawn at a time for a match, with more drawn if the match has not finished.
+POINTS_PER_DRAW = 128
+
+MEAN_POINT_SECONDS = 45.0
+
+
+class PlayerProfile:
+    """
+    Probabilities describing how a player plays their points, used to generate their matches.
+
+    Aces and double faults are drawn first for each serve point. The remaining serve points are won by the server with the first or second serve win probability.
+    The distributions are given in the order of their enums, and are normalised to sum to 1.
+    """
+    __slots__ = (
+        '_first_serve_in',
+        '_ace',
+        '_double_fault',
+        '_first_serve_win',
+        '_second_serve_win',
+        '_net_approach',
+        '_rally_length',
+        '_final_shot',
+    )
+
+    def __init__(
+            self,
+            first_serve_in: float = 0.62,
+            ace: float = 0.06,
+            double_fault: float = 0.08,
+            first_serve_win: float = 0.72,
+            second_serve_win: float = 0.52,
+            net_approach: float = 0.12,
+            rally_length: tuple[float, ...] = (0.35, 0.35, 0.2, 0.1),
+            final_shot: tuple[float, ...] = (0.35, 0.45, 0.2),
+    ):
+        for name, probability in (
+            ('first_serve_in', first_serve_in),
+            ('ace', ace),
+            ('double_fault', double_fault),
+            ('first_serve_win', first_serve_win),
+            ('second_serve_win', second_serve_win),
+            ('net_approach', net_approach),
+        ):
+            if not 0 <= probability <= 1:
+                raise ValueError(f"Probability {name} of {probability} is invalid.")
+        if ace > first_serve_in:
+            raise ValueError(f"Ace probability {ace} is greater than the first serve in probability {first_serve_in}.")
+
+        self._first_serve_in: float = first_serve_in
+        self._ace: float = ace
+        self._double_fault: float = double_fault
+        self._first_serve_win: float = first_serve_win
+        self._second_serve_win: float = second_serve_win
+        self._net_approach: float = net_approach
+        self._rally_length: np.ndarray = _distribution('rally_length', rally_length, len(RallyLength))
+        self._final_shot: np.ndarray = _distribution('final_shot', final_shot, len(FinalShot))
+
+    @property
+    def first_serve_in(self) -> float:
+        return self._first_serve_in
+
+    @property
+    def ace(self) -> float:
+        return self._ace
+
+    @property
+    def double_fault(self) -> float:
+        return self._double_fault
+
+    @property
+    def first_serve_win(self) -> float:
+        return self._first_serve_win
+
+    @property
+    def second_serve_win(self) -> float:
+        return self._second_serve_win
+
+    @property
+    def net_approach(self) -> float:
+        return self._net_approach
+
+    @property
+    def rally_length(self) -> np.ndarray:
+        return self._rally_length
+
+    @property
+    def final_shot(self) -> np.ndarray:
+        return self._final_shot
+
+
+def _distribution(name: str, probabilities: tuple[float, ...], num_values: int) -> np.ndarray:
+    distribution = np.asarray(probabilities, dtype=np.float64)
+    if distribution.shape != (num_values,) or (distribution < 0).any() or distribution.sum() <= 0:
+        raise ValueError(f"Distribution {name} must have {num_values} non-negative values.")
+    distribution = distribution / distribution.sum()
+    distribution.flags.writeable = False
+    return distribution
+
+
+def _draw(rng: np.random.Generator, distributions: np.ndarray) -> np.ndarray:
+    """
+    Draws one enum value for each row of a distribution array.
+
+    :param rng: random number generator.
+    :param distributions: array of probabilities for each draw, with one column for each enum value.
+    :return: array of enum values, starting at 1.
+    """
+    cumulative = distributions.cumsum(axis=1)
+    cumulative[:, -1] = 1.0
+    return (rng.random((distributions.shape[0], 1)) >= cumulative).sum(axis=1).astype(np.int8) + 1
+
+
+def _draw_serves(rng: np.random.Generator, profiles: tuple[PlayerProfile, PlayerProfile], num_points: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Draws the serve and winner of each point, for each player serving it.
+
+    :return: arrays of serve values and of winner values, each of shape (points, 2) with a column for each server.
+    """
+    serves = np.empty((num_points, 2), dtype=np.int8)
+    winners = np.empty((num_points, 2), dtype=np.int8)
+    serve_draws = rng.random((num_points, 2))
+    fault_draws = rng.random((num_points, 2))
+    win_draws = rng.random((num_points, 2))
+
+    for column, (server, profile) in enumerate(zip((Players.PLAYER_1.value, Players.PLAYER_2.value), profiles)):
+        ace = serve_draws[:, column] < profile.ace
+        first_serve = ~ace & (serve_draws[:, column] < profile.first_serve_in)
+        second_serve = ~ace & ~first_serve
+        double_fault = second_serve & (fault_draws[:, column] < profile.double_fault)
+        second_serve &= ~double_fault
+
+        serves[:, column] = np.select(
+            [ace, first_serve, second_serve],
+            [Serve.ACE.value, Serve.FIRST_SERVE.value, Serve.SECOND_SERVE.value],
+            Serve.DOUBLE_FAULT.value,
+        )
+        server_wins = ace | (first_serve & (win_draws[:, column] < profile.first_serve_win)) \
+            | (second_serve & (win_draws[:, column] < profile.second_serve_win))
+        winners[:, column] = np.where(server_wins, server, 3 - server)
+
+    return serves, winners
+
+
+def generate_match(
+        player1: PlayerProfile,
+        player2: PlayerProfile,
+        config: dict or None = None,
+        seed: int or np.random.SeedSequence or None = None,
+) -> PointLog:
+    """
+    Generates a full match from the profiles of the two players.
+
+    :param player1: profile of player 1.
+    :param player2: profile of player 2.
+    :param config: match initial inputs, as given by Match.get_initial_inputs, defaulting to DEFAULT_CONFIG.
+        The datetime key, in the metadata format, sets when the match starts.
+    :param seed: seed for the random number generator, so the same seed always generates the same match.
+    :return: point log for the match, with the match metadata.
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    rng = np.random.default_rng(seed)
+    profiles = (player1, player2)
+
+    match = Match.from_initial_inputs(config)
+    contexts = []
+    serve_draws = []
+    while match.match_winner == Players.NONE.value:
+        serves, winners = _draw_serves(rng, profiles, POINTS_PER_DRAW)
+        points_before = match.point_number
+        context = match._replay(winners)
+
+        # Points after the match has been won are not played, so their draws are dropped.
+        num_points = match.point_number - points_before
+        contexts.append({name: values[:num_points] for name, values in context.items()})
+        serve_draws.append(serves[:num_points])
+
+    columns = {name: np.concatenate([context[name] for context in contexts]) for name in contexts[0]}
+    server_index = columns['server'].astype(np.intp) - 1
+    serve = np.concatenate(serve_draws)[np.arange(server_index.shape[0]), server_index]
+    columns.update(_draw_point_details(rng, profiles, columns['server'], columns['winner'], serve))
+
+    start = np.datetime64(datetime.strptime(config['datetime'], '%Y-%m-%d %H:%M:%S'), 'ns').astype(np.int64)
+    point_seconds = rng.exponential(MEAN_POINT_SECONDS, size=serve.shape[0])
+    columns['point_datetime'] = start + (np.cumsum(point_seconds) * 1e9).astype(np.int64)
+
+    return PointLog.from_columns(columns, config)
+
+
+def _draw_point_details(
+        rng: np.random.Generator,
+        profiles: tuple[PlayerProfile, PlayerProfile],
+        server: np.ndarray,
+        winner: np.ndarray,
+        serve: np.ndarray,
+) -> dict[str, np.ndarray]:
+    """
+    Draws the details of each point once its server, winner and serve are known, in the same way as points are recorded on the Track page.
+    Aces and double faults are recorded with the same values as the quick ace and double fault buttons.
+
+    :return: array of values for each remaining stored column, keyed by column name.
+    """
+    num_points = server.shape[0]
+    server_index = server.astype(np.intp) - 1
+    winner_index = winner.astype(np.intp) - 1
+    ace = serve == Serve.ACE.value
+    double_fault = serve == Serve.DOUBLE_FAULT.value
+    rally = ~ace & ~double_fault
+
+    rally_lengths = np.stack([profile.rally_length for profile in profiles])
+    final_shots = np.stack([profile.final_shot for profile in profiles])
+    net_approaches = np.array([profile.net_approach for profile in profiles])
+
+    serve_type = rng.integers(1, len(ServeType) + 1, size=num_points, dtype=np.int8)
+    serve_target = rng.integers(1, len(ServeTarget) + 1, size=num_points, dtype=np.int8)
+
+    # Each player approaches the net first with their net approach probability, checking the server first.
+    net_draws = rng.random(num_points)
+    server_approach = net_draws < net_approaches[server_index]
+    returner_approach = ~server_approach & (net_draws < net_approaches[server_index] + net_approaches[1 - server_index])
+    net_approach = rally & (server_approach | returner_approach)
+    first_net_approacher = np.where(server_approach, server, 3 - server).astype(np.int8)
+
+    final_shot = np.where(ace, FinalShot.WINNER.value, _draw(rng, final_shots[winner_index]))
+
+    return {
+        'ace_flag': ace,
+        'double_fault_flag': double_fault,
+        'serve': serve,
+        'serve_type': np.where(double_fault, 0, np.where(ace, ServeType.FLAT.value, serve_type)),
+        'serve_target': np.where(double_fault, 0, serve_target),
+        'net_approach': net_approach,
+        'first_net_approacher': np.where(net_approach, first_net_approacher, 0),
+        'net_approach_type': np.where(net_approach, rng.integers(1, len(NetApproachType) + 1, size=num_points), 0),
+        'rally_length': np.where(rally, _draw(rng, rally_lengths[server_index]), RallyLength.RL_0_2.value),
+        'final_shot': np.where(double_fault, 0, final_shot),
+        'final_shot_hand': np.where(rally, rng.integers(1, len(FinalShotHand) + 1, size=num_points), 0),
+        'final_shot_type': np.where(rally, rng.integers(1, len(FinalShotType) + 1, size=num_points), 0),
+    }
+
+
+def _generate_matches(args: tuple) -> list[dict[str, np.ndarray]]:
+    # Runs in a worker process, returning plain column arrays so the result can be sent between processes.
+    player1, player2, config, seeds = args
+    matches = []
+    for seed in seeds:
+        point_log = generate_match(player1, player2, config, seed)
+        matches.append(({name: point_log.column(name).copy() for name in POINT_LOG_DTYPES}, point_log.metadata))
+    return matches
+
+
+def generate_matches(
+        num_matches: int,
+        player1: PlayerProfile,
+        player2: PlayerProfile,
+        config: dict or None = None,
+        seed: int or None = None,
+        max_workers: int = 1,
+) -> list[PointLog]:
+    """
+    Generates many matches between two players, optionally across processes.
+    Each match is given its own seed spawned from the given seed, so the generated matches do not depend on the number of processes.
+
+    :param num_matches: number of matches to generate.
+    :param player1: profile of player 1.
+    :param player2: profile of player 2.
+    :param config: match initial inputs, as given by Match.get_initial_inputs, defaulting to DEFAULT_CONFIG.
+    :param seed: seed for the random number generator.
+    :param max_workers: number of processes to use, where None uses the number of CPUs and 1 generates the matches in the current process.
+    :return: point log for each match.
+    """
+    seeds = np.random.SeedSequence(seed).spawn(num_matches)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, num_matches))
+
+    if max_workers == 1:
+        return [generate_match(player1, player2, config, match_seed) for match_seed in seeds]
+
+    batches = [(player1, player2, config, seeds[worker::max_workers]) for worker in range(max_workers)]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(_generate_matches, batches))
+
+    # Batches hold every max_workers-th match, so the matches are put back in order of their seeds.
+    point_logs = [None] * num_matches
+    for worker, matches in enumerate(results):
+        for position, (columns, metadata) in enumerate(matches):
+            point_logs[worker + position * max_workers] = PointLog.from_columns(columns, metadata)
+    return point_logs
@@ -0,0 +1,376 @@
+from contextlib import contextmanager
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # File locks are not available on Windows, where leases are only claimed under a lock within the process.
+    fcntl = None
+
+from src.encoding import POINT_RECORD_DTYPE, decode_header, decode_points, encode_header, encode_point, encode_points, match_start
+from src.point_log import PointLog
+
+
+"""
+This file contains the match journal, an append-only file which records every change to the point log of a match being tracked,
+so that the match can be recovered after a browser refresh or a restart of the application.
+Each change is written as one fixed-size record, holding the point in the binary point encoding, straight to the file, and the file is only fsynced after a batch of records,
+so recording a point costs a single small write rather than rewriting the match data.
+A session holds a lease on its journal, renewed whenever it records a change or its page runs, so only journals of sessions which have been
+inactive for longer than the lease, such as after a browser refresh, are listed for recovery.
+"""
+
+
+DEFAULT_JOURNAL_DIRECTORY = os.environ.get('TENNIS_TRACKER_JOURNALS', os.path.join('data', 'journals'))
+
+JOURNAL_SUFFIX = '.journal'
+
+# The lease on a journal is kept in a file next to it, holding the id of the session's journal, with the time it was last renewed as its modification time.
+LEASE_SUFFIX = '.lease'
+
+# Number of seconds after its last renewal that a lease expires, after which its journal can be recovered by another session.
+JOURNAL_LEASE_SECONDS = 60
+
+JOURNAL_MAGIC = b'TTJ'
+
+# Number of records written between each fsync of the journal file.
+# Records which have not yet been fsynced are still in the operating system's page cache, so they survive the application restarting.
+SYNC_EVERY_RECORDS = 16
+
+# Operations recorded in the journal.
+APPEND = 1
+TRUNCATE = 2
+
+# Each record holds the operation, the length of the log before an append or after a truncate, and the encoded appended point.
+RECORD_DTYPE = np.dtype([('operation', 'u1'), ('length', '<u4'), ('point', POINT_RECORD_DTYPE)])
+
+
+class MatchJournal:
+    """
+    Journal of the changes to a point log, which records them once attached to the log with PointLog.journal.
+    The journal file is only created when the log first changes, and then starts with every point already in the log,
+    so matches which are viewed but never changed do not leave journals behind.
+    """
+    __slots__ = ('_path', '_owner', '_metadata', '_start', '_file', '_unsynced')
+
+    def __init__(self, metadata: dict, directory: str = DEFAULT_JOURNAL_DIRECTORY, path: str or None = None):
+        """
+        :param metadata: match metadata dictionary, which is written at the start of the journal file.
+        :param directory: directory to create the journal file in.
+        :param path: path of an existing journal file to continue appending to, in which case metadata and directory are not used.
+        """
+        self._path: str = path if path is not None else _new_path(directory)
+        self._owner: str = uuid.uuid4().hex
+        self._metadata: dict = metadata
+        self._start: int = match_start(metadata)
+        self._file = None
+        self._unsynced: int = 0
+        if path is not None:
+            _claim(path, self._owner)
+            self._file = open(path, 'ab', buffering=0)
+
+    @classmethod
+    def reopen(cls, path: str) -> 'MatchJournal':
+        """
+        Opens an existing journal file to continue appending to it, such as after recovering its match.
+
+        :param path: path of the journal file.
+        :return: journal which appends to the file.
+            A ValueError is raised if the journal is leased by another session.
+        """
+        return cls(read_journal_metadata(path), path=path)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def _append_records(self, columns: dict[str, np.ndarray], start: int, stop: int) -> bytes:
+        records = np.zeros(stop - start, dtype=RECORD_DTYPE)
+        records['operation'] = APPEND
+        records['length'] = np.arange(start, stop)
+        records['point'] = encode_points({name: values[start:stop] for name, values in columns.items()}, self._start)
+        return records.tobytes()
+
+    def _open(self, columns: dict[str, np.ndarray], length: int) -> None:
+        # Records are encoded before the file is created, so points which cannot be encoded do not leave an empty journal behind.
+        data = encode_header(JOURNAL_MAGIC, self._metadata) + self._append_records(columns, 0, length)
+
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        file = open(self._path, 'xb', buffering=0)
+        try:
+            _claim(self._path, self._owner)
+            file.write(data)
+            os.fsync(file.fileno())
+        except OSError:
+            file.close()
+            os.remove(self._path)
+            _remove_lease(self._path)
+            raise
+        self._file = file
+        self._unsynced = 0
+
+    def _write(self, data: bytes, num_records: int = 1) -> None:
+        # A failed write is cut from the end of the file, so a later record is not misread as part of a partly written one.
+        position = self._file.tell()
+        try:
+            self._file.write(data)
+        except OSError:
+            self._file.truncate(position)
+            raise
+        self._unsynced += num_records
+        if self._unsynced >= SYNC_EVERY_RECORDS:
+            self.sync()
+
+    def heartbeat(self) -> None:
+        """
+        Renews the session's lease on the journal, so the journal is not offered for recovery while the session is active.
+        If the lease expired and the journal was recovered by another session, this journal moves to a new file,
+        which is created with every point of the log when the log next changes, so two sessions never append to the same file.
+        """
+        if self._file is not None and not _renew(self._path, self._owner):
+            self._file.close()
+            self._file = None
+            self._path = _new_path(os.path.dirname(self._path))
+
+    def record_append(self, columns: dict[str, np.ndarray], row: int) -> None:
+        """
+        Records a point appended to the log, before the log commits it.
+        A ValueError is raised if the point cannot be encoded, and an OSError if it cannot be written, in which case nothing is recorded.
+
+        :param columns: stored columns of the log.
+        :param row: position of the appended point.
+        """
+        self.heartbeat()
+        if self._file is None:
+            self._open(columns, row + 1)
+            return
+
+        record = APPEND.to_bytes(1, 'little') + row.to_bytes(4, 'little') + encode_point(columns, row, self._start)
+        self._write(record)
+
+    def record_extend(self, columns: dict[str, np.ndarray], start: int, stop: int) -> None:
+        """
+        Records many points appended to the log with a single write, before the log commits them.
+        A ValueError is raised if any point cannot be encoded, and an OSError if they cannot be written, in which case nothing is recorded.
+
+        :param columns: stored columns of the log.
+        :param start: position of the first appended point.
+        :param stop: position after the last appended point.
+        """
+        self.heartbeat()
+        if self._file is None:
+            self._open(columns, stop)
+            return
+
+        self._write(self._append_records(columns, start, stop), stop - start)
+
+    def record_truncate(self, columns: dict[str, np.ndarray], length: int) -> None:
+        """
+        Records the log being truncated, such as when points are undone, before the log removes the points.
+
+        :param columns: stored columns of the log, whose first length points are kept.
+        :param length: number of points kept.
+        """
+        self.heartbeat()
+        if self._file is None:
+            self._open(columns, length)
+            return
+
+        self._write(TRUNCATE.to_bytes(1, 'little') + length.to_bytes(4, 'little') + bytes(RECORD_DTYPE.itemsize - 5))
+
+    def sync(self) -> None:
+        """
+        Flushes every record written so far to disk.
+        """
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def close(self) -> None:
+        """
+        Closes the journal file and releases the session's lease on it, so it is listed for recovery straight away.
+        """
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+            _release(self._path, self._owner)
+
+    def discard(self) -> None:
+        """
+        Closes and deletes the journal file, such as when its match is won or replaced and no longer needs recovering.
+        A journal which has since been recovered by another session is kept.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            _release(self._path, self._owner, remove=True)
+
+
+def _new_path(directory: str) -> str:
+    return os.path.join(directory, f"{uuid.uuid4().hex}{JOURNAL_SUFFIX}")
+
+
+# Sessions run as threads of one process, and file locks are not available on every platform, so leases are also changed under a lock within the process.
+_LEASE_LOCK = threading.Lock()
+
+
+@contextmanager
+def _locked_lease(path: str):
+    """
+    Opens the lease file of a journal, holding an exclusive lock on it, so that only one session at a time reads or changes the lease.
+    """
+    with _LEASE_LOCK, open(path + LEASE_SUFFIX, 'a+b', buffering=0) as file:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        yield file
+
+
+def _lease_owner(file) -> str:
+    # Id of the journal holding the lease, whether or not it has expired, or an empty string for a released lease.
+    file.seek(0)
+    return file.read().decode('ascii')
+
+
+def _lease_expired(file) -> bool:
+    return time.time() - os.fstat(file.fileno()).st_mtime > JOURNAL_LEASE_SECONDS
+
+
+def _claim(path: str, owner: str) -> None:
+    """
+    Takes the lease on a journal for a session's journal.
+    A ValueError is raised if the lease is held by another session and has not expired.
+    """
+    with _locked_lease(path) as file:
+        current_owner = _lease_owner(file)
+        if current_owner and current_owner != owner and not _lease_expired(file):
+            raise ValueError(f"Journal {path} is in use by another session.")
+        file.truncate(0)
+        file.write(owner.encode('ascii'))
+
+
+def _renew(path: str, owner: str) -> bool:
+    """
+    Renews a session's lease on a journal, which resets the time it expires.
+
+    :return: False if the lease has been taken by another session, in which case it is left unchanged.
+    """
+    with _locked_lease(path) as file:
+        if _lease_owner(file) != owner:
+            return False
+        file.truncate(0)
+        file.write(owner.encode('ascii'))
+    return True
+
+
+def _release(path: str, owner: str, remove: bool = False) -> None:
+    """
+    Releases a session's lease on a journal, unless the lease has been taken by another session.
+
+    :param remove: boolean flag to also delete the journal file, which is done while the lease is locked so no session can recover it in between.
+    """
+    with _locked_lease(path) as file:
+        if _lease_owner(file) != owner:
+            return
+        file.truncate(0)
+        if remove:
+            os.remove(path)
+    if remove:
+        _remove_lease(path)
+
+
+def _remove_lease(path: str) -> None:
+    try:
+        os.remove(path + LEASE_SUFFIX)
+    except FileNotFoundError:
+        pass
+
+
+def journal_in_use(path: str) -> bool:
+    """
+    Checks if a journal is leased by a live session.
+
+    :param path: path of the journal file.
+    :return: True if a session holds a lease on the journal which has not expired.
+    """
+    if not os.path.exists(path + LEASE_SUFFIX):
+        return False
+    with _locked_lease(path) as file:
+        return bool(_lease_owner(file)) and not _lease_expired(file)
+
+
+def discard_journal(path: str) -> None:
+    """
+    Deletes the journal file of a lost session, such as when its match is not wanted.
+
+    :param path: path of the journal file.
+        A ValueError is raised, and the file kept, if the journal is leased by another session.
+    """
+    with _locked_lease(path) as file:
+        if _lease_owner(file) and not _lease_expired(file):
+            raise ValueError(f"Journal {path} is in use by another session.")
+        # The file is removed while the lease is locked, so no session can recover it in between.
+        os.remove(path)
+    _remove_lease(path)
+
+
+def read_journal_metadata(path: str) -> dict:
+    """
+    Reads the match metadata at the start of a journal file.
+
+    :param path: path of the journal file.
+    :return: match metadata dictionary.
+    """
+    with open(path, 'rb') as file:
+        header = file.read(len(JOURNAL_MAGIC) + 5)
+        metadata_length = int.from_bytes(header[len(JOURNAL_MAGIC) + 1:], 'little')
+        return decode_header(JOURNAL_MAGIC, header + file.read(metadata_length))[0]
+
+
+def read_journal(path: str) -> PointLog:
+    """
+    Replays a journal file into the point log it recorded.
+    A partly written record at the end of the file, from the application stopping mid-write, is ignored.
+
+    :param path: path of the journal file.
+    :return: point log with the journal's metadata and the points which had not been undone.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    metadata, offset = decode_header(JOURNAL_MAGIC, data)
+
+    num_records = (len(data) - offset) // RECORD_DTYPE.itemsize
+    records = np.frombuffer(data, dtype=RECORD_DTYPE, count=num_records, offset=offset)
+
+    # Each record sets the length of the log before it is applied, so undone points are dropped as in PointLog.truncate.
+    rows = []
+    for position, (operation, length) in enumerate(zip(records['operation'].tolist(), records['length'].tolist())):
+        del rows[length:]
+        if operation == APPEND:
+            rows.append(position)
+
+    return PointLog.from_columns(decode_points(records['point'][rows], match_start(metadata)), metadata)
+
+
+def list_journals(directory: str = DEFAULT_JOURNAL_DIRECTORY) -> list[str]:
+    """
+    Lists the journal files of lost sessions in a directory, with the most recently changed first.
+    Journals leased by a live session are not listed.
+
+    :param directory: directory containing the journal files.
+    :return: paths of the journal files.
+    """
+    if not os.path.isdir(directory):
+        return []
+    paths = [
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.endswith(JOURNAL_SUFFIX) and not journal_in_use(os.path.join(directory, name))
+    ]
+    return sorted(paths, key=os.path.getmtime, reverse=True)
@@ -0,0 +1,338 @@
+import ast
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.cache import versioned_cache
+from src.encoding import MATCH_MAGIC, POINT_RECORD_SIZE, decode_header, decode_match, decode_points, encode_match, match_start, records_from_bytes
+from src.point_log import OPTIONAL_COLUMNS, POINT_LOG_DTYPES, PointLog, columns_from_df
+from src.tennis import Match
+from src.utils import BACKEND_COLUMNS, BACKEND_DTYPES
+
+
+"""
+This file contains functions for saving and loading match files.
+"""
+
+
+PARQUET_MAGIC = b'PAR1'
+PARQUET_METADATA_KEY = b'tennis_tracker_match_metadata'
+PARQUET_COMPRESSION = 'zstd'
+
+# Number of points read from a match file at a time when streaming it.
+STREAM_CHUNK_POINTS = 65536
+
+MATCH_METADATA_KEYS: tuple[str, ...] = (
+    'player1_name',
+    'player2_name',
+    'server',
+    'match_best_of',
+    'set_num_games',
+    'set_tiebreak_to',
+    'match_tiebreak',
+    'match_tiebreak_to',
+    'datetime',
+)
+
+# Columns read from CSV files. The point uuid is rebuilt from other columns, and the metadata is only read from the first row.
+CSV_POINT_COLUMNS: list[str] = [name for name in BACKEND_COLUMNS if name not in ('point_uuid', 'metadata')]
+
+
+def _starts_with(file, magic: bytes) -> bool:
+    position = file.tell()
+    start = file.read(len(magic))
+    file.seek(position)
+    return start == magic
+
+
+def is_parquet(file) -> bool:
+    """
+    Checks whether a file is a Parquet file, leaving the file position unchanged.
+
+    :param file: binary file-like object.
+    :return: boolean flag for whether the file starts with the Parquet magic bytes.
+    """
+    return _starts_with(file, PARQUET_MAGIC)
+
+
+def is_encoded(file) -> bool:
+    """
+    Checks whether a file is a match in the binary point encoding, leaving the file position unchanged.
+
+    :param file: binary file-like object.
+    :return: boolean flag for whether the file starts with the encoded match magic bytes.
+    """
+    return _starts_with(file, MATCH_MAGIC)
+
+
+def save_parquet(point_log: PointLog) -> bytes:
+    """
+    Serialises a point log to a Parquet file.
+    Columns keep their compact types, with missing enum values stored as nulls, and the match metadata is stored once in the file schema.
+    The point uuid is not stored, as it is rebuilt from other columns on load.
+
+    :param point_log: point log for the match.
+    :return: Parquet file bytes.
+    """
+    arrays = []
+    for name in POINT_LOG_DTYPES:
+        values = point_log.column(name)
+        if name == 'point_datetime':
+            arrays.append(pa.array(values, type=pa.int64()).cast(pa.timestamp('ns', tz='UTC')))
+        elif name in OPTIONAL_COLUMNS:
+            arrays.append(pa.array(values, mask=(values == 0)))
+        else:
+            arrays.append(pa.array(values))
+
+    table = pa.Table.from_arrays(
+        arrays,
+        names=list(POINT_LOG_DTYPES),
+        metadata={PARQUET_METADATA_KEY: json.dumps(point_log.metadata).encode('utf-8')},
+    )
+
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression=PARQUET_COMPRESSION)
+    return buffer.getvalue()
+
+
+@versioned_cache(maxsize=8)
+def export_match(point_log: PointLog, file_format: str) -> bytes:
+    """
+    Serialises a point log to a match file for downloading.
+    Files are cached by the point log version, so each file is only built once until the logged points change.
+
+    :param point_log: point log for the match.
+    :param file_format: file extension of the format, which is one of csv, parquet or ttp.
+    :return: match file bytes.
+    """
+    if file_format == 'csv':
+        return point_log.to_csv()
+    elif file_format == 'parquet':
+        return save_parquet(point_log)
+    elif file_format == 'ttp':
+        return encode_match(point_log)
+    raise ValueError(f"File format {file_format} is invalid.")
+
+
+def load_parquet(file) -> PointLog:
+    """
+    Loads a match from a Parquet file created by save_parquet.
+
+    :param file: path or binary file-like object.
+    :return: point log for the match, including its metadata.
+    """
+    table = pq.read_table(file)
+
+    schema_metadata = table.schema.metadata or {}
+    if PARQUET_METADATA_KEY not in schema_metadata:
+        raise ValueError("File does not contain match metadata.")
+    metadata = json.loads(schema_metadata[PARQUET_METADATA_KEY])
+
+    missing_columns = [name for name in POINT_LOG_DTYPES if name not in table.column_names]
+    if missing_columns:
+        raise ValueError(f"File is missing columns {missing_columns}.")
+
+    columns = {}
+    for name in POINT_LOG_DTYPES:
+        column = table.column(name)
+        if name == 'point_datetime':
+            column = column.cast(pa.timestamp('ns', tz='UTC')).cast(pa.int64())
+        elif name in OPTIONAL_COLUMNS:
+            column = column.fill_null(0)
+        columns[name] = np.asarray(column.to_numpy())
+
+    return PointLog.from_columns(columns, metadata)
+
+
+def parse_metadata(metadata: str) -> dict:
+    """
+    Parses the match metadata string stored in CSV files.
+    Only Python literals are accepted, so no code in the file is evaluated.
+
+    :param metadata: string representation of the match metadata dictionary.
+    :return: match metadata dictionary.
+    """
+    try:
+        parsed_metadata = ast.literal_eval(metadata)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        raise ValueError("Match metadata could not be parsed.")
+
+    if not isinstance(parsed_metadata, dict):
+        raise ValueError("Match metadata is not a dictionary.")
+
+    missing_keys = [key for key in MATCH_METADATA_KEYS if key not in parsed_metadata]
+    if missing_keys:
+        raise ValueError(f"Match metadata is missing keys {missing_keys}.")
+    return parsed_metadata
+
+
+def validate_columns(columns: list[str]) -> None:
+    """
+    Checks that a match file has exactly the backend columns.
+
+    :param columns: column names in the file.
+    """
+    missing_columns = [name for name in BACKEND_COLUMNS if name not in columns]
+    unexpected_columns = [name for name in columns if name not in BACKEND_COLUMNS]
+    if missing_columns or unexpected_columns:
+        raise ValueError(f"File columns do not match the backend data. Missing columns: {missing_columns}. Unexpected columns: {unexpected_columns}.")
+
+
+def read_csv_metadata(file) -> dict:
+    """
+    Checks the columns of a CSV match file and parses the match metadata from its first row, leaving the file position unchanged.
+
+    :param file: binary file-like object.
+    :return: match metadata dictionary.
+    """
+    position = file.tell()
+    first_row = pd.read_csv(file, nrows=1, dtype=str)
+    file.seek(position)
+
+    validate_columns(list(first_row.columns))
+    if first_row.empty:
+        raise ValueError("File does not contain any points.")
+    return parse_metadata(first_row['metadata'].iloc[0])
+
+
+def load_csv(file) -> PointLog:
+    """
+    Loads a match from a CSV file created by this application.
+    The metadata is parsed once from the first row, and the point columns are read with the backend dtypes.
+
+    :param file: binary file-like object.
+    :return: point log for the match, including its metadata.
+    """
+    metadata = read_csv_metadata(file)
+    match_data = pd.read_csv(
+        file,
+        usecols=CSV_POINT_COLUMNS,
+        dtype={name: BACKEND_DTYPES[name] for name in CSV_POINT_COLUMNS},
+    )
+    return PointLog.from_df(match_data, metadata)
+
+
+def load_match_file(file) -> PointLog:
+    """
+    Loads a match from a CSV, Parquet or encoded match file created by this application, detecting the format from the file contents.
+
+    :param file: path or binary file-like object.
+    :return: point log for the match, including its metadata.
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as opened_file:
+            return load_match_file(opened_file)
+
+    if is_parquet(file):
+        return load_parquet(file)
+    if is_encoded(file):
+        return decode_match(file.read())
+    return load_csv(file)
+
+
+def _file_size(file) -> int:
+    # Number of bytes from the current position to the end of the file, leaving the position unchanged.
+    position = file.tell()
+    size = file.seek(0, os.SEEK_END) - position
+    file.seek(position)
+    return size
+
+
+def _csv_chunks(file, chunk_points: int):
+    # Yields the columns of each chunk of a CSV match file, and the fraction of the file read so far.
+    start = file.tell()
+    size = max(_file_size(file), 1)
+    reader = pd.read_csv(
+        file,
+        usecols=CSV_POINT_COLUMNS,
+        dtype={name: BACKEND_DTYPES[name] for name in CSV_POINT_COLUMNS},
+        chunksize=chunk_points,
+    )
+    with reader:
+        for chunk in reader:
+            yield columns_from_df(chunk), min((file.tell() - start) / size, 1.0)
+
+
+def _parquet_chunks(file, chunk_points: int):
+    # Yields the columns of each batch of a Parquet match file, and the fraction of the points read so far.
+    parquet_file = pq.ParquetFile(file)
+    num_points = max(parquet_file.metadata.num_rows, 1)
+    points_read = 0
+    for batch in parquet_file.iter_batches(batch_size=chunk_points, columns=list(POINT_LOG_DTYPES)):
+        columns = {}
+        for name in POINT_LOG_DTYPES:
+            column = batch.column(name)
+            if name == 'point_datetime':
+                column = column.cast(pa.timestamp('ns', tz='UTC')).cast(pa.int64())
+            elif name in OPTIONAL_COLUMNS:
+                column = column.fill_null(0)
+            columns[name] = np.asarray(column.to_numpy(zero_copy_only=False))
+        points_read += batch.num_rows
+        yield columns, points_read / num_points
+
+
+def _read_encoded_metadata(file) -> dict:
+    # Reads the header of an encoded match file, leaving the file positioned at the first record.
+    header = file.read(len(MATCH_MAGIC) + 5)
+    metadata_length = int.from_bytes(header[len(MATCH_MAGIC) + 1:], 'little')
+    return decode_header(MATCH_MAGIC, header + file.read(metadata_length))[0]
+
+
+def _encoded_chunks(file, chunk_points: int, start: int):
+    # Yields the columns of each chunk of records of an encoded match file, and the fraction of the records read so far.
+    # A partly written record at the end of the file is ignored, as in decode_match.
+    num_points = _file_size(file) // POINT_RECORD_SIZE
+    points_read = 0
+    while points_read < num_points:
+        data = file.read(min(chunk_points, num_points - points_read) * POINT_RECORD_SIZE)
+        records = records_from_bytes(data)
+        if not records.size:
+            break
+        points_read += records.size
+        yield decode_points(records, start), points_read / num_points
+
+
+def stream_match_file(file, chunk_points: int = STREAM_CHUNK_POINTS, progress=None) -> tuple[PointLog, Match]:
+    """
+    Loads a match from a CSV, Parquet or encoded match file created by this application a chunk of points at a time, for files too large to read in one go.
+    Each chunk is read with the backend dtypes and appended to the point log, which updates the match statistics,
+    and its winners are replayed into the match, so memory beyond the stored point log is bounded by the chunk size.
+
+    :param file: path or binary file-like object.
+    :param chunk_points: number of points read at a time.
+    :param progress: function called after each chunk with the fraction of the file loaded, or None.
+    :return: point log for the match, including its metadata, and the match after replaying all of its points.
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as opened_file:
+            return stream_match_file(opened_file, chunk_points, progress)
+
+    if is_encoded(file):
+        metadata = _read_encoded_metadata(file)
+        point_log = PointLog(metadata)
+        chunks = _encoded_chunks(file, chunk_points, match_start(metadata))
+    elif is_parquet(file):
+        parquet_metadata = (pq.ParquetFile(file).schema_arrow.metadata or {})
+        if PARQUET_METADATA_KEY not in parquet_metadata:
+            raise ValueError("File does not contain match metadata.")
+        point_log = PointLog(json.loads(parquet_metadata[PARQUET_METADATA_KEY]))
+        chunks = _parquet_chunks(file, chunk_points)
+    else:
+        point_log = PointLog(read_csv_metadata(file))
+        chunks = _csv_chunks(file, chunk_points)
+
+    match = Match.from_initial_inputs(point_log.metadata)
+    for columns, fraction_loaded in chunks:
+        point_log.extend(columns)
+        match.add_points(columns['winner'])
+        if progress is not None:
+            progress(fraction_loaded)
+
+    if progress is not None:
+        progress(1.0)
+    return point_log, match
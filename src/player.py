@@ -1,4 +1,6 @@
 class Player:
+    __slots__ = ('_name',)
+
     def __init__(self, name: str):
         self._name: str = name[:25]
 
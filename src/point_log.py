@@ -0,0 +1,386 @@
+from datetime import datetime
+import itertools
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src.bitmap import BITMAP_COLUMNS, BitmapIndex
+from src.stats import STAT_COLUMNS, STAT_DIMENSIONS, MatchStats
+from src.utils import BACKEND_COLUMNS, BACKEND_SCHEMA
+
+
+"""
+This file contains the point log, which stores the backend point data for a match in preallocated typed column arrays.
+Appending a point writes one value into each column, and a pandas DataFrame view is only built when one is requested.
+The log also keeps the match statistics up to date as points are appended and removed, builds a bitmap index of the points when one is requested,
+and passes every change to an attached journal so a match being tracked can be recovered.
+"""
+
+
+# Columns of the backend data which are not stored, as the point uuid is built from POINT_UUID_COLUMNS and the metadata is the same on every row.
+UNSTORED_COLUMNS: tuple[str, ...] = ('point_uuid', 'metadata')
+
+# Storage dtype of each backend dtype, where datetimes are stored as nanoseconds since the epoch and nullable columns in their plain dtype.
+_STORAGE_DTYPES: dict[str, str] = {
+    'datetime64[ns, UTC]': 'int64',
+    'boolean': 'bool',
+    'Int8': 'int8',
+}
+
+# Storage dtype for each stored column. Optional enum columns use 0 to mark a missing value, as all of their enums start at 1.
+POINT_LOG_DTYPES: dict[str, str] = {
+    name: _STORAGE_DTYPES.get(dtype, dtype) for name, dtype in BACKEND_SCHEMA.items() if name not in UNSTORED_COLUMNS
+}
+
+# Optional enum columns are the nullable integer columns of the backend data.
+OPTIONAL_COLUMNS: tuple[str, ...] = tuple(name for name in POINT_LOG_DTYPES if BACKEND_SCHEMA[name] == 'Int8')
+
+INITIAL_CAPACITY = 256
+
+# Source of ids which are unique to each point log within the process.
+_LOG_IDS = itertools.count()
+
+POINT_UUID_COLUMNS: tuple[str, ...] = ('set_id', 'game_id', 'point_id', 'server', 'side')
+
+# Format of point times in CSV exports, where the seconds are written with nanosecond precision.
+# pandas would otherwise choose the precision from the values written, which can differ between the chunks of an incremental export.
+CSV_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S+00:00'
+
+
+def _check_values(name: str, values: np.ndarray, stored: np.ndarray) -> None:
+    # Values which change when stored, such as fractional or out of range values, are rejected rather than silently truncated or wrapped.
+    if not np.array_equal(stored, values):
+        raise ValueError(f"Column {name} has values which are invalid for its {stored.dtype} type.")
+    # Counted columns index the MatchStats tables, so values outside their enum range are rejected rather than counted in the wrong cell.
+    if name in STAT_DIMENSIONS and stored.size and (stored.min() < 0 or stored.max() >= STAT_DIMENSIONS[name]):
+        raise ValueError(f"Column {name} has values outside the range 0 to {STAT_DIMENSIONS[name] - 1}.")
+
+
+def columns_from_df(df: pd.DataFrame) -> dict[str, np.ndarray]:
+    """
+    Converts a DataFrame in the backend format, such as the rows read from a match file, to arrays of stored values.
+
+    :param df: DataFrame containing the backend columns.
+    :return: array for each stored column, keyed by column name, using 0 for missing values in optional columns.
+    """
+    columns = {
+        name: df[name].fillna(0).to_numpy()
+        for name in POINT_LOG_DTYPES if name != 'point_datetime'
+    }
+    columns['point_datetime'] = pd.to_datetime(df['point_datetime'], utc=True, format='ISO8601').astype('int64').to_numpy()
+    return columns
+
+
+class PointLog:
+    def __init__(self, metadata: dict or None = None, capacity: int = INITIAL_CAPACITY):
+        self._metadata: dict = metadata if metadata is not None else {}
+        self._capacity: int = max(capacity, 1)
+        self._length: int = 0
+        self._log_id: int = next(_LOG_IDS)
+        self._version: int = 0
+        self._columns: dict[str, np.ndarray] = {
+            name: np.zeros(self._capacity, dtype=dtype) for name, dtype in POINT_LOG_DTYPES.items()
+        }
+
+        self._view: pd.DataFrame or None = None
+        # CSV export of the first _csv_length points, with the end position of each row, extended with new points on the next export.
+        self._csv: bytearray or None = None
+        self._csv_row_ends: np.ndarray = np.zeros(0, dtype=np.int64)
+        self._csv_length: int = 0
+        self._csv_bytes: bytes or None = None
+        self._bitmap_index: BitmapIndex or None = None
+        self._stats: MatchStats or None = MatchStats()
+        self._journal = None
+
+    @property
+    def metadata(self) -> dict:
+        return self._metadata
+
+    @property
+    def empty(self) -> bool:
+        return self._length == 0
+
+    @property
+    def log_id(self) -> int:
+        return self._log_id
+
+    @property
+    def version(self) -> int:
+        """
+        Returns a counter which changes whenever the logged points change, used with log_id to key cached results.
+        """
+        return self._version
+
+    @property
+    def journal(self):
+        """
+        Returns the journal which records every change to the logged points, or None if changes are not journalled.
+        """
+        return self._journal
+
+    @journal.setter
+    def journal(self, journal) -> None:
+        self._journal = journal
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def stats(self) -> MatchStats:
+        """
+        Returns the statistics for the logged points, which are updated as points are appended and removed.
+        For logs created from existing points, the statistics are counted on first use.
+        """
+        if self._stats is None:
+            self._stats = MatchStats.from_columns({name: self._columns[name][:self._length] for name in STAT_COLUMNS})
+        return self._stats
+
+    @property
+    def bitmap_index(self) -> BitmapIndex:
+        """
+        Returns a bitmap index over the categorical columns of the logged points, for counting any combination of filters.
+        The index is built on first use and cached until the logged points next change.
+        """
+        if self._bitmap_index is None:
+            self._bitmap_index = BitmapIndex.from_columns({name: self._columns[name][:self._length] for name in BITMAP_COLUMNS})
+        return self._bitmap_index
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Returns a read-only view of the stored values for a column, without building a DataFrame.
+
+        :param name: name of a stored column.
+        :return: numpy array of the stored values, with 0 marking missing values in optional columns.
+        """
+        values = self._columns[name][:self._length]
+        values.flags.writeable = False
+        return values
+
+    def _grow(self, min_capacity: int) -> None:
+        capacity = self._capacity
+        while capacity < min_capacity:
+            capacity *= 2
+
+        for name, values in self._columns.items():
+            grown = np.zeros(capacity, dtype=values.dtype)
+            grown[:self._length] = values[:self._length]
+            self._columns[name] = grown
+        self._capacity = capacity
+
+    def append(self, point_datetime: datetime, **values) -> None:
+        """
+        Appends a single point to the log.
+
+        :param point_datetime: timezone aware datetime the point was recorded.
+        :param values: value for each stored column, keyed by column name. Missing or None values are stored as 0.
+            A ValueError is raised, and the point is not appended, if any values do not fit their column or enum range.
+        """
+        if self._length == self._capacity:
+            self._grow(self._length + 1)
+
+        row = self._length
+        columns = self._columns
+        try:
+            columns['point_datetime'][row] = pd.Timestamp(point_datetime).value
+            for name, value in values.items():
+                value = value if value is not None else 0
+                columns[name][row] = value
+                if columns[name][row] != value:
+                    raise ValueError(f"Value {value} is invalid for column {name} of type {columns[name].dtype}.")
+                if name in STAT_DIMENSIONS and not 0 <= value < STAT_DIMENSIONS[name]:
+                    raise ValueError(f"Value {value} is outside the range 0 to {STAT_DIMENSIONS[name] - 1} of column {name}.")
+            # The point is journalled before it is committed, so a point which cannot be recorded leaves the log unchanged.
+            if self._journal is not None:
+                self._journal.record_append(columns, row)
+        except (ValueError, TypeError, OverflowError, OSError) as error:
+            # Unused rows are kept as 0, as points appended later may not give every column.
+            for column in columns.values():
+                column[row] = 0
+            raise ValueError(f"Point could not be appended: {error}")
+
+        self._length += 1
+        self._version += 1
+        self._view = None
+        self._bitmap_index = None
+        self._csv_bytes = None
+        if self._stats is not None:
+            self._stats.add({name: int(columns[name][row]) for name in STAT_COLUMNS})
+
+    def extend(self, columns: dict[str, np.ndarray]) -> None:
+        """
+        Appends many points to the log, writing each column in one pass, such as a chunk of points read from a match file.
+
+        :param columns: array of stored values for each column, keyed by column name, using 0 for missing values in optional columns.
+            point_datetime values are nanoseconds since the epoch in UTC.
+            A ValueError is raised, and no points are appended, if any values do not fit the column dtypes in POINT_LOG_DTYPES
+            or are outside the enum ranges in STAT_DIMENSIONS.
+        """
+        start = self._length
+        stop = start + len(columns['winner'])
+        if stop > self._capacity:
+            self._grow(stop)
+
+        try:
+            for name in POINT_LOG_DTYPES:
+                values = np.asarray(columns[name])
+                self._columns[name][start:stop] = values
+                _check_values(name, values, self._columns[name][start:stop])
+            if self._journal is not None:
+                self._journal.record_extend(self._columns, start, stop)
+        except (ValueError, TypeError, OverflowError, OSError) as error:
+            for values in self._columns.values():
+                values[start:stop] = 0
+            raise ValueError(f"Points could not be appended: {error}")
+
+        self._length = stop
+        self._version += 1
+        self._view = None
+        self._bitmap_index = None
+        self._csv_bytes = None
+        if self._stats is not None:
+            self._stats.add_columns({name: self._columns[name][start:stop] for name in STAT_COLUMNS})
+
+    def truncate(self, length: int) -> None:
+        """
+        Removes every point after the first given number of points.
+
+        :param length: number of points to keep.
+        """
+        if length < 0 or length > self._length:
+            raise ValueError(f"Length {length} is invalid.")
+
+        # The points kept are unchanged by truncating, so the truncate is journalled first and a failure leaves the log unchanged.
+        if self._journal is not None:
+            self._journal.record_truncate(self._columns, length)
+        if self._stats is not None:
+            self._stats.add_columns({name: self._columns[name][length:self._length] for name in STAT_COLUMNS}, count=-1)
+        for values in self._columns.values():
+            values[length:self._length] = 0
+        self._length = length
+        self._version += 1
+        self._view = None
+        self._bitmap_index = None
+        self._csv_bytes = None
+        if length < self._csv_length:
+            # Exported rows of removed points are cut from the end of the CSV export.
+            if length == 0:
+                self._csv = None
+            else:
+                del self._csv[self._csv_row_ends[length - 1]:]
+            self._csv_row_ends = self._csv_row_ends[:length]
+            self._csv_length = length
+
+    @classmethod
+    def from_columns(cls, columns: dict[str, np.ndarray], metadata: dict or None = None) -> 'PointLog':
+        """
+        Creates a point log from arrays of stored values for each column.
+
+        :param columns: array for each stored column, keyed by column name, using 0 for missing values in optional columns.
+            point_datetime values are nanoseconds since the epoch in UTC.
+        :param metadata: match metadata dictionary.
+        :return: point log containing the given points.
+            A ValueError is raised if any values do not fit the column dtypes in POINT_LOG_DTYPES or are outside the enum ranges in STAT_DIMENSIONS.
+        """
+        length = len(columns['winner'])
+        point_log = cls(metadata, capacity=length)
+        point_log._length = length
+        point_log._stats = None
+        for name in POINT_LOG_DTYPES:
+            values = np.asarray(columns[name])
+            point_log._columns[name][:length] = values
+            _check_values(name, values, point_log._columns[name][:length])
+        return point_log
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame, metadata: dict or None = None) -> 'PointLog':
+        """
+        Creates a point log from a DataFrame in the backend format, such as a loaded match file.
+
+        :param df: DataFrame containing the backend columns.
+        :param metadata: match metadata dictionary.
+        :return: point log containing every row of the DataFrame.
+        """
+        return cls.from_columns(columns_from_df(df), metadata)
+
+    def point_uuids(self, start: int = 0, stop: int or None = None) -> pa.StringArray:
+        """
+        Builds the uuid of each logged point, which joins the values of POINT_UUID_COLUMNS with dashes.
+
+        :param start: position of the first point.
+        :param stop: position after the last point, defaulting to the number of logged points.
+        :return: Arrow array of point uuids.
+        """
+        stop = self._length if stop is None else stop
+        return pc.binary_join_element_wise(
+            *(pa.array(self._columns[name][start:stop]).cast(pa.string()) for name in POINT_UUID_COLUMNS), '-'
+        )
+
+    def to_df(self, include_metadata: bool = True) -> pd.DataFrame:
+        """
+        Builds a DataFrame view of the logged points in the backend format.
+        The view is cached until the logged points next change.
+
+        :param include_metadata: boolean flag to include the metadata column, which repeats the match metadata on every row.
+        :return: DataFrame with the backend columns.
+        """
+        if self._view is None:
+            self._view = self._build_df()
+        if include_metadata:
+            return self._view
+        return self._view.drop(columns='metadata')
+
+    def _build_df(self, start: int = 0, stop: int or None = None) -> pd.DataFrame:
+        # Columns are built directly in the dtypes of BACKEND_SCHEMA, without going through Python objects.
+        stop = self._length if stop is None else stop
+        n = stop - start
+        data = {}
+        for name in POINT_LOG_DTYPES:
+            values = self._columns[name][start:stop].copy()
+            if name == 'point_datetime':
+                data[name] = pd.to_datetime(values, utc=True)
+            elif name in OPTIONAL_COLUMNS:
+                data[name] = pd.arrays.IntegerArray(values, values == 0)
+            elif values.dtype == bool:
+                data[name] = pd.arrays.BooleanArray(values, np.zeros(n, dtype=bool))
+            else:
+                data[name] = values
+
+        data['point_uuid'] = pd.arrays.ArrowStringArray(self.point_uuids(start, stop))
+        data['metadata'] = pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), categories=[str(self._metadata)])
+
+        return pd.DataFrame({name: data[name] for name in BACKEND_COLUMNS})
+
+    def _csv_rows(self, start: int, stop: int, header: bool) -> bytes:
+        # Point times are formatted by Arrow, whose seconds include every fractional digit of the timestamp unit.
+        df = self._build_df(start, stop)
+        point_datetimes = pa.array(self._columns['point_datetime'][start:stop]).cast(pa.timestamp('ns', tz='UTC'))
+        df['point_datetime'] = pd.arrays.ArrowStringArray(pc.strftime(point_datetimes, format=CSV_DATETIME_FORMAT))
+        return df.to_csv(index=False, header=header).encode("utf-8")
+
+    def to_csv(self) -> bytes:
+        """
+        Serialises the logged points to CSV in the backend format, with point times in CSV_DATETIME_FORMAT.
+        The export is built incrementally, so only the points appended since the last export are serialised,
+        and the result is cached until the logged points next change.
+
+        :return: utf-8 encoded CSV bytes.
+        """
+        if self._csv_bytes is not None:
+            return self._csv_bytes
+
+        if self._csv is None:
+            self._csv = bytearray(self._csv_rows(0, 0, header=True))
+
+        if self._csv_length < self._length:
+            rows = self._csv_rows(self._csv_length, self._length, header=False)
+            # Every row has the same number of line breaks, as only the metadata, which is the same on each row, can contain them.
+            line_ends = np.flatnonzero(np.frombuffer(rows, dtype=np.uint8) == ord('\n')) + 1
+            breaks_per_row = len(line_ends) // (self._length - self._csv_length)
+            self._csv_row_ends = np.concatenate((self._csv_row_ends, len(self._csv) + line_ends[breaks_per_row - 1::breaks_per_row]))
+            self._csv += rows
+            self._csv_length = self._length
+
+        self._csv_bytes = bytes(self._csv)
+        return self._csv_bytes
@@ -0,0 +1,395 @@
+from functools import lru_cache
+
+import numpy as np
+
+from src.scoring import GameTable, regular_game_table, tiebreak_game_table
+from src.tennis import Match, TiebreakSet
+from src.utils import Players, other_player
+
+
+"""
+This file contains the win probability engine, which gives the exact probability of each player winning a match from any score.
+Each player is assumed to win points on their serve with a fixed probability, and the probabilities are found by dynamic programming over games, sets and the match.
+Games and sets are played the same way whatever the match score, so the ways a set can end are found once for each game score,
+and combined over the set scores of the match.
+"""
+
+
+DEFAULT_SERVE_PROBABILITY = 0.62
+DEFAULT_PRIOR_WEIGHT = 20
+
+# Serve probability estimates are rounded to multiples of this step, so a new model is only built when an estimate moves a whole step,
+# rather than after almost every point.
+SERVE_PROBABILITY_STEP = 0.01
+
+# Ways a set can end, as whether player 1 won the set and the player serving first in the next set.
+SET_OUTCOMES: tuple[tuple[int, int], ...] = (
+    (1, Players.PLAYER_1.value),
+    (1, Players.PLAYER_2.value),
+    (0, Players.PLAYER_1.value),
+    (0, Players.PLAYER_2.value),
+)
+
+
+def estimate_serve_probability(
+        serve_points_won: int,
+        serve_points: int,
+        prior: float = DEFAULT_SERVE_PROBABILITY,
+        prior_weight: float = DEFAULT_PRIOR_WEIGHT,
+) -> float:
+    """
+    Estimates the probability of a player winning a point on their serve, from their serve points so far.
+    The estimate starts at the prior, and moves towards the observed rate as more points are played.
+
+    :param serve_points_won: number of points won by the player on their serve.
+    :param serve_points: number of points served by the player.
+    :param prior: estimate used before any points are played.
+    :param prior_weight: number of points the prior counts as.
+    :return: estimated probability, rounded to a multiple of SERVE_PROBABILITY_STEP so that models can be reused between similar estimates.
+    """
+    estimate = (serve_points_won + prior * prior_weight) / (serve_points + prior_weight)
+    return round(round(estimate / SERVE_PROBABILITY_STEP) * SERVE_PROBABILITY_STEP, 6)
+
+
+class WinProbability:
+    """
+    Exact probabilities of player 1 winning a match, for fixed probabilities of each player winning a point on their serve.
+    Probabilities for player 2 are 1 minus the probabilities for player 1.
+    """
+    def __init__(
+            self,
+            player1_serve: float,
+            player2_serve: float,
+            match_best_of: int = 3,
+            set_num_games: int = 6,
+            set_tiebreak_to: int = 7,
+            match_tiebreak: bool = False,
+            match_tiebreak_to: int = 10,
+    ):
+        for name, probability in (('player1_serve', player1_serve), ('player2_serve', player2_serve)):
+            if not 0 <= probability <= 1:
+                raise ValueError(f"Probability {name} of {probability} is invalid.")
+
+        self._player1_serve: float = player1_serve
+        self._player2_serve: float = player2_serve
+        self._winning_num_sets: int = (match_best_of // 2) + 1
+        self._set_num_games: int = set_num_games
+        self._set_tiebreak_to: int = set_tiebreak_to
+        self._match_tiebreak: bool = match_tiebreak
+        self._match_tiebreak_to: int = match_tiebreak_to
+
+        # Probability of player 1 winning a point, indexed by the server.
+        self._point: tuple[float, float, float] = (0.0, player1_serve, 1 - player2_serve)
+
+        self._games: dict[GameTable, list[float or None]] = {}
+        self._set_outcome_probabilities: dict[tuple, tuple[float, ...]] = {}
+        self._set_starts: dict[tuple, float] = {}
+        self._after_games: dict[tuple, float] = {}
+        self._score_arrays: tuple[np.ndarray, np.ndarray, np.ndarray] or None = None
+
+    @property
+    def player1_serve(self) -> float:
+        return self._player1_serve
+
+    @property
+    def player2_serve(self) -> float:
+        return self._player2_serve
+
+    def game(self, table: GameTable, state: int) -> float:
+        """
+        Returns the probability of player 1 winning a game from a state of its game table.
+        Probabilities are only calculated for states that are reached, as some states in the tables cannot occur.
+
+        :param table: game table for the game format.
+        :param state: state of the game in its table.
+        :return: probability of player 1 winning the game.
+        """
+        if table not in self._games:
+            self._games[table] = [None] * table.num_states
+        return self._game_state(table, state, self._games[table])
+
+    def _game_state(self, table: GameTable, state: int, probabilities: list) -> float:
+        if probabilities[state] is not None:
+            return probabilities[state]
+
+        winner = table.winner[state]
+        tie_points = table.winning_num_points - 1
+        if winner != Players.NONE.value:
+            probability = 1.0 if winner == Players.PLAYER_1.value else 0.0
+        elif table.player1_points[state] == tie_points and table.player2_points[state] == tie_points:
+            # From deuce, or a tiebreak tied at one point from winning, the game is won by winning two points in a row.
+            # In a regular game both points have the same server, and in a tiebreak each player serves one of them.
+            first = self._point[table.server[state]]
+            second = self._point[table.server[table.next_state[state][Players.PLAYER_1.value]]]
+            both_won, both_lost = first * second, (1 - first) * (1 - second)
+            probability = both_won / (both_won + both_lost) if both_won + both_lost > 0 else 0.5
+        else:
+            point = self._point[table.server[state]]
+            probability = point * self._game_state(table, table.next_state[state][Players.PLAYER_1.value], probabilities) \
+                + (1 - point) * self._game_state(table, table.next_state[state][Players.PLAYER_2.value], probabilities)
+
+        probabilities[state] = probability
+        return probability
+
+    def _set_winner(self, tiebreak_set: bool, player1_games: int, player2_games: int) -> int:
+        # Follows RegularSet._check_win and TiebreakSet._check_win.
+        if tiebreak_set:
+            if player1_games >= 1 and player1_games > player2_games:
+                return Players.PLAYER_1.value
+            elif player2_games >= 1 and player2_games > player1_games:
+                return Players.PLAYER_2.value
+            return Players.NONE.value
+
+        num_games = self._set_num_games
+        game_difference = abs(player1_games - player2_games)
+        if (player1_games == num_games and game_difference > 1) or player1_games == num_games + 1:
+            return Players.PLAYER_1.value
+        elif (player2_games == num_games and game_difference > 1) or player2_games == num_games + 1:
+            return Players.PLAYER_2.value
+        return Players.NONE.value
+
+    def _game_table(self, tiebreak_set: bool, player1_games: int, player2_games: int) -> GameTable:
+        if tiebreak_set:
+            return tiebreak_game_table(self._match_tiebreak_to)
+        if player1_games == self._set_num_games and player2_games == self._set_num_games:
+            return tiebreak_game_table(self._set_tiebreak_to)
+        return regular_game_table()
+
+    def _after_game(self, tiebreak_set: bool, player1_games: int, player2_games: int, game_server: int, player1_sets: int, player2_sets: int) -> float:
+        key = (tiebreak_set, player1_games, player2_games, game_server, player1_sets, player2_sets)
+        if key in self._after_games:
+            return self._after_games[key]
+
+        # The server changes after every game, including between sets.
+        next_server = other_player(game_server)
+        set_winner = self._set_winner(tiebreak_set, player1_games, player2_games)
+        if set_winner == Players.PLAYER_1.value:
+            probability = self._from_set_start(player1_sets + 1, player2_sets, next_server)
+        elif set_winner == Players.PLAYER_2.value:
+            probability = self._from_set_start(player1_sets, player2_sets + 1, next_server)
+        else:
+            outcomes = self._set_outcomes(tiebreak_set, player1_games, player2_games, next_server)
+            probability = sum(
+                outcomes[outcome] * self._from_set_start(player1_sets + player1_won, player2_sets + 1 - player1_won, server)
+                for outcome, (player1_won, server) in enumerate(SET_OUTCOMES)
+            )
+
+        self._after_games[key] = probability
+        return probability
+
+    def _set_outcomes(self, tiebreak_set: bool, player1_games: int, player2_games: int, server: int) -> tuple[float, ...]:
+        """
+        Returns the probability of each way a set can end from the start of a game, in the order of SET_OUTCOMES.
+        Sets are played the same way whatever the set score, so each game score is only calculated once for the whole match.
+        """
+        key = (tiebreak_set, player1_games, player2_games, server)
+        if key not in self._set_outcome_probabilities:
+            table = self._game_table(tiebreak_set, player1_games, player2_games)
+            game = self.game(table, table.initial_state(server))
+            next_server = other_player(server)
+
+            outcomes = [0.0] * len(SET_OUTCOMES)
+            for probability, games in ((game, (player1_games + 1, player2_games)), (1 - game, (player1_games, player2_games + 1))):
+                set_winner = self._set_winner(tiebreak_set, *games)
+                if set_winner != Players.NONE.value:
+                    outcomes[SET_OUTCOMES.index((int(set_winner == Players.PLAYER_1.value), next_server))] += probability
+                else:
+                    for outcome, outcome_probability in enumerate(self._set_outcomes(tiebreak_set, *games, next_server)):
+                        outcomes[outcome] += probability * outcome_probability
+            self._set_outcome_probabilities[key] = tuple(outcomes)
+        return self._set_outcome_probabilities[key]
+
+    def _from_set_start(self, player1_sets: int, player2_sets: int, server: int) -> float:
+        if player1_sets == self._winning_num_sets:
+            return 1.0
+        elif player2_sets == self._winning_num_sets:
+            return 0.0
+
+        key = (player1_sets, player2_sets, server)
+        if key not in self._set_starts:
+            tiebreak_set = self._match_tiebreak and player1_sets == self._winning_num_sets - 1 and player2_sets == self._winning_num_sets - 1
+            outcomes = self._set_outcomes(tiebreak_set, 0, 0, server)
+            self._set_starts[key] = sum(
+                outcomes[outcome] * self._from_set_start(player1_sets + player1_won, player2_sets + 1 - player1_won, next_server)
+                for outcome, (player1_won, next_server) in enumerate(SET_OUTCOMES)
+            )
+        return self._set_starts[key]
+
+    def from_score(
+            self,
+            player1_sets: int,
+            player2_sets: int,
+            player1_games: int,
+            player2_games: int,
+            game_server: int,
+            tiebreak_set: bool,
+            table: GameTable,
+            state: int,
+    ) -> float:
+        """
+        Returns the probability of player 1 winning the match from a score.
+
+        :param player1_sets: sets won by player 1.
+        :param player2_sets: sets won by player 2.
+        :param player1_games: games won by player 1 in the current set.
+        :param player2_games: games won by player 2 in the current set.
+        :param game_server: player serving the first point of the current game.
+        :param tiebreak_set: boolean flag for whether the current set is a match tiebreak.
+        :param table: game table for the current game.
+        :param state: state of the current game in its table.
+        :return: probability of player 1 winning the match.
+        """
+        if player1_sets == self._winning_num_sets:
+            return 1.0
+        elif player2_sets == self._winning_num_sets:
+            return 0.0
+
+        game = self.game(table, state)
+        return (
+            game * self._after_game(tiebreak_set, player1_games + 1, player2_games, game_server, player1_sets, player2_sets)
+            + (1 - game) * self._after_game(tiebreak_set, player1_games, player2_games + 1, game_server, player1_sets, player2_sets)
+        )
+
+    def _build_score_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Builds the arrays used by from_scores, once per model.
+
+        :return: probability of player 1 winning the game from each state of the regular, set tiebreak and match tiebreak game tables joined together,
+            the offset of each game table in the joined array,
+            and the probability of player 1 winning the match after each game, indexed by tiebreak set, sets, games after the game and game server.
+        """
+        tables = (regular_game_table(), tiebreak_game_table(self._set_tiebreak_to), tiebreak_game_table(self._match_tiebreak_to))
+        game_probabilities = []
+        for table in tables:
+            # Every state that can be reached from the start of a game is visited, as the ties skip over the advantage states.
+            # States that cannot be reached are left as NaN.
+            to_visit = [table.initial_state(Players.PLAYER_1.value), table.initial_state(Players.PLAYER_2.value)]
+            visited = set(to_visit)
+            while to_visit:
+                state = to_visit.pop()
+                self.game(table, state)
+                for next_state in table.next_state[state][1:]:
+                    if next_state not in visited:
+                        visited.add(next_state)
+                        to_visit.append(next_state)
+            game_probabilities.append(np.array([np.nan if probability is None else probability for probability in self._games[table]]))
+        offsets = np.cumsum([0] + [table.num_states for table in tables])[:-1]
+
+        winning_num_sets, num_games = self._winning_num_sets, self._set_num_games
+        after_game = np.full((2, winning_num_sets, winning_num_sets, num_games + 2, num_games + 2, 3), np.nan)
+        for player1_sets in range(winning_num_sets):
+            for player2_sets in range(winning_num_sets):
+                tiebreak_set = self._match_tiebreak and player1_sets == winning_num_sets - 1 and player2_sets == winning_num_sets - 1
+                if tiebreak_set:
+                    game_scores = [(0, 0)]
+                else:
+                    game_scores = [
+                        (player1_games, player2_games)
+                        for player1_games in range(num_games + 1)
+                        for player2_games in range(num_games + 1)
+                        if self._set_winner(False, player1_games, player2_games) == Players.NONE.value
+                    ]
+                for player1_games, player2_games in game_scores:
+                    for server in (Players.PLAYER_1.value, Players.PLAYER_2.value):
+                        for games in ((player1_games + 1, player2_games), (player1_games, player2_games + 1)):
+                            after_game[(int(tiebreak_set), player1_sets, player2_sets, *games, server)] = self._after_game(
+                                tiebreak_set, *games, server, player1_sets, player2_sets
+                            )
+
+        return np.concatenate(game_probabilities), offsets, after_game
+
+    def from_scores(self, scores: dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Returns the probability of player 1 winning the match from many scores at once, such as the score before every point of a replayed match.
+
+        :param scores: arrays of scores, keyed by the names in REPLAY_SCORE_COLUMNS, as returned by Match._replay.
+        :return: probability of player 1 winning the match from each score.
+        """
+        if self._score_arrays is None:
+            self._score_arrays = self._build_score_arrays()
+        games, offsets, after_game = self._score_arrays
+
+        player1_sets = scores['player1_sets'].astype(np.intp)
+        player2_sets = scores['player2_sets'].astype(np.intp)
+        player1_games = scores['player1_games'].astype(np.intp)
+        player2_games = scores['player2_games'].astype(np.intp)
+        game_server = scores['game_server'].astype(np.intp)
+        tiebreak_set = scores['tiebreak_set'].astype(np.intp)
+
+        table_index = np.where(tiebreak_set, 2, np.where(scores['game_tiebreak'], 1, 0))
+        game = games[offsets[table_index] + scores['game_state']]
+
+        # Scores after the match has been won are clipped into the array, and replaced with the result below.
+        player1_won = player1_sets >= self._winning_num_sets
+        player2_won = player2_sets >= self._winning_num_sets
+        set_index = (
+            tiebreak_set,
+            np.minimum(player1_sets, self._winning_num_sets - 1),
+            np.minimum(player2_sets, self._winning_num_sets - 1),
+        )
+        probability = (
+            game * after_game[(*set_index, player1_games + 1, player2_games, game_server)]
+            + (1 - game) * after_game[(*set_index, player1_games, player2_games + 1, game_server)]
+        )
+        return np.where(player1_won, 1.0, np.where(player2_won, 0.0, probability))
+
+    def match(self, match: Match) -> float:
+        """
+        Returns the probability of player 1 winning a match from its current score.
+
+        :param match: match to find the probability for, which must have the same settings as the model.
+        :return: probability of player 1 winning the match.
+        """
+        if match.match_winner != Players.NONE.value:
+            return 1.0 if match.match_winner == Players.PLAYER_1.value else 0.0
+
+        current_set = match.set
+        return self.from_score(
+            match.player1_sets,
+            match.player2_sets,
+            current_set.player1_games,
+            current_set.player2_games,
+            current_set.server,
+            isinstance(current_set, TiebreakSet),
+            current_set.game.table,
+            current_set.game.state,
+        )
+
+
+@lru_cache(maxsize=64)
+def win_probability_model(
+        player1_serve: float,
+        player2_serve: float,
+        match_best_of: int = 3,
+        set_num_games: int = 6,
+        set_tiebreak_to: int = 7,
+        match_tiebreak: bool = False,
+        match_tiebreak_to: int = 10,
+) -> WinProbability:
+    """
+    Returns a shared model for the given serve probabilities and match settings, so memoised results are kept between calls.
+
+    :return: win probability model.
+    """
+    return WinProbability(player1_serve, player2_serve, match_best_of, set_num_games, set_tiebreak_to, match_tiebreak, match_tiebreak_to)
+
+
+def match_win_probability(match: Match, player1_serve: float, player2_serve: float) -> float:
+    """
+    Returns the probability of player 1 winning a match from its current score.
+
+    :param match: match to find the probability for.
+    :param player1_serve: probability of player 1 winning a point on their serve.
+    :param player2_serve: probability of player 2 winning a point on their serve.
+    :return: probability of player 1 winning the match.
+    """
+    model = win_probability_model(
+        player1_serve,
+        player2_serve,
+        match.match_best_of,
+        match.set_num_games,
+        match.set_tiebreak_to,
+        match.match_tiebreak,
+        match.match_tiebreak_to,
+    )
+    return model.match(match)
@@ -0,0 +1,23 @@
+import numpy as np
+
+from src.tennis import Match
+
+
+"""
+This file contains the replay engine, used to rebuild the state of a saved match from the winner of each of its points.
+"""
+
+
+def replay_winners(winners: np.ndarray, config: dict, scores: bool = False) -> tuple[Match, dict[str, np.ndarray]]:
+    """
+    Replays a match from the winner of each point, in a single pass over the winners.
+
+    :param winners: array of winner values for each point, in the order they were played.
+    :param config: match initial inputs, as given by Match.get_initial_inputs. Any additional keys, such as the match datetime, are ignored.
+    :param scores: boolean flag for whether to also return the full score before each point, keyed by the names in REPLAY_SCORE_COLUMNS.
+    :return: the match after all points have been added, and a dictionary of arrays with the score context before each point.
+        The arrays are keyed by their backend column name: set_id, game_id, point_id, server, side, break_point, set_point, match_point and winner.
+    """
+    match = Match.from_initial_inputs(config)
+    point_context = match._replay(winners, scores)
+    return match, point_context
@@ -0,0 +1,185 @@
+from functools import lru_cache
+
+import numpy as np
+
+from src.utils import Players, other_player
+
+
+"""
+This file contains the compiled scoring rules for each game format.
+Each format is compiled once into a state transition table, which is shared by the Game classes, the replay engine and any bulk simulation code.
+"""
+
+
+REGULAR_GAME_POINT_MAP: dict = {
+    -1: '',
+    0: '0',
+    1: '15',
+    2: '30',
+    3: '40',
+    4: 'AD'
+}
+
+
+class GameTable:
+    """
+    State transition table for a game format.
+
+    Each state is a (player 1 points, player 2 points, server) combination, indexed by state_index.
+    Regular games keep advantage scores folded as in the original scoring, so deuce is always 3-3 and advantage 4-3 or 3-4.
+    Tiebreaks are folded back to (tiebreak_to - 1) all whenever the score reaches tiebreak_to all, and the number of folds is tracked separately to give the full score.
+    """
+    def __init__(self, winning_num_points: int, tiebreak: bool):
+        self._winning_num_points: int = winning_num_points
+        self._tiebreak: bool = tiebreak
+        self._points_range: int = winning_num_points + 2
+
+        num_states = self._points_range * self._points_range * 2
+
+        next_state = [[0, 0, 0] for _ in range(num_states)]
+        fold = [[0, 0, 0] for _ in range(num_states)]
+        winner = [Players.NONE.value] * num_states
+        game_point = [Players.NONE.value] * num_states
+        break_point = [Players.NONE.value] * num_states
+        server = [Players.NONE.value] * num_states
+        side = [0] * num_states
+        player1_points = [0] * num_states
+        player2_points = [0] * num_states
+        score = [('', '')] * num_states
+
+        for points1 in range(self._points_range):
+            for points2 in range(self._points_range):
+                for state_server in (Players.PLAYER_1.value, Players.PLAYER_2.value):
+                    state = self.state_index(points1, points2, state_server)
+
+                    server[state] = state_server
+                    player1_points[state] = points1
+                    player2_points[state] = points2
+                    side[state] = (points1 + points2) % 2
+                    winner[state] = self._check_win(points1, points2)
+                    game_point[state] = self._game_point(points1, points2)
+                    break_point[state] = self._break_point(game_point[state], state_server)
+                    score[state] = self._score(points1, points2)
+
+                    if winner[state] != Players.NONE.value:
+                        next_state[state] = [state, state, state]
+                        continue
+
+                    for point_winner in (Players.PLAYER_1.value, Players.PLAYER_2.value):
+                        next_points1, next_points2, next_server, next_fold = self._add_point(points1, points2, state_server, point_winner)
+                        next_state[state][point_winner] = self.state_index(next_points1, next_points2, next_server)
+                        fold[state][point_winner] = next_fold
+
+        # Tuples are used for lookups on single points, and the equivalent numpy arrays for bulk lookups over many points or matches.
+        self.next_state: tuple[tuple[int, int, int], ...] = tuple(tuple(row) for row in next_state)
+        self.fold: tuple[tuple[int, int, int], ...] = tuple(tuple(row) for row in fold)
+        self.winner: tuple[int, ...] = tuple(winner)
+        self.game_point: tuple[int, ...] = tuple(game_point)
+        self.break_point: tuple[int, ...] = tuple(break_point)
+        self.server: tuple[int, ...] = tuple(server)
+        self.side: tuple[int, ...] = tuple(side)
+        self.player1_points: tuple[int, ...] = tuple(player1_points)
+        self.player2_points: tuple[int, ...] = tuple(player2_points)
+        self.score: tuple[tuple[str, str], ...] = tuple(score)
+
+        self.arrays: dict[str, np.ndarray] = {
+            'next_state': np.array(next_state, dtype=np.int16),
+            'fold': np.array(fold, dtype=np.int8),
+            'winner': np.array(winner, dtype=np.int8),
+            'game_point': np.array(game_point, dtype=np.int8),
+            'break_point': np.array(break_point, dtype=np.int8),
+            'server': np.array(server, dtype=np.int8),
+            'side': np.array(side, dtype=np.int8),
+            'player1_points': np.array(player1_points, dtype=np.int16),
+            'player2_points': np.array(player2_points, dtype=np.int16),
+        }
+
+    @property
+    def winning_num_points(self) -> int:
+        return self._winning_num_points
+
+    @property
+    def tiebreak(self) -> bool:
+        return self._tiebreak
+
+    @property
+    def num_states(self) -> int:
+        return len(self.winner)
+
+    def state_index(self, player1_points: int, player2_points: int, server: int) -> int:
+        return (player1_points * self._points_range + player2_points) * 2 + server - 1
+
+    def initial_state(self, server: int) -> int:
+        return self.state_index(0, 0, server)
+
+    def _add_point(self, points1: int, points2: int, server: int, winner: int) -> tuple[int, int, int, int]:
+        fold = 0
+        if winner == Players.PLAYER_1.value:
+            if not self._tiebreak and points1 == self._winning_num_points - 1 and points2 == self._winning_num_points:
+                points2 -= 1
+            else:
+                points1 += 1
+        else:
+            if not self._tiebreak and points1 == self._winning_num_points and points2 == self._winning_num_points - 1:
+                points1 -= 1
+            else:
+                points2 += 1
+
+        if self._tiebreak:
+            if (points1 + points2) % 2 == 1:
+                server = other_player(server)
+            if points1 == self._winning_num_points and points2 == self._winning_num_points:
+                points1, points2, fold = points1 - 1, points2 - 1, 1
+
+        return points1, points2, server, fold
+
+    def _check_win(self, points1: int, points2: int) -> int:
+        if points1 >= self._winning_num_points and points1 - points2 > 1:
+            return Players.PLAYER_1.value
+        elif points2 >= self._winning_num_points and points2 - points1 > 1:
+            return Players.PLAYER_2.value
+        return Players.NONE.value
+
+    def _game_point(self, points1: int, points2: int) -> int:
+        if points1 >= self._winning_num_points - 1 and points1 > points2:
+            return Players.PLAYER_1.value
+        elif points2 >= self._winning_num_points - 1 and points2 > points1:
+            return Players.PLAYER_2.value
+        return Players.NONE.value
+
+    def _break_point(self, game_point: int, server: int) -> int:
+        if self._tiebreak or game_point == server:
+            return Players.NONE.value
+        return game_point
+
+    def _score(self, points1: int, points2: int) -> tuple[str, str]:
+        if self._tiebreak:
+            return str(points1), str(points2)
+        if points1 > self._winning_num_points or points2 > self._winning_num_points:
+            return '', ''
+        if points1 == self._winning_num_points and points2 == self._winning_num_points - 1:
+            return REGULAR_GAME_POINT_MAP[points1], REGULAR_GAME_POINT_MAP[-1]
+        if points1 == self._winning_num_points - 1 and points2 == self._winning_num_points:
+            return REGULAR_GAME_POINT_MAP[-1], REGULAR_GAME_POINT_MAP[points2]
+        return REGULAR_GAME_POINT_MAP.get(points1, ''), REGULAR_GAME_POINT_MAP.get(points2, '')
+
+
+@lru_cache(maxsize=None)
+def regular_game_table() -> GameTable:
+    """
+    Returns the compiled table for a regular game, compiling it on first use.
+
+    :return: game table for a regular game.
+    """
+    return GameTable(winning_num_points=4, tiebreak=False)
+
+
+@lru_cache(maxsize=None)
+def tiebreak_game_table(tiebreak_to: int) -> GameTable:
+    """
+    Returns the compiled table for a tiebreak to the given number of points, compiling it on first use.
+
+    :param tiebreak_to: number of points needed to win the tiebreak.
+    :return: game table for the tiebreak.
+    """
+    return GameTable(winning_num_points=tiebreak_to, tiebreak=True)
@@ -0,0 +1,282 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+import numpy as np
+
+from src.scoring import regular_game_table, tiebreak_game_table
+from src.tennis import Match, TiebreakSet
+from src.utils import Players
+
+
+"""
+This file contains the Monte Carlo match simulator, which plays out many matches at once from any match score.
+Each simulated match is a row in NumPy arrays of scores, and every step plays one point of every unfinished match.
+Games are scored with the same game tables as the Game classes, and sets and matches with the same rules as the Set and Match classes.
+"""
+
+
+# Matches are simulated in chunks of this size, each with its own seed, so results do not depend on the number of processes.
+MATCHES_PER_CHUNK = 65_536
+
+BREAK_POINT_BITS = 32
+BREAK_POINT_MASK = (1 << BREAK_POINT_BITS) - 1
+
+# Positions of the game tables in the combined table.
+REGULAR_TABLE, SET_TIEBREAK_TABLE, MATCH_TIEBREAK_TABLE = 0, 1, 2
+
+SIMULATION_RESULTS: tuple[str, ...] = (
+    'winner',
+    'points',
+    'player1_sets',
+    'player2_sets',
+    'deciding_set',
+    'player1_break_points_faced',
+    'player2_break_points_faced',
+)
+
+
+def _combined_tables(settings: tuple) -> dict[str, np.ndarray]:
+    """
+    Joins the regular, set tiebreak and match tiebreak game tables into one table, so matches in different games can be stepped together.
+
+    :param settings: match settings, as given by _settings.
+    :return: combined table arrays, with next states offset to index the combined table, and the offset of each game table.
+    """
+    _, _, set_tiebreak_to, _, match_tiebreak_to = settings
+    tables = (regular_game_table(), tiebreak_game_table(set_tiebreak_to), tiebreak_game_table(match_tiebreak_to))
+    offsets = np.cumsum([0] + [table.num_states for table in tables])[:-1]
+
+    return {
+        'next_state': np.concatenate([table.arrays['next_state'].astype(np.int32) + offset for table, offset in zip(tables, offsets)]),
+        'winner': np.concatenate([table.arrays['winner'] for table in tables]),
+        'break_point': np.concatenate([table.arrays['break_point'] for table in tables]),
+        'server': np.concatenate([table.arrays['server'] for table in tables]),
+        'offsets': offsets.astype(np.int32),
+    }
+
+
+def _settings(match: Match) -> tuple:
+    return match.winning_num_sets, match.set_num_games, match.set_tiebreak_to, match.match_tiebreak, match.match_tiebreak_to
+
+
+def _start_score(match: Match) -> tuple:
+    # Plain values for the current score, which are sent to worker processes in place of the match and its undo history.
+    current_set = match.set
+    tiebreak_set = isinstance(current_set, TiebreakSet)
+    if tiebreak_set:
+        table_index = MATCH_TIEBREAK_TABLE
+    elif current_set.game.table.tiebreak:
+        table_index = SET_TIEBREAK_TABLE
+    else:
+        table_index = REGULAR_TABLE
+    return (
+        match.player1_sets,
+        match.player2_sets,
+        current_set.player1_games,
+        current_set.player2_games,
+        current_set.server,
+        tiebreak_set,
+        table_index,
+        current_set.game.state,
+    )
+
+
+def _simulate_chunk(args: tuple) -> dict[str, np.ndarray]:
+    """
+    Simulates a chunk of matches from the same score, which runs in a worker process when a process pool is used.
+
+    :param args: match settings, start score, serve probabilities, number of matches and seed.
+    :return: array of results for each match, keyed by the names in SIMULATION_RESULTS.
+    """
+    settings, start_score, player1_serve, player2_serve, num_matches, seed = args
+    winning_num_sets, num_games, _, match_tiebreak, _ = settings
+    player1_sets, player2_sets, player1_games, player2_games, set_server, tiebreak_set, table_index, state = start_score
+
+    rng = np.random.default_rng(seed)
+    tables = _combined_tables(settings)
+    game_winner_of, offsets = tables['winner'], tables['offsets']
+    player1, player2 = Players.PLAYER_1.value, Players.PLAYER_2.value
+
+    # Each point only needs the probability of the server winning it, and the next state for each outcome, indexed by state * 2 + server wins.
+    server = tables['server'].astype(np.intp)
+    server_probability = np.array([0.0, player1_serve, player2_serve], dtype=np.float32)[server]
+    next_state = tables['next_state'][np.arange(server.shape[0])[:, None], np.stack([3 - server, server], axis=1)].ravel()
+
+    # Break points faced are counted for both players in one value, with player 2 in the upper bits.
+    break_point = tables['break_point'] != Players.NONE.value
+    break_point_faced = np.where(break_point, np.where(server == player1, 1, 1 << BREAK_POINT_BITS), 0).astype(np.int64)
+
+    # Score of each unfinished match, which are removed from the arrays as they finish.
+    match_index = np.arange(num_matches)
+    state = np.full(num_matches, offsets[table_index] + state, dtype=np.int32)
+    sets1 = np.full(num_matches, player1_sets, dtype=np.int16)
+    sets2 = np.full(num_matches, player2_sets, dtype=np.int16)
+    games1 = np.full(num_matches, player1_games, dtype=np.int16)
+    games2 = np.full(num_matches, player2_games, dtype=np.int16)
+    set_servers = np.full(num_matches, set_server, dtype=np.int8)
+    tiebreak_sets = np.full(num_matches, tiebreak_set, dtype=bool)
+    faced = np.zeros(num_matches, dtype=np.int64)
+
+    results = {
+        'winner': np.zeros(num_matches, dtype=np.int8),
+        'points': np.zeros(num_matches, dtype=np.int32),
+        'player1_sets': np.zeros(num_matches, dtype=np.int16),
+        'player2_sets': np.zeros(num_matches, dtype=np.int16),
+        'deciding_set': np.zeros(num_matches, dtype=bool),
+        'player1_break_points_faced': np.zeros(num_matches, dtype=np.int32),
+        'player2_break_points_faced': np.zeros(num_matches, dtype=np.int32),
+    }
+
+    # Every match starts at the same score, so the number of points played by each unfinished match is the number of steps.
+    points = 0
+    while match_index.shape[0]:
+        # Point.
+        faced += break_point_faced[state]
+        server_wins = rng.random(state.shape[0], dtype=np.float32) < server_probability[state]
+        state = next_state[state * 2 + server_wins]
+        points += 1
+
+        game_winner = game_winner_of[state]
+        ended = np.flatnonzero(game_winner)
+        if not ended.shape[0]:
+            continue
+
+        # Game.
+        game_winner = game_winner[ended]
+        g1 = games1[ended] + (game_winner == player1)
+        g2 = games2[ended] + (game_winner == player2)
+        next_server = 3 - set_servers[ended]
+        tiebreak = tiebreak_sets[ended]
+
+        # Set, following RegularSet._check_win and TiebreakSet._check_win.
+        game_difference = np.abs(g1 - g2)
+        regular_winner = np.where(
+            ((g1 == num_games) & (game_difference > 1)) | (g1 == num_games + 1),
+            player1,
+            np.where(((g2 == num_games) & (game_difference > 1)) | (g2 == num_games + 1), player2, Players.NONE.value),
+        )
+        tiebreak_winner = np.where(g1 > g2, player1, np.where(g2 > g1, player2, Players.NONE.value))
+        set_winner = np.where(tiebreak, tiebreak_winner, regular_winner)
+        set_won = set_winner != Players.NONE.value
+
+        s1 = sets1[ended] + (set_winner == player1)
+        s2 = sets2[ended] + (set_winner == player2)
+        g1[set_won], g2[set_won] = 0, 0
+        tiebreak = np.where(set_won, match_tiebreak & (s1 == winning_num_sets - 1) & (s2 == winning_num_sets - 1), tiebreak)
+
+        # Next game, starting with the other player serving.
+        next_table = np.where(
+            tiebreak,
+            MATCH_TIEBREAK_TABLE,
+            np.where((g1 == num_games) & (g2 == num_games), SET_TIEBREAK_TABLE, REGULAR_TABLE),
+        )
+        state[ended] = offsets[next_table] + next_server - 1
+
+        sets1[ended], sets2[ended], games1[ended], games2[ended] = s1, s2, g1, g2
+        set_servers[ended], tiebreak_sets[ended] = next_server, tiebreak
+
+        # Match.
+        match_won = (s1 == winning_num_sets) | (s2 == winning_num_sets)
+        if not match_won.any():
+            continue
+
+        finished = ended[match_won]
+        finished_index = match_index[finished]
+        results['winner'][finished_index] = np.where(s1[match_won] == winning_num_sets, player1, player2)
+        results['points'][finished_index] = points
+        results['player1_sets'][finished_index] = s1[match_won]
+        results['player2_sets'][finished_index] = s2[match_won]
+        results['deciding_set'][finished_index] = s1[match_won] + s2[match_won] == 2 * winning_num_sets - 1
+        results['player1_break_points_faced'][finished_index] = faced[finished] & BREAK_POINT_MASK
+        results['player2_break_points_faced'][finished_index] = faced[finished] >> BREAK_POINT_BITS
+
+        playing = np.ones(match_index.shape[0], dtype=bool)
+        playing[finished] = False
+        match_index, state, sets1, sets2, games1, games2, set_servers, tiebreak_sets, faced = (
+            values[playing] for values in (match_index, state, sets1, sets2, games1, games2, set_servers, tiebreak_sets, faced)
+        )
+
+    return results
+
+
+def simulate_matches(
+        match: Match,
+        player1_serve: float,
+        player2_serve: float,
+        num_matches: int,
+        seed: int or None = None,
+        max_workers: int = 1,
+) -> dict[str, np.ndarray]:
+    """
+    Simulates many matches from the current score of a match, with each player winning points on their serve with a fixed probability.
+    Matches are split into chunks, each with its own seed spawned from the given seed, so the results do not depend on the number of processes.
+
+    :param match: match to simulate from, which is not changed.
+    :param player1_serve: probability of player 1 winning a point on their serve, strictly between 0 and 1.
+    :param player2_serve: probability of player 2 winning a point on their serve, strictly between 0 and 1.
+    :param num_matches: number of matches to simulate.
+    :param seed: seed for the random number generator.
+    :param max_workers: number of processes to use, where None uses the number of CPUs and 1 simulates the matches in the current process.
+    :return: array of results for each simulated match, keyed by the names in SIMULATION_RESULTS.
+        Points and break points faced are counted from the current score.
+    """
+    for name, probability in (('player1_serve', player1_serve), ('player2_serve', player2_serve)):
+        # Probabilities of exactly 0 or 1 can make a tiebreak endless, as every point is won by the server or every point by the returner.
+        # Points are drawn in single precision, so probabilities which round to 0 or 1 are rejected too.
+        if not 0 < np.float32(probability) < 1:
+            raise ValueError(f"Probability {name} of {probability} is invalid.")
+    if num_matches < 1:
+        raise ValueError(f"Number of matches {num_matches} is invalid.")
+
+    if match.match_winner != Players.NONE.value:
+        return {
+            'winner': np.full(num_matches, match.match_winner, dtype=np.int8),
+            'points': np.zeros(num_matches, dtype=np.int32),
+            'player1_sets': np.full(num_matches, match.player1_sets, dtype=np.int16),
+            'player2_sets': np.full(num_matches, match.player2_sets, dtype=np.int16),
+            'deciding_set': np.full(num_matches, match.player1_sets + match.player2_sets == 2 * match.winning_num_sets - 1),
+            'player1_break_points_faced': np.zeros(num_matches, dtype=np.int32),
+            'player2_break_points_faced': np.zeros(num_matches, dtype=np.int32),
+        }
+
+    settings = _settings(match)
+    start_score = _start_score(match)
+    chunk_sizes = [min(MATCHES_PER_CHUNK, num_matches - start) for start in range(0, num_matches, MATCHES_PER_CHUNK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    chunks = [
+        (settings, start_score, player1_serve, player2_serve, chunk_size, chunk_seed)
+        for chunk_size, chunk_seed in zip(chunk_sizes, seeds)
+    ]
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(chunks)))
+
+    if max_workers == 1:
+        results = [_simulate_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_simulate_chunk, chunks))
+
+    return {name: np.concatenate([result[name] for result in results]) for name in SIMULATION_RESULTS}
+
+
+def summarise_simulations(match: Match, results: dict[str, np.ndarray]) -> dict[str, float]:
+    """
+    Summarises simulated matches into the chances and averages shown to coaches.
+
+    :param match: match the simulations were run from.
+    :param results: results from simulate_matches.
+    :return: dictionary of summary values.
+        Match length includes the points already played, and break points faced are counted from the current score.
+    """
+    points_played = match.point_number - 1
+    return {
+        'player1_win': float(np.mean(results['winner'] == Players.PLAYER_1.value)),
+        'player2_win': float(np.mean(results['winner'] == Players.PLAYER_2.value)),
+        'deciding_set': float(np.mean(results['deciding_set'])),
+        'mean_match_points': float(points_played + np.mean(results['points'])),
+        'median_match_points': float(points_played + np.median(results['points'])),
+        'player1_mean_break_points_faced': float(np.mean(results['player1_break_points_faced'])),
+        'player2_mean_break_points_faced': float(np.mean(results['player2_break_points_faced'])),
+    }
@@ -0,0 +1,219 @@
+import numpy as np
+import pandas as pd
+
+from src.utils import (
+    Players, Serve, ServeType, ServeTarget, NetApproachType, RallyLength, FinalShot, FinalShotHand, FinalShotType, other_player
+)
+
+
+"""
+This file contains the match statistics accumulator, which keeps running counts of point attributes for each set.
+The counts are updated as each point is recorded, so statistics can be shown without rescanning the match data.
+Counts for many points at once, such as a loaded match, are built in a single vectorised pass over the point columns.
+"""
+
+
+# Number of values for each counted column, including 0 for a missing value.
+STAT_DIMENSIONS: dict[str, int] = {
+    'server': len(Players),
+    'winner': len(Players),
+    'break_point': len(Players),
+    'set_point': len(Players),
+    'match_point': len(Players),
+    'serve': len(Serve) + 1,
+    'serve_type': len(ServeType) + 1,
+    'serve_target': len(ServeTarget) + 1,
+    'net_approach': 2,
+    'first_net_approacher': len(Players),
+    'net_approach_type': len(NetApproachType) + 1,
+    'rally_length': len(RallyLength) + 1,
+    'final_shot': len(FinalShot) + 1,
+    'final_shot_hand': len(FinalShotHand) + 1,
+    'final_shot_type': len(FinalShotType) + 1,
+}
+
+# Columns counted together in each table. Every table is also split by set.
+STAT_TABLES: dict[str, tuple[str, ...]] = {
+    'pressure': ('server', 'winner', 'break_point', 'set_point', 'match_point'),
+    'serve': ('server', 'winner', 'serve', 'serve_type', 'serve_target'),
+    'net': ('server', 'winner', 'net_approach', 'first_net_approacher', 'net_approach_type'),
+    'rally': ('server', 'winner', 'rally_length'),
+    'final_shot': ('winner', 'final_shot', 'final_shot_hand', 'final_shot_type'),
+}
+
+STAT_COLUMNS: tuple[str, ...] = ('set_id', *STAT_DIMENSIONS)
+
+FIRST_SERVES: list[int] = [Serve.ACE.value, Serve.FIRST_SERVE.value]
+
+OVERVIEW_STATS: tuple[str, ...] = (
+    'all_points',
+    'points_won',
+    'points_lost',
+    'break_points',
+    'break_points_won',
+    'set_points',
+    'set_points_won',
+    'match_points',
+    'match_points_won',
+    'serves',
+    'returns',
+    'aces',
+    'first_serves',
+    'second_serves',
+    'double_faults',
+    'serve_points_won',
+    'first_serve_points_won',
+    'second_serve_points_won',
+    'winners',
+    'errors',
+    'unforced_errors',
+    'net_approach_points',
+    'net_approach_points_won',
+)
+
+
+class MatchStats:
+    def __init__(self, num_sets: int = 5):
+        # Set ids start at 1, so index 0 of the set axis is unused.
+        self._counts: dict[str, np.ndarray] = {
+            table: np.zeros((num_sets + 1, *(STAT_DIMENSIONS[column] for column in columns)), dtype=np.int64)
+            for table, columns in STAT_TABLES.items()
+        }
+
+    @property
+    def set_ids(self) -> list[int]:
+        """
+        Returns the ids of sets containing at least one point.
+        """
+        points_per_set = self._counts['rally'].reshape(self._counts['rally'].shape[0], -1).sum(axis=1)
+        return [int(set_id) for set_id in np.flatnonzero(points_per_set)]
+
+    def _grow(self, set_id: int) -> None:
+        for table, counts in self._counts.items():
+            grown = np.zeros((set_id + 1, *counts.shape[1:]), dtype=counts.dtype)
+            grown[:counts.shape[0]] = counts
+            self._counts[table] = grown
+
+    def add(self, values: dict, count: int = 1) -> None:
+        """
+        Adds a single point to the counts.
+
+        :param values: value for each column in STAT_COLUMNS, keyed by column name, using 0 for missing values.
+        :param count: amount to add to each count, where -1 removes a previously added point.
+        """
+        set_id = values['set_id']
+        if set_id >= self._counts['rally'].shape[0]:
+            self._grow(set_id)
+
+        for table, columns in STAT_TABLES.items():
+            self._counts[table][(set_id, *(values[column] for column in columns))] += count
+
+    def add_columns(self, columns: dict[str, np.ndarray], count: int = 1) -> None:
+        """
+        Adds many points to the counts, counting each table in one pass with np.bincount.
+
+        :param columns: array for each column in STAT_COLUMNS, keyed by column name, using 0 for missing values.
+        :param count: amount to add to each count, where -1 removes previously added points.
+        """
+        set_ids = np.asarray(columns['set_id'], dtype=np.intp)
+        if set_ids.size == 0:
+            return
+        if set_ids.max() >= self._counts['rally'].shape[0]:
+            self._grow(int(set_ids.max()))
+
+        for table, table_columns in STAT_TABLES.items():
+            counts = self._counts[table]
+            codes = np.ravel_multi_index(
+                (set_ids, *(np.asarray(columns[column], dtype=np.intp) for column in table_columns)),
+                counts.shape,
+            )
+            counts += count * np.bincount(codes, minlength=counts.size).reshape(counts.shape)
+
+    @classmethod
+    def from_columns(cls, columns: dict[str, np.ndarray]) -> 'MatchStats':
+        """
+        Creates the statistics for many points.
+
+        :param columns: array for each column in STAT_COLUMNS, keyed by column name, using 0 for missing values.
+        :return: statistics for the given points.
+        """
+        stats = cls()
+        stats.add_columns(columns)
+        return stats
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame) -> 'MatchStats':
+        """
+        Creates the statistics for a DataFrame in the backend format, such as a loaded match file or archive.
+
+        :param df: DataFrame containing the backend columns.
+        :return: statistics for every row of the DataFrame.
+        """
+        return cls.from_columns({column: df[column].fillna(0).to_numpy(dtype=np.int64) for column in STAT_COLUMNS})
+
+    def counts(self, table: str, sets: list[int] or None = None) -> np.ndarray:
+        """
+        Returns the counts for a table, summed over the given sets.
+
+        :param table: name of the table in STAT_TABLES.
+        :param sets: ids of the sets to include, or None to include all sets.
+        :return: array of counts, with one axis for each column of the table.
+        """
+        counts = self._counts[table]
+        if sets is None:
+            return counts.sum(axis=0)
+        set_ids = [set_id for set_id in sets if 0 < set_id < counts.shape[0]]
+        return counts[set_ids].sum(axis=0)
+
+    def overview_table(self, sets: list[int] or None = None) -> pd.DataFrame:
+        """
+        Returns the counts shown on the overview for both players.
+
+        :param sets: ids of the sets to include, or None to include all sets.
+        :return: DataFrame of counts, indexed by the names in OVERVIEW_STATS, with a column for each Players enum value.
+        """
+        tables = {table: self.counts(table, sets) for table in STAT_TABLES}
+        table = pd.DataFrame(
+            {
+                player.value: [int(count) for count in _overview_counts(tables, player.value)]
+                for player in (Players.PLAYER_1, Players.PLAYER_2)
+            },
+            index=pd.Index(OVERVIEW_STATS, name='stat'),
+        )
+        table.columns.name = 'player'
+        return table
+
+
+def _overview_counts(tables: dict[str, np.ndarray], player: int) -> tuple:
+    opponent = other_player(player)
+    pressure = tables['pressure']
+    serve = tables['serve']
+    net = tables['net']
+    final_shot = tables['final_shot']
+
+    # Values are in the order of OVERVIEW_STATS.
+    return (
+        pressure.sum(),
+        pressure[:, player].sum(),
+        pressure[:, opponent].sum(),
+        pressure[:, :, player].sum(),
+        pressure[:, player, player].sum(),
+        pressure[:, :, :, player].sum(),
+        pressure[:, player, :, player].sum(),
+        pressure[:, :, :, :, player].sum(),
+        pressure[:, player, :, :, player].sum(),
+        serve[player].sum(),
+        serve[opponent].sum(),
+        serve[player, :, Serve.ACE.value].sum(),
+        serve[player, :, FIRST_SERVES].sum(),
+        serve[player, :, Serve.SECOND_SERVE.value].sum(),
+        serve[player, :, Serve.DOUBLE_FAULT.value].sum(),
+        serve[player, player].sum(),
+        serve[player, player, FIRST_SERVES].sum(),
+        serve[player, player, Serve.SECOND_SERVE.value].sum(),
+        final_shot[player, FinalShot.WINNER.value].sum(),
+        final_shot[opponent, FinalShot.ERROR.value].sum(),
+        final_shot[opponent, FinalShot.UNFORCED_ERROR.value].sum(),
+        net[:, :, 1, player].sum(),
+        net[:, player, 1, player].sum(),
+    )
@@ -0,0 +1,258 @@
+from contextlib import closing
+import json
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src.point_log import OPTIONAL_COLUMNS, POINT_LOG_DTYPES, PointLog
+from src.utils import Players, Serve
+
+
+"""
+This file contains the match store, which keeps a persistent library of matches in a local SQLite database.
+Each match has one row of metadata, and its points are kept in a typed table keyed by match and point uuid,
+so queries across matches and players are answered by the database rather than by re-reading match files.
+"""
+
+
+DEFAULT_STORE_PATH = os.environ.get('TENNIS_TRACKER_STORE', os.path.join('data', 'tennis_tracker.db'))
+
+# Columns of the matches table, which are the keys of Match.get_initial_inputs and the match datetime.
+MATCH_COLUMNS: dict[str, str] = {
+    'player1_name': 'TEXT NOT NULL',
+    'player2_name': 'TEXT NOT NULL',
+    'server': 'INTEGER NOT NULL',
+    'match_best_of': 'INTEGER NOT NULL',
+    'set_num_games': 'INTEGER NOT NULL',
+    'set_tiebreak_to': 'INTEGER NOT NULL',
+    'match_tiebreak': 'INTEGER NOT NULL',
+    'match_tiebreak_to': 'INTEGER NOT NULL',
+    'datetime': 'TEXT NOT NULL',
+}
+
+# Point columns are stored as integers, with point_datetime in nanoseconds since the epoch in UTC, and missing optional values as NULL.
+POINT_COLUMNS: tuple[str, ...] = tuple(POINT_LOG_DTYPES)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS matches (
+    match_id INTEGER PRIMARY KEY,
+    {', '.join(f'{name} {definition}' for name, definition in MATCH_COLUMNS.items())},
+    metadata TEXT NOT NULL,
+    UNIQUE (player1_name, player2_name, datetime)
+);
+CREATE TABLE IF NOT EXISTS points (
+    match_id INTEGER NOT NULL REFERENCES matches (match_id) ON DELETE CASCADE,
+    point_uuid TEXT NOT NULL,
+    {', '.join(f'{name} INTEGER{"" if name in OPTIONAL_COLUMNS else " NOT NULL"}' for name in POINT_COLUMNS)},
+    PRIMARY KEY (match_id, point_uuid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS points_match_set_game ON points (match_id, set_id, game_id);
+CREATE INDEX IF NOT EXISTS points_server ON points (server);
+CREATE INDEX IF NOT EXISTS points_winner ON points (winner);
+CREATE INDEX IF NOT EXISTS matches_player1 ON matches (player1_name);
+CREATE INDEX IF NOT EXISTS matches_player2 ON matches (player2_name);
+"""
+
+# Points of the matches a player played in, with the player's number in each match.
+PLAYER_POINTS_SQL = f"""
+SELECT points.*, CASE WHEN matches.player1_name = :player_name THEN {Players.PLAYER_1.value} ELSE {Players.PLAYER_2.value} END AS player
+FROM points JOIN matches USING (match_id)
+WHERE matches.player1_name = :player_name OR matches.player2_name = :player_name
+"""
+
+
+class MatchStore:
+    """
+    Library of matches in a SQLite database file.
+    A connection is opened for each operation, so a store can be shared between the threads running Streamlit sessions.
+    """
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self._path: str = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as connection:
+            connection.executescript(SCHEMA)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self._path)
+        connection.execute('PRAGMA foreign_keys = ON')
+        connection.execute('PRAGMA journal_mode = WAL')
+        connection.execute('PRAGMA synchronous = NORMAL')
+        return connection
+
+    def save_match(self, point_log: PointLog) -> int:
+        """
+        Saves a match and all of its points in a single transaction.
+        A match with the same players and datetime is replaced, so a match being tracked can be saved again as more points are added.
+
+        :param point_log: point log for the match, with the match metadata.
+        :return: id of the match in the store.
+        """
+        return self.save_matches([point_log])[0]
+
+    def save_matches(self, point_logs: list[PointLog]) -> list[int]:
+        """
+        Bulk saves matches and all of their points in a single transaction, such as the matches of a loaded archive.
+        Matches with the same players and datetime as a stored match replace it.
+
+        :param point_logs: point log for each match, with the match metadata.
+        :return: id of each match in the store.
+        """
+        match_ids = []
+        with closing(self._connect()) as connection, connection:
+            for point_log in point_logs:
+                match_id = self._upsert_match(connection, point_log.metadata)
+                self._insert_points(connection, match_id, point_log)
+                match_ids.append(match_id)
+        return match_ids
+
+    @staticmethod
+    def _upsert_match(connection: sqlite3.Connection, metadata: dict) -> int:
+        """
+        Inserts the metadata row of a match, or updates the row of the stored match with the same players and datetime and removes its points.
+        """
+        missing_keys = [key for key in MATCH_COLUMNS if key not in metadata]
+        if missing_keys:
+            raise ValueError(f"Match metadata is missing keys {missing_keys}.")
+
+        match_values = {key: metadata[key] for key in MATCH_COLUMNS}
+        match_values['match_tiebreak'] = int(match_values['match_tiebreak'])
+
+        row = connection.execute(
+            'SELECT match_id FROM matches WHERE player1_name = ? AND player2_name = ? AND datetime = ?',
+            (match_values['player1_name'], match_values['player2_name'], match_values['datetime']),
+        ).fetchone()
+        if row is None:
+            return connection.execute(
+                f"INSERT INTO matches ({', '.join(match_values)}, metadata) VALUES ({', '.join('?' for _ in match_values)}, ?)",
+                (*match_values.values(), json.dumps(metadata)),
+            ).lastrowid
+
+        match_id = row[0]
+        connection.execute('DELETE FROM points WHERE match_id = ?', (match_id,))
+        connection.execute(
+            f"UPDATE matches SET {', '.join(f'{key} = ?' for key in match_values)}, metadata = ? WHERE match_id = ?",
+            (*match_values.values(), json.dumps(metadata), match_id),
+        )
+        return match_id
+
+    @staticmethod
+    def _insert_points(connection: sqlite3.Connection, match_id: int, point_log: PointLog) -> None:
+        """
+        Inserts all points of a match with a single executemany call, building the rows from whole columns rather than point by point.
+        """
+        num_points = len(point_log)
+        columns = [np.full(num_points, match_id, dtype=np.int64).tolist(), point_log.point_uuids().to_pylist()]
+        for name in POINT_COLUMNS:
+            values = point_log.column(name)
+            if name in OPTIONAL_COLUMNS:
+                columns.append(np.where(values == 0, None, values.astype(object)).tolist())
+            else:
+                columns.append(values.astype(np.int64).tolist())
+
+        connection.executemany(
+            f"INSERT INTO points (match_id, point_uuid, {', '.join(POINT_COLUMNS)}) VALUES ({', '.join('?' for _ in range(len(columns)))})",
+            zip(*columns),
+        )
+
+    def load_match(self, match_id: int) -> PointLog:
+        """
+        Loads a match from the store.
+
+        :param match_id: id of the match in the store.
+        :return: point log for the match, including its metadata.
+        """
+        with closing(self._connect()) as connection:
+            row = connection.execute('SELECT metadata FROM matches WHERE match_id = ?', (match_id,)).fetchone()
+            if row is None:
+                raise ValueError(f"Match id {match_id} is not in the store.")
+            rows = connection.execute(
+                f"SELECT {', '.join(f'coalesce({name}, 0)' for name in POINT_COLUMNS)} FROM points WHERE match_id = ? ORDER BY point_id",
+                (match_id,),
+            ).fetchall()
+
+        values = np.array(rows, dtype=np.int64).reshape(-1, len(POINT_COLUMNS))
+        columns = {name: values[:, column] for column, name in enumerate(POINT_COLUMNS)}
+        return PointLog.from_columns(columns, json.loads(row[0]))
+
+    def delete_match(self, match_id: int) -> None:
+        """
+        Removes a match and its points from the store.
+
+        :param match_id: id of the match in the store.
+        """
+        with closing(self._connect()) as connection, connection:
+            connection.execute('DELETE FROM matches WHERE match_id = ?', (match_id,))
+
+    def matches(self, player_name: str or None = None) -> pd.DataFrame:
+        """
+        Lists the matches in the store, with the number of points saved for each.
+
+        :param player_name: name of a player to only list their matches, or None to list all matches.
+        :return: DataFrame of match metadata and number of points, indexed by match_id, with the latest matches first.
+        """
+        query = f"""
+            SELECT matches.match_id, {', '.join(f'matches.{name}' for name in MATCH_COLUMNS)},
+                (SELECT count(*) FROM points WHERE points.match_id = matches.match_id) AS num_points
+            FROM matches
+            {'WHERE player1_name = :player_name OR player2_name = :player_name' if player_name is not None else ''}
+            ORDER BY datetime DESC
+        """
+        with closing(self._connect()) as connection:
+            matches = pd.read_sql_query(query, connection, params={'player_name': player_name}, index_col='match_id')
+        matches['match_tiebreak'] = matches['match_tiebreak'].astype(bool)
+        return matches
+
+    def player_points(self, player_name: str) -> pd.DataFrame:
+        """
+        Returns the points of every match a player played in, across the whole store.
+
+        :param player_name: name of the player.
+        :return: DataFrame with the stored point columns, the match_id, and the player column with the Players enum value of the player in each match.
+            Missing optional values are returned as missing values of nullable integer columns.
+        """
+        with closing(self._connect()) as connection:
+            points = pd.read_sql_query(PLAYER_POINTS_SQL, connection, params={'player_name': player_name})
+        for name in OPTIONAL_COLUMNS:
+            points[name] = points[name].astype('Int8')
+        points['point_datetime'] = pd.to_datetime(points['point_datetime'], utc=True)
+        return points
+
+    def player_summary(self, player_name: str) -> pd.DataFrame:
+        """
+        Counts the main statistics of a player in each of their matches, with the counting done by the database.
+        Statistics have the same names and definitions as in MatchStats.overview_table, with return_points_won added.
+
+        :param player_name: name of the player.
+        :return: DataFrame of counts indexed by match_id, with the opponent and match datetime, with the latest matches first.
+        """
+        query = f"""
+            WITH player_points AS ({PLAYER_POINTS_SQL})
+            SELECT
+                p.match_id,
+                CASE WHEN p.player = {Players.PLAYER_1.value} THEN m.player2_name ELSE m.player1_name END AS opponent,
+                m.datetime,
+                count(*) AS all_points,
+                sum(p.winner = p.player) AS points_won,
+                sum(p.winner != p.player) AS points_lost,
+                sum(p.break_point = p.player) AS break_points,
+                sum(p.break_point = p.player AND p.winner = p.player) AS break_points_won,
+                sum(p.server = p.player) AS serves,
+                sum(p.server != p.player) AS returns,
+                sum(p.server = p.player AND p.serve = {Serve.ACE.value}) AS aces,
+                sum(p.server = p.player AND p.serve = {Serve.DOUBLE_FAULT.value}) AS double_faults,
+                sum(p.server = p.player AND p.winner = p.player) AS serve_points_won,
+                sum(p.server != p.player AND p.winner = p.player) AS return_points_won
+            FROM player_points AS p JOIN matches AS m USING (match_id)
+            GROUP BY p.match_id
+            ORDER BY m.datetime DESC
+        """
+        with closing(self._connect()) as connection:
+            return pd.read_sql_query(query, connection, params={'player_name': player_name}, index_col='match_id')
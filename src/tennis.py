@@ -1,75 +1,97 @@
 from abc import ABC, abstractmethod
 
+import numpy as np
+
 from src.player import Player
+from src.scoring import GameTable, regular_game_table, tiebreak_game_table
 from src.utils import Players, MatchSections, other_player
 
 
+# Score context before each point, in the fields recorded by the backend data.
+POINT_CONTEXT_DTYPE = np.dtype([
+    ('set_id', np.int16),
+    ('game_id', np.int32),
+    ('point_id', np.int32),
+    ('match_point', np.int8),
+    ('set_point', np.int8),
+    ('break_point', np.int8),
+    ('server', np.int8),
+    ('side', np.int8),
+    ('winner', np.int8),
+])
+
+# Full score before each point, returned by Match._replay when scores are requested.
+REPLAY_SCORE_COLUMNS: tuple[str, ...] = (
+    'player1_sets',
+    'player2_sets',
+    'player1_games',
+    'player2_games',
+    'game_server',
+    'tiebreak_set',
+    'game_tiebreak',
+    'game_state',
+)
+
+
 class Game(ABC):
-    def __init__(self, server: int):
-        self._server: int = server
-        self._player1_points: int = 0
-        self._player2_points: int = 0
-        self._score_difference: int = 0
+    __slots__ = ('_table', '_state', '_folds')
+
+    def __init__(self, server: int, table: GameTable):
+        self._table: GameTable = table
+        self._state: int = self._table.initial_state(server)
+        self._folds: int = 0
+
+    @property
+    def table(self) -> GameTable:
+        return self._table
+
+    @property
+    def state(self) -> int:
+        return self._state
 
     @property
     def server(self) -> int:
-        return self._server
+        return self._table.server[self._state]
 
     @property
     def player1_points(self) -> int:
-        return self._player1_points
+        return self._table.player1_points[self._state] + self._folds
 
     @property
     def player2_points(self) -> int:
-        return self._player2_points
+        return self._table.player2_points[self._state] + self._folds
 
     @property
     def score_difference(self):
-        return self._score_difference
+        return self.player1_points - self.player2_points
 
     @property
     def side(self):
-        return (self.player1_points + self.player2_points) % 2
+        return self._table.side[self._state]
 
-    def _add_player1_point(self) -> None:
-        if self._is_advantage(Players.PLAYER_2.value):
-            self._player2_points -= 1
-        else:
-            self._player1_points += 1
-        self._score_difference += 1
+    def _get_state(self) -> tuple:
+        return self._table, self._state, self._folds
 
-    def _add_player2_point(self) -> None:
-        if self._is_advantage(Players.PLAYER_1.value):
-            self._player1_points -= 1
-        else:
-            self._player2_points += 1
-        self._score_difference -= 1
+    def _set_state(self, state: tuple) -> None:
+        self._table, self._state, self._folds = state
 
-    @abstractmethod
-    def _is_advantage(self, who: int) -> bool:
-        pass
+    def _reset(self, server: int) -> None:
+        self._state = self._table.initial_state(server)
+        self._folds = 0
 
-    @abstractmethod
     def game_point(self) -> int:
-        pass
+        return self._table.game_point[self._state]
 
-    @abstractmethod
     def break_point(self) -> int:
-        pass
+        return self._table.break_point[self._state]
 
-    @abstractmethod
-    def _check_win(self) -> int:
-        pass
-
-    def add_point(self, winner: int) -> dict or None:
-        if winner == Players.PLAYER_1.value:
-            self._add_player1_point()
-        elif winner == Players.PLAYER_2.value:
-            self._add_player2_point()
-        else:
+    def add_point(self, winner: int) -> int:
+        if winner != Players.PLAYER_1.value and winner != Players.PLAYER_2.value:
             raise ValueError(f"Winner value {winner} is invalid.")
 
-        return self._check_win()
+        self._folds += self._table.fold[self._state][winner]
+        self._state = self._table.next_state[self._state][winner]
+        return self._table.winner[self._state]
 
     @abstractmethod
     def get_score(self) -> dict[str, tuple[str, str]]:
@@ -77,88 +99,28 @@ class Game(ABC):
 
 
 class RegularGame(Game):
-    WINNING_NUM_POINTS = 4
-    POINT_MAP: dict = {
-        -1: '',
-        0: '0',
-        1: '15',
-        2: '30',
-        3: '40',
-        4: 'AD'
-    }
+    __slots__ = ()
 
     def __init__(self, server: int):
-        super().__init__(server)
-
-    def _is_advantage(self, who: int) -> bool:
-        return (who == Players.PLAYER_1.value and self.player1_points == self.WINNING_NUM_POINTS and self.player2_points == self.WINNING_NUM_POINTS-1) \
-            or (who == Players.PLAYER_2.value and self.player1_points == self.WINNING_NUM_POINTS-1 and self.player2_points == self.WINNING_NUM_POINTS)
-
-    def game_point(self) -> int:
-        if self._is_advantage(Players.PLAYER_1.value) \
-                or (self.player1_points >= 3 and self.player1_points > self.player2_points):
-            return Players.PLAYER_1.value
-        elif self._is_advantage(Players.PLAYER_2.value) \
-                or (self.player2_points >= 3 and self.player2_points > self.player1_points):
-            return Players.PLAYER_2.value
-        else:
-            return Players.NONE.value
-
-    def break_point(self) -> int:
-        if self.server == Players.PLAYER_2.value and self.game_point() == Players.PLAYER_1.value:
-            return Players.PLAYER_1.value
-        elif self.server == Players.PLAYER_1.value and self.game_point() == Players.PLAYER_2.value:
-            return Players.PLAYER_2.value
-        else:
-            return Players.NONE.value
-
-    def _check_win(self) -> int:
-        if self.player1_points >= self.WINNING_NUM_POINTS and self.score_difference > 1:
-            return Players.PLAYER_1.value
-        elif self.player2_points >= self.WINNING_NUM_POINTS and self.score_difference < -1:
-            return Players.PLAYER_2.value
-        return Players.NONE.value
+        super().__init__(server, regular_game_table())
 
     def get_score(self) -> dict[str, tuple[str, str]]:
-        if self._is_advantage(Players.PLAYER_1.value):
-            return {MatchSections.POINTS.value: (self.POINT_MAP[self.player1_points], self.POINT_MAP[-1])}
-        elif self._is_advantage(Players.PLAYER_2.value):
-            return {MatchSections.POINTS.value: (self.POINT_MAP[-1], self.POINT_MAP[self.player2_points])}
-        else:
-            return {MatchSections.POINTS.value: (self.POINT_MAP[self.player1_points], self.POINT_MAP[self.player2_points])}
+        return {MatchSections.POINTS.value: self._table.score[self._state]}
 
 
 class TiebreakGame(Game):
-    def __init__(self, server: int, tiebreak_to: int=7):
-        super().__init__(server)
-        self._tiebreak_to: int = tiebreak_to
+    __slots__ = ()
 
-    def _is_advantage(self, who: int) -> bool:
-        pass
-
-    def game_point(self) -> int:
-        return (self.player1_points >= self._tiebreak_to - 1 and self.player1_points > self.player2_points) \
-            or (self.player2_points >= self._tiebreak_to - 1 and self.player2_points > self.player1_points)
-
-    def break_point(self) -> int:
-        return Players.NONE.value
-
-    def _check_win(self) -> int:
-        switch_servers = (self.player1_points + self.player2_points) % 2 == 1
-        if switch_servers:
-            self._server = other_player(self.server)
-
-        if self.player1_points >= self._tiebreak_to and self.score_difference > 1:
-            return Players.PLAYER_1.value
-        elif self.player2_points >= self._tiebreak_to and self.score_difference < -1:
-            return Players.PLAYER_2.value
-        return Players.NONE.value
+    def __init__(self, server: int, tiebreak_to: int=7):
+        super().__init__(server, tiebreak_game_table(tiebreak_to))
 
     def get_score(self) -> dict[str, tuple[str, str]]:
         return {MatchSections.POINTS.value: (str(self.player1_points), str(self.player2_points))}
 
 
 class Set(ABC):
+    __slots__ = ('_server', '_num_games', '_tiebreak_to', '_player1_games', '_player2_games', '_game')
+
     def __init__(self, server: int, num_games: int=6, tiebreak_to: int=7):
         self._server: int = server
 
@@ -194,6 +156,29 @@ class Set(ABC):
     def set_point(self) -> int:
         pass
 
+    def _get_state(self) -> tuple:
+        return (
+            self._server,
+            self._num_games,
+            self._tiebreak_to,
+            self._player1_games,
+            self._player2_games,
+            type(self._game),
+            self._game._get_state(),
+        )
+
+    def _set_state(self, state: tuple) -> None:
+        self._server, self._num_games, self._tiebreak_to, self._player1_games, self._player2_games, game_type, game_state = state
+        if type(self._game) is not game_type:
+            self._game = game_type.__new__(game_type)
+        self._game._set_state(game_state)
+
+    def _reset(self, server: int) -> None:
+        self._server = server
+        self._player1_games = 0
+        self._player2_games = 0
+        self._new_game()
+
     def _add_player1_game(self) -> None:
         self._player1_games += 1
 
@@ -234,6 +219,8 @@ class Set(ABC):
 
 
 class RegularSet(Set):
+    __slots__ = ()
+
     def __init__(self, server: int, num_games: int=6, tiebreak_to: int=7):
         super().__init__(server, num_games, tiebreak_to)
         self._game = RegularGame(
@@ -241,7 +228,9 @@ class RegularSet(Set):
         )
 
     def set_point(self) -> int:
-        if self.game.game_point() == Players.PLAYER_1.value \
+        if isinstance(self.game, TiebreakGame):
+            return self.game.game_point()
+        elif self.game.game_point() == Players.PLAYER_1.value \
                 and (self.player1_games >= self._num_games - 1 and self.player1_games > self.player2_games):
             return Players.PLAYER_1.value
         elif self.game.game_point() == Players.PLAYER_2.value \
@@ -263,6 +252,8 @@ class RegularSet(Set):
                 server=self.server,
                 tiebreak_to=self._tiebreak_to
             )
+        elif type(self._game) is RegularGame:
+            self._game._reset(self.server)
         else:
             self._game = RegularGame(
                 server=self.server
@@ -277,6 +268,8 @@ class RegularSet(Set):
 
 
 class TiebreakSet(Set):
+    __slots__ = ()
+
     def __init__(self, server: int, num_games: int=1, tiebreak_to: int=10):
         super().__init__(server, num_games, tiebreak_to)
         self._game: Game = TiebreakGame(
@@ -288,9 +281,9 @@ class TiebreakSet(Set):
         return self.game.game_point()
 
     def _check_win(self) -> int:
-        if self.player1_games >= self._num_games and self.game_difference >= 1:
+        if self.player1_games >= self._num_games and self.player1_games > self.player2_games:
             return Players.PLAYER_1.value
-        elif self.player2_games >= self._num_games and self.game_difference < -1:
+        elif self.player2_games >= self._num_games and self.player2_games > self.player1_games:
             return Players.PLAYER_2.value
         return Players.NONE.value
 
@@ -306,6 +299,29 @@ class TiebreakSet(Set):
 
 
 class Match:
+    __slots__ = (
+        '_player1',
+        '_player2',
+        '_initial_server',
+        '_server',
+        '_match_best_of',
+        '_winning_num_sets',
+        '_set_num_games',
+        '_set_tiebreak_to',
+        '_match_tiebreak',
+        '_match_tiebreak_to',
+        '_player1_sets',
+        '_player2_sets',
+        '_set_number',
+        '_game_number',
+        '_point_number',
+        '_set_score_history',
+        '_match_won',
+        '_match_winner',
+        '_history',
+        '_set',
+    )
+
     def __init__(
             self,
             player1_name: str='Player 1',
@@ -339,15 +355,17 @@ class Match:
         self._game_number: int = 1
         self._point_number: int = 1
 
-        self._set_score_history: list[tuple[int, int]] = []
+        self._set_score_history: tuple[tuple[int, int], ...] = ()
 
         self._match_won: bool = False
         self._match_winner: int = Players.NONE.value
 
+        # State before each point, stored as linked (state, previous) pairs so undo never copies the history.
+        self._history: tuple or None = None
+
         if match_best_of == 1 and match_tiebreak:
             self._set: Set = TiebreakSet(
                 server=self.server,
-                num_games=set_num_games,
                 tiebreak_to=match_tiebreak_to
             )
         else:
@@ -357,6 +375,19 @@ class Match:
                 tiebreak_to=set_tiebreak_to
             )
 
+    @classmethod
+    def from_initial_inputs(cls, initial_inputs: dict) -> 'Match':
+        return cls(
+            player1_name=initial_inputs['player1_name'],
+            player2_name=initial_inputs['player2_name'],
+            server=initial_inputs['server'],
+            match_best_of=initial_inputs['match_best_of'],
+            set_num_games=initial_inputs['set_num_games'],
+            set_tiebreak_to=initial_inputs['set_tiebreak_to'],
+            match_tiebreak=initial_inputs['match_tiebreak'],
+            match_tiebreak_to=initial_inputs['match_tiebreak_to']
+        )
+
     @property
     def player1_name(self) -> str:
         return self._player1.name
@@ -466,6 +497,80 @@ class Match:
         else:
             return Players.NONE.value
 
+    def _get_state(self) -> tuple:
+        return (
+            self._server,
+            self._player1_sets,
+            self._player2_sets,
+            self._set_number,
+            self._game_number,
+            self._point_number,
+            self._set_score_history,
+            self._match_won,
+            self._match_winner,
+            type(self._set),
+            self._set._get_state(),
+        )
+
+    def _set_state(self, state: tuple) -> None:
+        (
+            self._server,
+            self._player1_sets,
+            self._player2_sets,
+            self._set_number,
+            self._game_number,
+            self._point_number,
+            self._set_score_history,
+            self._match_won,
+            self._match_winner,
+            set_type,
+            set_state,
+        ) = state
+        if type(self._set) is not set_type:
+            self._set = set_type.__new__(set_type)
+            self._set._game = None
+        self._set._set_state(set_state)
+
+    def copy(self) -> 'Match':
+        """
+        Creates an independent copy of the match, which can be scored separately to the original.
+        The players, match settings and undo history are immutable, so are shared with the original rather than copied.
+
+        :return: copy of the match.
+        """
+        match = Match.__new__(Match)
+        for slot in Match.__slots__:
+            setattr(match, slot, getattr(self, slot))
+        match._set = None
+        match._set_state(self._get_state())
+        return match
+
+    def undo(self) -> None:
+        """
+        Reverts the match to the state before the latest point was added.
+        """
+        if self._history is None:
+            raise ValueError("There are no points to undo.")
+        state, self._history = self._history
+        self._set_state(state)
+
+    def rewind_to(self, point_number: int) -> None:
+        """
+        Reverts the match to the state before the given point was added.
+
+        :param point_number: number of the point to rewind to, which will be the next point to be played.
+        """
+        if point_number < 1 or point_number > self.point_number:
+            raise ValueError(f"Point number {point_number} is invalid.")
+
+        history = self._history
+        state = None
+        while history is not None and (state is None or state[5] > point_number):
+            state, history = history
+        if state is not None and state[5] == point_number:
+            self._history = history
+            self._set_state(state)
+
     def _add_player1_set(self) -> None:
         self._player1_sets += 1
 
@@ -497,6 +602,8 @@ class Match:
                 server=self.server,
                 tiebreak_to=self._match_tiebreak_to
             )
+        elif type(self._set) is RegularSet:
+            self._set._reset(self.server)
         else:
             self._set = RegularSet(
                 server=self.server,
@@ -511,6 +618,8 @@ class Match:
         if self._match_won:
             return self.match_winner
 
+        self._history = (self._get_state(), self._history)
+
         set_winner, next_server, game_end = self.set.add_point(winner)
         self._point_number += 1
         self._server = next_server
@@ -519,7 +628,7 @@ class Match:
             self._game_number += 1
         if set_winner:
             match_winner = self._add_set(set_winner)
-            self._set_score_history.append((self._set.player1_games, self._set.player2_games))
+            self._set_score_history += ((self._set.player1_games, self._set.player2_games),)
             self._new_set()
             if match_winner in (Players.PLAYER_1.value, Players.PLAYER_2.value):
                 self._match_won = True
@@ -527,6 +636,191 @@ class Match:
             return match_winner
         return Players.NONE.value
 
+    def _replay(self, winners, scores: bool = False) -> dict[str, np.ndarray]:
+        """
+        Adds a sequence of points to the match in a single pass, using plain values for the score rather than the Set and Game objects.
+        Games are scored with the same game tables as the Game classes, and the state before each point is recorded for undo as in add_point.
+
+        :param winners: iterable of winner values for each point.
+            Alternatively, a (points, 2) array with the winner of each point if player 1 serves it and if player 2 serves it,
+            so the winners of simulated points can depend on the server.
+        :param scores: boolean flag for whether to also return the full score before each point, as used by the win probability engine.
+            The score arrays are player1_sets, player2_sets, player1_games, player2_games, game_server, tiebreak_set, game_tiebreak and game_state.
+        :return: dictionary of arrays with the score context before each point, and the winner of each point.
+        """
+        (
+            server, player1_sets, player2_sets, set_number, game_number, point_number,
+            set_score_history, match_won, match_winner, set_type, set_state,
+        ) = self._get_state()
+        set_server, num_games, tiebreak_to, player1_games, player2_games, game_type, (table, state, folds) = set_state
+        history = self._history
+
+        winning_num_sets = self._winning_num_sets
+        player1, player2, none = Players.PLAYER_1.value, Players.PLAYER_2.value, Players.NONE.value
+
+        winners = np.asarray(winners)
+        by_server = winners.ndim == 2
+        winners = winners.tolist()
+        set_ids, game_ids, point_ids, servers, sides = [], [], [], [], []
+        break_points, set_points, match_points, point_winners = [], [], [], []
+        score_rows = []
+
+        for winner in winners:
+            if by_server:
+                winner = winner[table.server[state] - 1]
+            if winner != player1 and winner != player2:
+                raise ValueError(f"Winner value {winner} is invalid.")
+
+            # Score context before the point.
+            game_point = table.game_point[state]
+            if table.tiebreak:
+                set_point = game_point
+            elif game_point == player1 and player1_games >= num_games - 1 and player1_games > player2_games:
+                set_point = player1
+            elif game_point == player2 and player2_games >= num_games - 1 and player2_games > player1_games:
+                set_point = player2
+            else:
+                set_point = none
+
+            if set_point == player1 and player1_sets >= winning_num_sets - 1:
+                match_point = player1
+            elif set_point == player2 and player2_sets >= winning_num_sets - 1:
+                match_point = player2
+            else:
+                match_point = none
+
+            set_ids.append(set_number)
+            game_ids.append(game_number)
+            point_ids.append(point_number)
+            servers.append(table.server[state])
+            sides.append(table.side[state])
+            break_points.append(table.break_point[state])
+            set_points.append(set_point)
+            match_points.append(match_point)
+            point_winners.append(winner)
+            if scores:
+                score_rows.append((
+                    player1_sets, player2_sets, player1_games, player2_games,
+                    set_server, set_type is TiebreakSet, table.tiebreak, state,
+                ))
+
+            if match_won:
+                continue
+
+            history = (
+                (
+                    server, player1_sets, player2_sets, set_number, game_number, point_number,
+                    set_score_history, match_won, match_winner, set_type,
+                    (set_server, num_games, tiebreak_to, player1_games, player2_games, game_type, (table, state, folds)),
+                ),
+                history,
+            )
+
+            # Game.
+            folds += table.fold[state][winner]
+            state = table.next_state[state][winner]
+            point_number += 1
+
+            game_winner = table.winner[state]
+            if game_winner == none:
+                continue
+
+            # Set.
+            if game_winner == player1:
+                player1_games += 1
+            else:
+                player2_games += 1
+            set_server = other_player(set_server)
+            server = set_server
+            game_number += 1
+
+            if set_type is TiebreakSet:
+                if player1_games >= num_games and player1_games > player2_games:
+                    set_winner = player1
+                elif player2_games >= num_games and player2_games > player1_games:
+                    set_winner = player2
+                else:
+                    set_winner = none
+            else:
+                game_difference = abs(player1_games - player2_games)
+                if (player1_games == num_games and game_difference > 1) or player1_games == num_games + 1:
+                    set_winner = player1
+                elif (player2_games == num_games and game_difference > 1) or player2_games == num_games + 1:
+                    set_winner = player2
+                else:
+                    set_winner = none
+
+            if set_winner == none:
+                if set_type is RegularSet:
+                    if player1_games == num_games and player2_games == num_games:
+                        game_type, table = TiebreakGame, tiebreak_game_table(tiebreak_to)
+                    else:
+                        game_type, table = RegularGame, regular_game_table()
+                    state, folds = table.initial_state(set_server), 0
+                continue
+
+            # Match.
+            if set_winner == player1:
+                player1_sets += 1
+            else:
+                player2_sets += 1
+            set_score_history += ((player1_games, player2_games),)
+            set_number += 1
+
+            if self._match_tiebreak and player1_sets == winning_num_sets - 1 and player2_sets == winning_num_sets - 1:
+                set_type, num_games, tiebreak_to = TiebreakSet, 1, self._match_tiebreak_to
+                game_type, table = TiebreakGame, tiebreak_game_table(tiebreak_to)
+            else:
+                set_type, num_games, tiebreak_to = RegularSet, self._set_num_games, self._set_tiebreak_to
+                game_type, table = RegularGame, regular_game_table()
+            set_server = server
+            player1_games, player2_games = 0, 0
+            state, folds = table.initial_state(set_server), 0
+
+            if player1_sets == winning_num_sets or player2_sets == winning_num_sets:
+                match_won = True
+                match_winner = player1 if player1_sets == winning_num_sets else player2
+
+        self._set_state((
+            server, player1_sets, player2_sets, set_number, game_number, point_number,
+            set_score_history, match_won, match_winner, set_type,
+            (set_server, num_games, tiebreak_to, player1_games, player2_games, game_type, (table, state, folds)),
+        ))
+        self._history = history
+
+        point_context = {
+            'set_id': np.array(set_ids, dtype=np.int16),
+            'game_id': np.array(game_ids, dtype=np.int32),
+            'point_id': np.array(point_ids, dtype=np.int32),
+            'server': np.array(servers, dtype=np.int8),
+            'side': np.array(sides, dtype=np.int8),
+            'break_point': np.array(break_points, dtype=np.int8),
+            'set_point': np.array(set_points, dtype=np.int8),
+            'match_point': np.array(match_points, dtype=np.int8),
+            'winner': np.array(point_winners, dtype=np.int8),
+        }
+        if scores:
+            score_columns = np.array(score_rows, dtype=np.int16).reshape(-1, len(REPLAY_SCORE_COLUMNS))
+            point_context.update({name: score_columns[:, column] for column, name in enumerate(REPLAY_SCORE_COLUMNS)})
+        return point_context
+
+    def add_points(self, winners) -> np.ndarray:
+        """
+        Adds a sequence of points to the match in a single call.
+        As with add_point, points added after the match has been won do not change the score.
+
+        :param winners: iterable or array of winner values for each point.
+        :return: structured array with the score context before each point, using the fields in POINT_CONTEXT_DTYPE.
+            The point uuid is not included, as it is made up of the set_id, game_id, point_id, server and side fields.
+        """
+        winners = np.asarray(winners)
+        point_context = self._replay(winners)
+
+        points = np.empty(winners.shape[0], dtype=POINT_CONTEXT_DTYPE)
+        for name, values in point_context.items():
+            points[name] = values
+        return points
+
     def get_score(self) -> dict[str, tuple[str, str]]:
         scores = self._set.get_score()
         return {
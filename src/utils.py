@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime, timezone
 from enum import Enum, auto
@@ -107,38 +108,58 @@ def other_player(input_player: int):
     return (input_player % 2) + 1
 
 
+# Declared dtype of each column of the backend data in memory.
+# Ids and required enums use the smallest integer type, optional enums nullable integers, flags nullable booleans,
+# the point uuid Arrow-backed strings and the metadata, which is the same on every row, a categorical.
+BACKEND_SCHEMA: dict[str, str] = {
+    'point_datetime': 'datetime64[ns, UTC]',
+    'point_uuid': 'string[pyarrow]',
+    'set_id': 'int16',
+    'game_id': 'int32',
+    'point_id': 'int32',
+    'match_point': 'int8',
+    'set_point': 'int8',
+    'break_point': 'int8',
+    'server': 'int8',
+    'side': 'int8',
+    'winner': 'int8',
+    'ace_flag': 'boolean',
+    'double_fault_flag': 'boolean',
+    'serve': 'Int8',
+    'serve_type': 'Int8',
+    'serve_target': 'Int8',
+    'net_approach': 'boolean',
+    'first_net_approacher': 'Int8',
+    'net_approach_type': 'Int8',
+    'rally_length': 'Int8',
+    'final_shot': 'Int8',
+    'final_shot_hand': 'Int8',
+    'final_shot_type': 'Int8',
+    # 'final_shot_spin': 'Int8',
+    # 'final_shot_target': 'Int8',
+    'metadata': 'category',
+}
+
+BACKEND_COLUMNS: list[str] = list(BACKEND_SCHEMA)
+
+# Dtype used when reading each column from a match file, where datetimes, strings and categoricals are read as strings and flags as booleans.
+_READ_DTYPES: dict[str, str] = {
+    'datetime64[ns, UTC]': 'str',
+    'string[pyarrow]': 'str',
+    'category': 'str',
+    'boolean': 'bool',
+}
+
+BACKEND_DTYPES: dict[str, str] = {name: _READ_DTYPES.get(dtype, dtype) for name, dtype in BACKEND_SCHEMA.items()}
+
+
 def create_backend_df() -> pd.DataFrame:
-    df = pd.DataFrame(
-        columns=[
-            'point_datetime',
-            'point_uuid',
-            'set_id',
-            'game_id',
-            'point_id',
-            'match_point',
-            'set_point',
-            'break_point',
-            'server',
-            'side',
-            'winner',
-            'ace_flag',
-            'double_fault_flag',
-            'serve',
-            'serve_type',
-            'serve_target',
-            'net_approach',
-            'first_net_approacher',
-            'net_approach_type',
-            'rally_length',
-            'final_shot',
-            'final_shot_hand',
-            'final_shot_type',
-            # 'final_shot_spin',
-            # 'final_shot_target'
-            'metadata',
-        ]
-    )
-    return df
+    """
+    Creates an empty DataFrame of the backend data, with the declared dtype for each column.
+
+    :return: DataFrame with the backend columns and no rows.
+    """
+    return pd.DataFrame({name: pd.Series(dtype=dtype) for name, dtype in BACKEND_SCHEMA.items()})
 
 
 def add_ace(session_state: dict, serve_target: int, serve_type: int = ServeType.FLAT.value) -> None:
@@ -149,35 +170,33 @@ def add_ace(session_state: dict, serve_target: int, serve_type: int = ServeType.
     :param serve_target: ServeTarget enum value.
     :param serve_type: ServeType enum value, defaulted to FLAT.
     """
-    df = session_state['match_data']
+    point_log = session_state['match_data']
     match = session_state['match']
 
-    df.loc[len(df)] = [
+    point_log.append(
         datetime.now(timezone.utc),
-        match.point_uuid(),
-        match.set_number,
-        match.game_number,
-        match.point_number,
-        match.match_point(),
-        match.set_point(),
-        match.break_point(),
-        match.current_server,
-        match.side,
-        match.current_server,
-        True,
-        False,
-        Serve.ACE.value,
-        serve_type,
-        serve_target,
-        False,
-        DEFAULT_VALUE,
-        DEFAULT_VALUE,
-        RallyLength.RL_0_2.value,
-        FinalShot.WINNER.value,
-        DEFAULT_VALUE,
-        DEFAULT_VALUE,
-        session_state['match_metadata'],
-    ]
+        set_id=match.set_number,
+        game_id=match.game_number,
+        point_id=match.point_number,
+        match_point=match.match_point(),
+        set_point=match.set_point(),
+        break_point=match.break_point(),
+        server=match.current_server,
+        side=match.side,
+        winner=match.current_server,
+        ace_flag=True,
+        double_fault_flag=False,
+        serve=Serve.ACE.value,
+        serve_type=serve_type,
+        serve_target=serve_target,
+        net_approach=False,
+        first_net_approacher=DEFAULT_VALUE,
+        net_approach_type=DEFAULT_VALUE,
+        rally_length=RallyLength.RL_0_2.value,
+        final_shot=FinalShot.WINNER.value,
+        final_shot_hand=DEFAULT_VALUE,
+        final_shot_type=DEFAULT_VALUE,
+    )
 
 
 def add_double_fault(session_state: dict) -> None:
@@ -186,35 +205,33 @@ def add_double_fault(session_state: dict) -> None:
 
     :param session_state: streamlit session state dictionary.
     """
-    df = session_state['match_data']
+    point_log = session_state['match_data']
     match = session_state['match']
 
-    df.loc[len(df)] = [
+    point_log.append(
         datetime.now(timezone.utc),
-        match.point_uuid(),
-        match.set_number,
-        match.game_number,
-        match.point_number,
-        match.match_point(),
-        match.set_point(),
-        match.break_point(),
-        match.current_server,
-        match.side,
-        Players.PLAYER_2.value if match.current_server == Players.PLAYER_1.value else Players.PLAYER_1.value,
-        False,
-        True,
-        Serve.DOUBLE_FAULT.value,
-        DEFAULT_VALUE,
-        DEFAULT_VALUE,
-        False,
-        DEFAULT_VALUE,
-        DEFAULT_VALUE,
-        RallyLength.RL_0_2.value,
-        DEFAULT_VALUE,
-        DEFAULT_VALUE,
-        DEFAULT_VALUE,
-        session_state['match_metadata'],
-    ]
+        set_id=match.set_number,
+        game_id=match.game_number,
+        point_id=match.point_number,
+        match_point=match.match_point(),
+        set_point=match.set_point(),
+        break_point=match.break_point(),
+        server=match.current_server,
+        side=match.side,
+        winner=Players.PLAYER_2.value if match.current_server == Players.PLAYER_1.value else Players.PLAYER_1.value,
+        ace_flag=False,
+        double_fault_flag=True,
+        serve=Serve.DOUBLE_FAULT.value,
+        serve_type=DEFAULT_VALUE,
+        serve_target=DEFAULT_VALUE,
+        net_approach=False,
+        first_net_approacher=DEFAULT_VALUE,
+        net_approach_type=DEFAULT_VALUE,
+        rally_length=RallyLength.RL_0_2.value,
+        final_shot=DEFAULT_VALUE,
+        final_shot_hand=DEFAULT_VALUE,
+        final_shot_type=DEFAULT_VALUE,
+    )
 
 
 def add_point(session_state: dict) -> None:
@@ -226,69 +243,71 @@ def add_point(session_state: dict) -> None:
     if session_state['winner'] is None:
         raise ValueError("No winner was selected for the point so it was not added to the data.")
 
-    df = session_state['match_data']
+    point_log = session_state['match_data']
     match = session_state['match']
 
-    df.loc[len(df)] = [
+    point_log.append(
         datetime.now(timezone.utc),
-        match.point_uuid(),
-        match.set_number,
-        match.game_number,
-        match.point_number,
-        match.match_point(),
-        match.set_point(),
-        match.break_point(),
-        match.current_server,
-        match.side,
-        session_state['winner'],
-        True if session_state['serve'] == Serve.ACE.value else False,
-        True if session_state['serve'] == Serve.DOUBLE_FAULT.value else False,
-        session_state['serve'],
-        session_state['serve_type'],
-        session_state['serve_target'],
-        session_state['net_approach'],
-        session_state['first_net_approacher'],
-        session_state['net_approach_type'],
-        session_state['rally_length'],
-        session_state['final_shot'],
-        session_state['final_shot_hand'],
-        session_state['final_shot_type'],
-        session_state['match_metadata'],
-    ]
-
-
-def add_player_data(player: int, match_data: pd.DataFrame) -> dict[str, pd.DataFrame]:
-    data = {
-        'all_points': match_data,
-        'points_won': match_data[(match_data.winner == player)],
-        'points_lost': match_data[(match_data.winner == other_player(player))],
-        'break_points': match_data[(match_data.break_point == player)],
-        'set_points': match_data[(match_data.set_point == player)],
-        'match_points': match_data[(match_data.match_point == player)],
-        'serves': match_data[(match_data.server == player)],
-        'returns': match_data[(match_data.server == other_player(player))],
-        'net_approach_points': match_data[(match_data.net_approach == True) & (match_data.first_net_approacher == player)],
-    }
-
-    data['break_points_won'] = data['break_points'][(data['break_points'].winner == player)]
-    data['set_points_won'] = data['set_points'][(data['set_points'].winner == player)]
-    data['match_points_won'] = data['match_points'][(data['match_points'].winner == player)]
-
-    data['aces'] = data['serves'][(data['serves'].serve == Serve.ACE.value)]
-    data['first_serves'] = data['serves'][(data['serves'].serve.isin([Serve.ACE.value, Serve.FIRST_SERVE.value]))]
-    data['second_serves'] = data['serves'][(data['serves'].serve == Serve.SECOND_SERVE.value)]
-    data['double_faults'] = data['serves'][(data['serves'].serve == Serve.DOUBLE_FAULT.value)]
-
-    data['serve_points_won'] = data['serves'][(data['serves'].winner == player)]
-    data['first_serve_points_won'] = data['serve_points_won'][(data['serve_points_won'].serve.isin([Serve.ACE.value, Serve.FIRST_SERVE.value]))]
-    data['second_serve_points_won'] = data['serve_points_won'][(data['serve_points_won'].serve == Serve.SECOND_SERVE.value)]
-
-    data['winners'] = data['points_won'][(data['points_won'].final_shot == FinalShot.WINNER.value)]
-    data['errors'] = data['points_lost'][(data['points_lost'].final_shot == FinalShot.ERROR.value)]
-    data['unforced_errors'] = data['points_lost'][(data['points_lost'].final_shot == FinalShot.UNFORCED_ERROR.value)]
-
-    data['final_shot'] = pd.concat([data['winners'], data['errors'], data['unforced_errors']])
-
-    data['net_approach_points_won'] = data['net_approach_points'][(data['net_approach_points'].winner == player)]
-
-    return data
+        set_id=match.set_number,
+        game_id=match.game_number,
+        point_id=match.point_number,
+        match_point=match.match_point(),
+        set_point=match.set_point(),
+        break_point=match.break_point(),
+        server=match.current_server,
+        side=match.side,
+        winner=session_state['winner'],
+        ace_flag=True if session_state['serve'] == Serve.ACE.value else False,
+        double_fault_flag=True if session_state['serve'] == Serve.DOUBLE_FAULT.value else False,
+        serve=session_state['serve'],
+        serve_type=session_state['serve_type'],
+        serve_target=session_state['serve_target'],
+        net_approach=session_state['net_approach'],
+        first_net_approacher=session_state['first_net_approacher'],
+        net_approach_type=session_state['net_approach_type'],
+        rally_length=session_state['rally_length'],
+        final_shot=session_state['final_shot'],
+        final_shot_hand=session_state['final_shot_hand'],
+        final_shot_type=session_state['final_shot_type'],
+    )
+
+
+def _truncate_to_match(session_state: dict) -> None:
+    point_log = session_state['match_data']
+    match = session_state['match']
+
+    point_log.truncate(int(np.searchsorted(point_log.column('point_id'), match.point_number)))
+    session_state['match_winner'] = match.match_winner
+
+
+def undo_point(session_state: dict) -> None:
+    """
+    Undo the latest point, removing it from both the match score and the backend data.
+
+    :param session_state: streamlit session state dictionary.
+    """
+    session_state['match'].undo()
+    _truncate_to_match(session_state)
+
+
+def rewind_to_point(session_state: dict, point_number: int) -> None:
+    """
+    Rewind the match to before the given point, removing it and all later points from both the match score and the backend data.
+
+    :param session_state: streamlit session state dictionary.
+    :param point_number: number of the point to rewind to.
+    """
+    session_state['match'].rewind_to(point_number)
+    _truncate_to_match(session_state)
+
+
+def discard_match_journal(session_state: dict) -> None:
+    """
+    Closes and deletes the journal of the current match, such as when the match is won or replaced, as it no longer needs recovering.
+
+    :param session_state: streamlit session state dictionary.
+    """
+    point_log = session_state['match_data']
+    if point_log.journal is not None:
+        point_log.journal.discard()
+        point_log.journal = None
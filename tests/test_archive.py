@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from src.archive import archive_index, load_archive
+from src.encoding import encode_match
+from src.generator import PlayerProfile, generate_match
+from src.match_io import save_parquet
+from src.point_log import POINT_LOG_DTYPES
+from src.replay import replay_winners
+from src.utils import Players
+
+
+@pytest.fixture(scope='module')
+def archive_files(tmp_path_factory) -> tuple[list[str], list]:
+    # Matches are written in each supported file format, with a different datetime for each match.
+    directory = tmp_path_factory.mktemp('archive')
+    point_logs = [
+        generate_match(PlayerProfile(), PlayerProfile(), config={'datetime': f'2025-01-0{seed + 1} 10:00:00'}, seed=seed)
+        for seed in range(3)
+    ]
+
+    paths = []
+    for point_log, (extension, serialise) in zip(point_logs, (('csv', lambda log: log.to_csv()), ('parquet', save_parquet), ('ttp', encode_match))):
+        path = directory / f"match.{extension}"
+        path.write_bytes(serialise(point_log))
+        paths.append(str(path))
+    return paths, point_logs
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_archive_lines_up_with_input_files(archive_files, max_workers: int):
+    paths, point_logs = archive_files
+    points, matches = load_archive(paths, max_workers=max_workers)
+
+    assert matches.index.tolist() == list(range(len(paths)))
+    assert matches['path'].tolist() == paths
+    assert matches['num_points'].tolist() == [len(point_log) for point_log in point_logs]
+    np.testing.assert_array_equal(points['match_id'], np.repeat(np.arange(len(paths)), matches['num_points']))
+
+    for match_id, point_log in enumerate(point_logs):
+        match_points = points[points['match_id'] == match_id]
+        assert matches.at[match_id, 'datetime'] == point_log.metadata['datetime']
+        for name in POINT_LOG_DTYPES:
+            if name != 'point_datetime':
+                np.testing.assert_array_equal(match_points[name].fillna(0).to_numpy(dtype=np.int64), point_log.column(name), err_msg=name)
+
+        match, _ = replay_winners(point_log.column('winner'), point_log.metadata)
+        assert matches.at[match_id, 'match_winner'] == match.match_winner != Players.NONE.value
+        assert (matches.at[match_id, 'player1_sets'], matches.at[match_id, 'player2_sets']) == (match.player1_sets, match.player2_sets)
+
+
+def test_archive_reports_file_which_could_not_be_loaded(archive_files, tmp_path):
+    paths, _ = archive_files
+    broken_path = tmp_path / "broken.csv"
+    broken_path.write_text("not,a,match\n")
+
+    with pytest.raises(ValueError, match="broken.csv"):
+        load_archive([*paths, str(broken_path)], max_workers=1)
+
+
+def test_archive_index_counts_match_dataframe_filters(archive_files):
+    paths, _ = archive_files
+    points, _ = load_archive(paths, max_workers=1)
+    index = archive_index(points)
+
+    filters = {'match_id': [0, 2], 'server': Players.PLAYER_1.value, 'winner': Players.PLAYER_2.value}
+    expected = points['match_id'].isin([0, 2]) & (points['server'] == Players.PLAYER_1.value) & (points['winner'] == Players.PLAYER_2.value)
+    assert index.count(**filters) == int(expected.sum())
+    np.testing.assert_array_equal(index.mask(**filters), expected.to_numpy())
+    assert index.count_by('match_id') == points['match_id'].value_counts().to_dict()
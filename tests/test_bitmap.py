@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from src import analysis
+from src.bitmap import BITMAP_COLUMNS, BitmapIndex
+from src.generator import PlayerProfile, generate_match
+from src.point_log import PointLog
+from src.utils import Players, Serve, ServeTarget
+
+
+POINT_DATETIME = datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
+
+FILTERS: list[dict] = [
+    {},
+    {'winner': Players.PLAYER_1.value},
+    {'serve': Serve.SECOND_SERVE.value, 'serve_target': ServeTarget.BODY.value, 'winner': Players.PLAYER_1.value, 'set_id': 3},
+    {'server': Players.PLAYER_2.value, 'rally_length': [1, 2], 'set_id': (1, 2, 3)},
+    {'final_shot': 99},
+]
+
+
+@pytest.fixture(scope='module')
+def point_log() -> PointLog:
+    # The number of points is not a multiple of 64, so the last word of each bitset is only partly used.
+    point_log = generate_match(PlayerProfile(), PlayerProfile(), config={'match_best_of': 5}, seed=4)
+    assert len(point_log) % 64
+    return point_log
+
+
+def expected_mask(point_log: PointLog, filters: dict) -> np.ndarray:
+    mask = np.ones(len(point_log), dtype=bool)
+    for name, value in filters.items():
+        mask &= np.isin(point_log.column(name), np.atleast_1d(value))
+    return mask
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_queries_match_column_filters(point_log: PointLog, filters: dict):
+    index = point_log.bitmap_index
+    mask = expected_mask(point_log, filters)
+
+    assert index.num_points == len(point_log)
+    assert index.count(**filters) == int(mask.sum())
+    np.testing.assert_array_equal(index.mask(**filters), mask)
+    np.testing.assert_array_equal(index.indices(**filters), np.flatnonzero(mask))
+
+    winners = point_log.column('winner')[mask]
+    assert index.count_by('winner', **filters) == {value: int(np.sum(winners == value)) for value in index.values('winner')}
+
+    counts = analysis.filtered_winner_counts(point_log, **filters)
+    assert counts.tolist() == [int(np.sum(winners == player.value)) for player in Players]
+
+
+def test_unindexed_column_is_rejected(point_log: PointLog):
+    assert point_log.bitmap_index.columns == BITMAP_COLUMNS
+    with pytest.raises(ValueError):
+        point_log.bitmap_index.count(break_point=Players.PLAYER_1.value)
+    with pytest.raises(ValueError):
+        BitmapIndex({'server': np.zeros(3), 'winner': np.zeros(4)})
+
+
+def test_point_log_index_follows_logged_points():
+    point_log = PointLog()
+    assert point_log.bitmap_index.count() == 0
+
+    point_log.append(POINT_DATETIME, set_id=1, server=Players.PLAYER_1.value, winner=Players.PLAYER_1.value)
+    assert point_log.bitmap_index.count(winner=Players.PLAYER_1.value) == 1
+    assert analysis.filtered_winner_counts(point_log, winner=Players.PLAYER_1.value)[Players.PLAYER_1.value] == 1
+
+    point_log.append(POINT_DATETIME, set_id=1, point_id=1, server=Players.PLAYER_1.value, winner=Players.PLAYER_2.value)
+    assert point_log.bitmap_index.count_by('winner') == {Players.PLAYER_1.value: 1, Players.PLAYER_2.value: 1}
+
+    point_log.truncate(1)
+    assert point_log.bitmap_index.count(winner=Players.PLAYER_2.value) == 0
+    assert analysis.filtered_winner_counts(point_log).tolist() == [0, 1, 0]
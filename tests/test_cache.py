@@ -0,0 +1,84 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cache import LRUCache, versioned_cache
+from src.point_log import PointLog
+from src.utils import Players
+
+
+POINT_DATETIME = datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
+
+
+def add_point(point_log: PointLog) -> None:
+    point_log.append(POINT_DATETIME, set_id=1, point_id=len(point_log), server=Players.PLAYER_1.value, winner=Players.PLAYER_1.value)
+
+
+def test_lru_cache_discards_least_recently_used_entry():
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+
+    assert 'b' not in cache
+    assert cache.get('b', 'missing') == 'missing'
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (3, 1)
+
+    cache.clear()
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_lru_cache_rejects_invalid_size():
+    with pytest.raises(ValueError):
+        LRUCache(maxsize=0)
+
+
+def test_versioned_cache_is_invalidated_by_version_and_log_id():
+    calls = []
+
+    @versioned_cache(maxsize=4)
+    def num_points(point_log: PointLog, sets: list[int]) -> int:
+        calls.append((point_log.log_id, point_log.version))
+        return len(point_log)
+
+    point_log = PointLog()
+    add_point(point_log)
+    assert num_points(point_log, [1]) == 1
+    assert num_points(point_log, [1]) == 1
+    assert len(calls) == 1
+
+    add_point(point_log)
+    assert num_points(point_log, [1]) == 2
+    point_log.truncate(1)
+    assert num_points(point_log, [1]) == 1
+    assert len(calls) == 3
+
+    other_log = PointLog()
+    add_point(other_log)
+    assert num_points(other_log, [1]) == 1
+    assert len(calls) == 4
+    assert num_points.cache.hits == 1
+
+
+def test_versioned_cache_results_cannot_be_changed_by_callers():
+    @versioned_cache()
+    def counts(point_log: PointLog) -> np.ndarray:
+        return np.zeros(3)
+
+    @versioned_cache()
+    def table(point_log: PointLog) -> pd.DataFrame:
+        return pd.DataFrame({'count': [0, 0, 0]})
+
+    point_log = PointLog()
+    with pytest.raises(ValueError):
+        counts(point_log)[0] = 1
+
+    cached_table = table(point_log)
+    cached_table.loc[0, 'count'] = 1
+    assert table(point_log)['count'].tolist() == [0, 0, 0]
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from src.encoding import (
+    ENCODING_VERSION, MATCH_MAGIC, POINT_RECORD_SIZE, decode_header, decode_match, decode_points, encode_header, encode_match,
+    encode_point, encode_points, match_start, records_from_bytes,
+)
+from src.generator import PlayerProfile, generate_match
+from src.point_log import OPTIONAL_COLUMNS, POINT_LOG_DTYPES, PointLog
+
+
+@pytest.fixture(scope='module')
+def point_log() -> PointLog:
+    return generate_match(PlayerProfile(), PlayerProfile(), seed=7)
+
+
+def point_columns(point_log: PointLog) -> dict[str, np.ndarray]:
+    return {name: point_log.column(name) for name in POINT_LOG_DTYPES}
+
+
+def test_match_round_trips_with_missing_optional_values(point_log: PointLog):
+    assert any(np.any(point_log.column(name) == 0) for name in OPTIONAL_COLUMNS)
+
+    data = encode_match(point_log)
+    decoded = decode_match(data)
+
+    assert decoded.metadata == point_log.metadata
+    for name in POINT_LOG_DTYPES:
+        assert decoded.column(name).dtype == point_log.column(name).dtype
+        np.testing.assert_array_equal(decoded.column(name), point_log.column(name), err_msg=name)
+    assert len(data) == len(encode_header(MATCH_MAGIC, point_log.metadata)) + len(point_log) * POINT_RECORD_SIZE
+
+
+def test_single_point_matches_column_encoding(point_log: PointLog):
+    columns = point_columns(point_log)
+    start = match_start(point_log.metadata)
+    records = encode_points(columns, start)
+
+    for row in (0, len(point_log) // 2, len(point_log) - 1):
+        assert encode_point(columns, row, start) == records[row].tobytes()
+
+
+def test_partly_written_record_is_ignored(point_log: PointLog):
+    data = encode_match(point_log)
+    assert len(decode_match(data + bytes(POINT_RECORD_SIZE - 1))) == len(point_log)
+    assert len(decode_match(data[:-1])) == len(point_log) - 1
+
+
+def test_other_encoding_versions_are_rejected(point_log: PointLog):
+    header = bytearray(encode_header(MATCH_MAGIC, point_log.metadata))
+    header[len(MATCH_MAGIC)] = ENCODING_VERSION + 1
+    with pytest.raises(ValueError):
+        decode_header(MATCH_MAGIC, bytes(header))
+
+    records = encode_points(point_columns(point_log), match_start(point_log.metadata))
+    records['version'][3] = ENCODING_VERSION + 1
+    with pytest.raises(ValueError):
+        decode_points(records)
+    with pytest.raises(ValueError):
+        decode_match(encode_header(MATCH_MAGIC, point_log.metadata) + records.tobytes())
+
+
+@pytest.mark.parametrize('length', [0, len(MATCH_MAGIC), len(MATCH_MAGIC) + 3, len(MATCH_MAGIC) + 5, -1])
+def test_truncated_header_is_rejected(point_log: PointLog, length: int):
+    header = encode_header(MATCH_MAGIC, point_log.metadata)
+    with pytest.raises(ValueError):
+        decode_match(header[:length])
+
+
+@pytest.mark.parametrize('name, value', [('point_id', 70000), ('game_id', -1), ('set_id', 256), ('serve', 300)])
+def test_values_outside_record_fields_are_rejected(point_log: PointLog, name: str, value: int):
+    columns = {column: values.astype(np.int64) if column == name else values for column, values in point_columns(point_log).items()}
+    columns[name][-1] = value
+
+    with pytest.raises(ValueError):
+        encode_points(columns)
+    with pytest.raises(ValueError):
+        encode_point(columns, len(point_log) - 1)
+
+
+def test_decoded_values_outside_enum_range_are_rejected(point_log: PointLog):
+    records = encode_points(point_columns(point_log), match_start(point_log.metadata))
+    records['serve'][0] = 9
+    data = encode_header(MATCH_MAGIC, point_log.metadata) + records.tobytes()
+
+    assert decode_points(records_from_bytes(data, len(data) - records.nbytes))['serve'][0] == 9
+    with pytest.raises(ValueError):
+        decode_match(data)
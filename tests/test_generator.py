@@ -0,0 +1,41 @@
+import numpy as np
+
+from src.generator import PlayerProfile, generate_match, generate_matches
+from src.point_log import POINT_LOG_DTYPES, PointLog
+from src.replay import replay_winners
+from src.utils import Players
+
+
+PLAYER1 = PlayerProfile()
+PLAYER2 = PlayerProfile(first_serve_win=0.65, second_serve_win=0.45)
+
+
+def assert_logs_equal(point_log: PointLog, expected: PointLog) -> None:
+    assert point_log.metadata == expected.metadata
+    for name in POINT_LOG_DTYPES:
+        np.testing.assert_array_equal(point_log.column(name), expected.column(name), err_msg=name)
+
+
+def test_same_seed_generates_same_match():
+    point_log = generate_match(PLAYER1, PLAYER2, seed=3)
+
+    assert_logs_equal(generate_match(PLAYER1, PLAYER2, seed=3), point_log)
+    assert not np.array_equal(generate_match(PLAYER1, PLAYER2, seed=4).column('winner'), point_log.column('winner'))
+
+
+def test_generated_match_is_complete():
+    point_log = generate_match(PLAYER1, PLAYER2, config={'match_best_of': 5}, seed=5)
+    match, context = replay_winners(point_log.column('winner'), point_log.metadata)
+
+    assert match.match_winner != Players.NONE.value
+    for name, values in context.items():
+        np.testing.assert_array_equal(point_log.column(name), values, err_msg=name)
+
+
+def test_generated_matches_do_not_depend_on_workers():
+    point_logs = generate_matches(5, PLAYER1, PLAYER2, seed=11)
+    parallel_point_logs = generate_matches(5, PLAYER1, PLAYER2, seed=11, max_workers=2)
+
+    assert len(parallel_point_logs) == len(point_logs)
+    for parallel_point_log, point_log in zip(parallel_point_logs, point_logs):
+        assert_logs_equal(parallel_point_log, point_log)
@@ -0,0 +1,89 @@
+from datetime import datetime, timezone
+import os
+import time
+
+import pytest
+
+from src.journal import (
+    JOURNAL_LEASE_SECONDS, LEASE_SUFFIX, MatchJournal, discard_journal, list_journals, read_journal, read_journal_metadata
+)
+from src.point_log import PointLog
+from src.utils import Players
+
+
+METADATA = {'datetime': '2025-01-01 12:00:00', 'player1_name': 'Player 1', 'player2_name': 'Player 2'}
+
+POINT_DATETIME = datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
+
+
+def journalled_log(directory: str, num_points: int) -> PointLog:
+    point_log = PointLog(METADATA)
+    point_log.journal = MatchJournal(METADATA, directory)
+    for point_id in range(num_points):
+        point_log.append(POINT_DATETIME, set_id=1, point_id=point_id, server=Players.PLAYER_1.value, winner=Players.PLAYER_2.value)
+    return point_log
+
+
+def expire_lease(path: str) -> None:
+    # Moves the last renewal of a journal's lease back past its expiry, as if its session had been inactive since.
+    expired = time.time() - JOURNAL_LEASE_SECONDS - 1
+    os.utime(path + LEASE_SUFFIX, (expired, expired))
+
+
+def test_live_journals_are_not_listed(tmp_path):
+    live_log = journalled_log(str(tmp_path), 3)
+    lost_path = journalled_log(str(tmp_path), 5).journal.path
+    expire_lease(lost_path)
+
+    assert list_journals(str(tmp_path)) == [lost_path]
+    assert read_journal_metadata(lost_path) == METADATA
+    assert len(read_journal(lost_path)) == 5
+
+    with pytest.raises(ValueError):
+        MatchJournal.reopen(live_log.journal.path)
+    with pytest.raises(ValueError):
+        discard_journal(live_log.journal.path)
+    assert os.path.exists(live_log.journal.path)
+
+
+def test_recovered_journal_is_locked_and_discarded(tmp_path):
+    point_log = journalled_log(str(tmp_path), 2)
+    path = point_log.journal.path
+    point_log.journal.close()
+
+    recovered_journal = MatchJournal.reopen(path)
+    assert list_journals(str(tmp_path)) == []
+
+    recovered_journal.discard()
+    assert not os.path.exists(path)
+
+    lost_path = journalled_log(str(tmp_path), 1).journal.path
+    expire_lease(lost_path)
+    discard_journal(lost_path)
+    assert list_journals(str(tmp_path)) == []
+    assert os.listdir(tmp_path) == []
+
+
+def test_journal_of_refreshed_session_is_recovered(tmp_path):
+    # A browser refresh starts a new session, while the old session keeps its point log, and its open journal, until it is cleaned up.
+    old_log = journalled_log(str(tmp_path), 4)
+    path = old_log.journal.path
+    old_log.journal.heartbeat()
+    assert list_journals(str(tmp_path)) == []
+
+    expire_lease(path)
+    assert list_journals(str(tmp_path)) == [path]
+    recovered_journal = MatchJournal.reopen(path)
+    recovered_log = read_journal(path)
+    recovered_log.journal = recovered_journal
+    assert len(recovered_log) == 4
+
+    # The old session moves to a new journal rather than appending to the recovered one, and does not delete it when discarded.
+    old_log.append(POINT_DATETIME, set_id=1, point_id=4, server=Players.PLAYER_1.value, winner=Players.PLAYER_1.value)
+    recovered_log.append(POINT_DATETIME, set_id=1, point_id=4, server=Players.PLAYER_1.value, winner=Players.PLAYER_2.value)
+    assert old_log.journal.path != path
+    old_log.journal.discard()
+
+    recovered_log.journal.close()
+    assert list_journals(str(tmp_path)) == [path]
+    assert read_journal(path).column('winner').tolist() == [Players.PLAYER_2.value] * 5
@@ -0,0 +1,115 @@
+import io
+
+import numpy as np
+import pyarrow.parquet as pq
+import pytest
+
+from src.match_io import export_match, load_csv, load_match_file, load_parquet, parse_metadata, save_parquet, stream_match_file, validate_columns
+from src.point_log import OPTIONAL_COLUMNS, POINT_LOG_DTYPES, PointLog
+from src.replay import replay_winners
+from src.utils import BACKEND_COLUMNS
+
+
+EXAMPLE_FILE = "example/AO_Final-Jannik_Sinner_vs_Alexander_Zverev-20250126_083000.csv"
+
+
+def assert_logs_equal(point_log: PointLog, expected: PointLog) -> None:
+    assert point_log.metadata == expected.metadata
+    assert len(point_log) == len(expected)
+    for name in POINT_LOG_DTYPES:
+        np.testing.assert_array_equal(point_log.column(name), expected.column(name), err_msg=name)
+
+
+@pytest.fixture(scope='module')
+def example_log() -> PointLog:
+    return load_match_file(EXAMPLE_FILE)
+
+
+def test_parquet_round_trip(example_log: PointLog):
+    data = save_parquet(example_log)
+
+    assert_logs_equal(load_parquet(io.BytesIO(data)), example_log)
+    assert_logs_equal(load_match_file(io.BytesIO(data)), example_log)
+
+
+def test_parquet_stores_missing_values_as_nulls(example_log: PointLog):
+    table = pq.read_table(io.BytesIO(save_parquet(example_log)))
+
+    for name in OPTIONAL_COLUMNS:
+        assert table.column(name).null_count == int(np.count_nonzero(example_log.column(name) == 0)), name
+
+
+def test_parquet_without_metadata_or_columns_is_rejected(example_log: PointLog):
+    table = pq.read_table(io.BytesIO(save_parquet(example_log)))
+
+    buffer = io.BytesIO()
+    pq.write_table(table.replace_schema_metadata(None), buffer)
+    with pytest.raises(ValueError, match="metadata"):
+        load_parquet(io.BytesIO(buffer.getvalue()))
+
+    buffer = io.BytesIO()
+    pq.write_table(table.drop_columns(['winner']), buffer)
+    with pytest.raises(ValueError, match="winner"):
+        load_parquet(io.BytesIO(buffer.getvalue()))
+
+
+def test_csv_round_trip(example_log: PointLog):
+    data = example_log.to_csv()
+
+    assert_logs_equal(load_csv(io.BytesIO(data)), example_log)
+    assert_logs_equal(load_match_file(io.BytesIO(data)), example_log)
+
+
+@pytest.mark.parametrize('metadata', [
+    "{'player1_name': 'A'",
+    "__import__('os').getcwd()",
+    "['player1_name', 'player2_name']",
+    "{'player1_name': 'A', 'player2_name': 'B'}",
+])
+def test_malformed_metadata_is_rejected(example_log: PointLog, metadata: str):
+    with pytest.raises(ValueError):
+        parse_metadata(metadata)
+
+    match_data = example_log.to_df().copy()
+    match_data['metadata'] = metadata
+    with pytest.raises(ValueError):
+        load_csv(io.BytesIO(match_data.to_csv(index=False).encode('utf-8')))
+
+
+def test_metadata_is_parsed_as_literal(example_log: PointLog):
+    assert parse_metadata(repr(example_log.metadata)) == example_log.metadata
+
+
+@pytest.mark.parametrize('columns', [
+    [name for name in BACKEND_COLUMNS if name != 'winner'],
+    [*BACKEND_COLUMNS, 'final_shot_spin'],
+])
+def test_wrong_columns_are_rejected(example_log: PointLog, columns: list[str]):
+    with pytest.raises(ValueError):
+        validate_columns(columns)
+
+    match_data = example_log.to_df().reindex(columns=columns, fill_value=0)
+    with pytest.raises(ValueError):
+        load_csv(io.BytesIO(match_data.to_csv(index=False).encode('utf-8')))
+
+
+@pytest.mark.parametrize('file_format', ['csv', 'parquet', 'ttp'])
+def test_streaming_matches_whole_file_load(example_log: PointLog, file_format: str):
+    data = export_match(example_log, file_format)
+    expected_match, _ = replay_winners(example_log.column('winner'), example_log.metadata)
+
+    fractions = []
+    point_log, match = stream_match_file(io.BytesIO(data), chunk_points=50, progress=fractions.append)
+
+    assert_logs_equal(point_log, load_match_file(io.BytesIO(data)))
+    assert match.get_score() == expected_match.get_score()
+    assert (match.match_winner, match.player1_sets, match.player2_sets) == (expected_match.match_winner, expected_match.player1_sets, expected_match.player2_sets)
+    assert point_log.stats.overview_table().equals(example_log.stats.overview_table())
+    assert len(fractions) > len(example_log) // 50
+    assert fractions == sorted(fractions) and fractions[-1] == 1.0
+
+
+def test_streaming_ignores_partly_written_record(example_log: PointLog):
+    data = export_match(example_log, 'ttp')
+    point_log, _ = stream_match_file(io.BytesIO(data[:-1]), chunk_points=64)
+    assert len(point_log) == len(example_log) - 1
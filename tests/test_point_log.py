@@ -0,0 +1,179 @@
+from datetime import datetime, timezone
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.generator import DEFAULT_CONFIG, PlayerProfile, generate_match
+from src.journal import MatchJournal, read_journal
+from src.match_io import load_csv
+from src.point_log import OPTIONAL_COLUMNS, POINT_LOG_DTYPES, PointLog
+from src.stats import STAT_DIMENSIONS, STAT_TABLES, MatchStats
+from src.utils import BACKEND_DTYPES, BACKEND_SCHEMA, FinalShotType, Players, Serve
+
+
+POINT_DATETIME = datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
+
+
+def point_columns(num_points: int, **values) -> dict[str, np.ndarray]:
+    columns = {name: np.zeros(num_points, dtype=dtype) for name, dtype in POINT_LOG_DTYPES.items()}
+    columns['set_id'][:] = 1
+    columns['server'][:] = Players.PLAYER_1.value
+    columns['winner'][:] = Players.PLAYER_1.value
+    for name, value in values.items():
+        columns[name][-1] = value
+    return columns
+
+
+def test_dtypes_follow_backend_schema():
+    assert list(POINT_LOG_DTYPES) == [name for name in BACKEND_SCHEMA if name not in ('point_uuid', 'metadata')]
+    assert all(BACKEND_SCHEMA[name] == 'Int8' for name in OPTIONAL_COLUMNS)
+    assert list(BACKEND_DTYPES) == list(BACKEND_SCHEMA)
+
+
+@pytest.mark.parametrize('values', [dict(serve=7), dict(winner=3), dict(break_point=-1), dict(final_shot_type=len(FinalShotType) + 1)])
+def test_append_rejects_values_outside_enum_range(values: dict):
+    point_log = PointLog()
+    point_log.append(POINT_DATETIME, set_id=1, server=Players.PLAYER_1.value, winner=Players.PLAYER_1.value)
+
+    with pytest.raises(ValueError):
+        point_log.append(POINT_DATETIME, **{'set_id': 1, 'server': Players.PLAYER_1.value, 'winner': Players.PLAYER_2.value, **values})
+    assert len(point_log) == 1
+    assert point_log.stats.overview_table()[Players.PLAYER_1.value]['all_points'] == 1
+
+
+def test_extend_and_from_columns_reject_values_outside_enum_range():
+    columns = point_columns(3, serve=7)
+    with pytest.raises(ValueError):
+        PointLog.from_columns(columns)
+
+    point_log = PointLog()
+    with pytest.raises(ValueError):
+        point_log.extend(columns)
+    assert len(point_log) == 0
+
+    point_log.extend(point_columns(3, serve=Serve.DOUBLE_FAULT.value))
+    assert len(point_log) == 3
+
+
+def test_journal_failure_leaves_log_unchanged(tmp_path):
+    metadata = {'datetime': '2025-01-01 12:00:00'}
+    point_log = PointLog(metadata)
+    point_log.journal = MatchJournal(metadata, str(tmp_path))
+    point_log.extend(point_columns(3))
+
+    with pytest.raises(ValueError):
+        point_log.append(POINT_DATETIME, set_id=1, server=Players.PLAYER_1.value, winner=Players.PLAYER_1.value, point_id=70000)
+    with pytest.raises(ValueError):
+        point_log.extend(point_columns(2, point_id=70000))
+    assert len(point_log) == 3
+    assert point_log.stats.overview_table()[Players.PLAYER_1.value]['all_points'] == 3
+
+    point_log.append(POINT_DATETIME, set_id=1, server=Players.PLAYER_1.value, winner=Players.PLAYER_2.value, point_id=3)
+    point_log.journal.close()
+    recovered = read_journal(point_log.journal.path)
+    np.testing.assert_array_equal(recovered.column('winner'), point_log.column('winner'))
+    np.testing.assert_array_equal(recovered.column('point_id'), point_log.column('point_id'))
+
+
+def count_from_scratch(point_log: PointLog, table: str, set_id: int) -> np.ndarray:
+    # Counts the points of a set for a table directly from the stored columns, without MatchStats.
+    columns = STAT_TABLES[table]
+    counts = np.zeros(tuple(STAT_DIMENSIONS[column] for column in columns), dtype=np.int64)
+    in_set = point_log.column('set_id') == set_id
+    np.add.at(counts, tuple(point_log.column(column)[in_set].astype(np.intp) for column in columns), 1)
+    return counts
+
+
+def assert_stats_match_points(point_log: PointLog) -> None:
+    for table in STAT_TABLES:
+        for set_id in range(1, 6):
+            np.testing.assert_array_equal(point_log.stats.counts(table, [set_id]), count_from_scratch(point_log, table, set_id), err_msg=table)
+
+
+def test_incremental_stats_match_count_from_scratch():
+    generated = generate_match(PlayerProfile(), PlayerProfile(), config={'match_best_of': 5}, seed=2)
+    columns = {name: generated.column(name) for name in POINT_LOG_DTYPES}
+    point_log = PointLog(generated.metadata)
+
+    for row in range(40):
+        point_log.append(
+            pd.Timestamp(int(columns['point_datetime'][row]), tz='UTC'),
+            **{name: columns[name][row].item() for name in POINT_LOG_DTYPES if name != 'point_datetime'},
+        )
+    assert_stats_match_points(point_log)
+
+    point_log.truncate(25)
+    assert_stats_match_points(point_log)
+
+    point_log.extend({name: values[25:len(generated)] for name, values in columns.items()})
+    assert_stats_match_points(point_log)
+
+    for length in (len(generated) - 1, 100, 0):
+        point_log.truncate(length)
+        assert_stats_match_points(point_log)
+
+
+def test_vectorised_stats_match_per_point_counts():
+    generated = generate_match(PlayerProfile(), PlayerProfile(), config={'match_best_of': 5}, seed=3)
+    columns = {name: generated.column(name) for name in POINT_LOG_DTYPES}
+
+    per_point = MatchStats()
+    for row in range(len(generated)):
+        per_point.add({name: int(columns[name][row]) for name in ('set_id', *STAT_DIMENSIONS)})
+    vectorised = MatchStats.from_columns(columns)
+    from_df = MatchStats.from_df(generated.to_df())
+
+    for table in STAT_TABLES:
+        for sets in (None, [1], [2, 3]):
+            expected = per_point.counts(table, sets)
+            np.testing.assert_array_equal(vectorised.counts(table, sets), expected, err_msg=table)
+            np.testing.assert_array_equal(from_df.counts(table, sets), expected, err_msg=table)
+    pd.testing.assert_frame_equal(vectorised.overview_table(), per_point.overview_table())
+    assert_stats_match_points(generated)
+
+    vectorised.add_columns({name: values[50:] for name, values in columns.items()}, count=-1)
+    generated.truncate(50)
+    assert_stats_match_points(generated)
+    for table in STAT_TABLES:
+        for set_id in range(1, 6):
+            np.testing.assert_array_equal(vectorised.counts(table, [set_id]), count_from_scratch(generated, table, set_id), err_msg=table)
+
+
+def assert_csv_matches_full_export(point_log: PointLog) -> None:
+    columns = {name: point_log.column(name) for name in POINT_LOG_DTYPES}
+    assert point_log.to_csv() == PointLog.from_columns(columns, point_log.metadata).to_csv()
+
+    exported = pd.read_csv(io.BytesIO(point_log.to_csv()), dtype=str)
+    expected = pd.read_csv(io.BytesIO(point_log.to_df().to_csv(index=False).encode('utf-8')), dtype=str)
+    for frame in (exported, expected):
+        frame['point_datetime'] = pd.to_datetime(frame['point_datetime'], format='ISO8601')
+    pd.testing.assert_frame_equal(exported, expected)
+
+
+def test_incremental_csv_matches_full_export():
+    # Whole seconds, microseconds and nanoseconds, which pandas would write with different precisions.
+    point_seconds = np.array([0, 1, 2.5, 3.000001, 4.000000001, 5, 6, 7.25])
+    columns = point_columns(len(point_seconds))
+    columns['point_datetime'] = np.int64(1735732800 * 10**9) + np.round(point_seconds * 10**9).astype(np.int64)
+    columns['point_id'] = np.arange(len(point_seconds), dtype=columns['point_id'].dtype)
+    point_log = PointLog(DEFAULT_CONFIG)
+
+    for row in range(2):
+        point_log.append(pd.Timestamp(int(columns['point_datetime'][row]), tz='UTC'), **{
+            name: columns[name][row].item() for name in POINT_LOG_DTYPES if name != 'point_datetime'
+        })
+        assert_csv_matches_full_export(point_log)
+
+    point_log.extend({name: values[2:5] for name, values in columns.items()})
+    assert_csv_matches_full_export(point_log)
+    point_log.truncate(3)
+    assert_csv_matches_full_export(point_log)
+    point_log.extend({name: values[3:] for name, values in columns.items()})
+    assert_csv_matches_full_export(point_log)
+    point_log.truncate(0)
+    assert_csv_matches_full_export(point_log)
+
+    point_log.extend(columns)
+    np.testing.assert_array_equal(load_csv(io.BytesIO(point_log.to_csv())).column('point_datetime'), columns['point_datetime'])
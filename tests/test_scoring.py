@@ -0,0 +1,74 @@
+import pytest
+
+from src.tennis import Match, TiebreakGame, TiebreakSet
+from src.utils import Players
+
+
+PLAYER_1, PLAYER_2, NONE = Players.PLAYER_1.value, Players.PLAYER_2.value, Players.NONE.value
+
+
+def win_points(match: Match, winner: int, num_points: int) -> None:
+    for _ in range(num_points):
+        match.add_point(winner)
+
+
+def win_games(match: Match, winner: int, num_games: int) -> None:
+    # Regular games are won by winning four points in a row, whoever is serving.
+    for _ in range(num_games):
+        win_points(match, winner, 4)
+
+
+def reach_tiebreak(match: Match) -> None:
+    for _ in range(match.set_num_games):
+        win_games(match, PLAYER_1, 1)
+        win_games(match, PLAYER_2, 1)
+
+
+def test_tiebreak_game_point_is_player():
+    game = TiebreakGame(server=PLAYER_1, tiebreak_to=7)
+    for _ in range(6):
+        game.add_point(PLAYER_2)
+
+    assert game.game_point() == PLAYER_2
+    assert not isinstance(game.game_point(), bool)
+
+
+def test_tiebreak_set_point():
+    match = Match()
+    reach_tiebreak(match)
+    win_points(match, PLAYER_1, 6)
+
+    assert isinstance(match.set.game, TiebreakGame)
+    assert match.set_point() == PLAYER_1
+    assert match.match_point() == NONE
+
+
+def test_tiebreak_match_point():
+    match = Match()
+    win_games(match, PLAYER_2, 6)
+    reach_tiebreak(match)
+    win_points(match, PLAYER_2, 6)
+
+    assert match.set_point() == PLAYER_2
+    assert match.match_point() == PLAYER_2
+
+
+@pytest.mark.parametrize('winner', [PLAYER_1, PLAYER_2])
+def test_match_tiebreak_set_winner(winner: int):
+    match = Match(match_best_of=3, match_tiebreak=True, match_tiebreak_to=10)
+    win_games(match, PLAYER_1, 6)
+    win_games(match, PLAYER_2, 6)
+
+    assert isinstance(match.set, TiebreakSet)
+    win_points(match, winner, 9)
+    assert match.match_point() == winner
+    win_points(match, winner, 1)
+    assert match.match_winner == winner
+
+
+def test_best_of_one_match_tiebreak():
+    match = Match(match_best_of=1, set_num_games=6, match_tiebreak=True, match_tiebreak_to=7)
+    win_points(match, PLAYER_2, 7)
+
+    assert match.match_winner == PLAYER_2
+    assert match.set_number == 2
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from src.probability import match_win_probability
+from src.simulator import simulate_matches
+from src.tennis import Match
+from src.utils import Players
+
+
+NUM_MATCHES = 40_000
+
+
+def match_from_winners(winners: list[int], **config) -> Match:
+    match = Match(server=Players.PLAYER_1.value, **config)
+    for winner in winners:
+        match.add_point(winner)
+    return match
+
+
+@pytest.mark.parametrize('match, player1_serve, player2_serve', [
+    (match_from_winners([]), 0.65, 0.62),
+    (match_from_winners([], match_best_of=3, match_tiebreak=True), 0.55, 0.7),
+    (match_from_winners([Players.PLAYER_2.value] * 30 + [Players.PLAYER_1.value] * 7), 0.68, 0.6),
+])
+def test_simulated_win_rate_matches_exact_probability(match: Match, player1_serve: float, player2_serve: float):
+    results = simulate_matches(match, player1_serve, player2_serve, NUM_MATCHES, seed=5)
+    expected = match_win_probability(match, player1_serve, player2_serve)
+
+    # Within four standard errors of the exact probability.
+    win_rate = np.mean(results['winner'] == Players.PLAYER_1.value)
+    assert abs(win_rate - expected) < 4 * np.sqrt(expected * (1 - expected) / NUM_MATCHES)
+    assert np.all(results['winner'] != Players.NONE.value)
+
+
+@pytest.mark.parametrize('player1_serve, player2_serve', [(1.0, 1.0), (0.0, 0.0), (0.6, 1.0), (0.0, 0.6), (1 - 1e-9, 0.6), (0.6, -0.1)])
+def test_degenerate_serve_probabilities_are_rejected(player1_serve: float, player2_serve: float):
+    with pytest.raises(ValueError):
+        simulate_matches(match_from_winners([]), player1_serve, player2_serve, 10, seed=0)
@@ -0,0 +1,92 @@
+from contextlib import closing
+import sqlite3
+
+import numpy as np
+import pytest
+
+from src.generator import PlayerProfile, generate_match
+from src.point_log import OPTIONAL_COLUMNS, POINT_LOG_DTYPES, PointLog
+from src.store import MatchStore
+from src.utils import Players
+
+
+def stored_match(seed: int, **config) -> PointLog:
+    return generate_match(PlayerProfile(), PlayerProfile(), config=config, seed=seed)
+
+
+def assert_logs_equal(loaded: PointLog, expected: PointLog) -> None:
+    assert loaded.metadata == expected.metadata
+    for name in POINT_LOG_DTYPES:
+        np.testing.assert_array_equal(loaded.column(name), expected.column(name), err_msg=name)
+
+
+@pytest.fixture
+def store(tmp_path) -> MatchStore:
+    return MatchStore(str(tmp_path / 'library' / 'store.db'))
+
+
+def test_saved_match_round_trips_with_missing_optional_values(store: MatchStore):
+    point_log = stored_match(0)
+    assert any(np.any(point_log.column(name) == 0) for name in OPTIONAL_COLUMNS)
+    match_id = store.save_match(point_log)
+
+    assert_logs_equal(store.load_match(match_id), point_log)
+
+    # Missing optional values are stored as NULL rather than 0.
+    with closing(sqlite3.connect(store.path)) as connection:
+        for name in OPTIONAL_COLUMNS:
+            assert connection.execute(f'SELECT count(*) FROM points WHERE {name} = 0').fetchone()[0] == 0
+            num_null = connection.execute(f'SELECT count(*) FROM points WHERE {name} IS NULL').fetchone()[0]
+            assert num_null == int(np.sum(point_log.column(name) == 0))
+
+    points = store.player_points(point_log.metadata['player1_name'])
+    for name in OPTIONAL_COLUMNS:
+        assert points[name].isna().sum() == int(np.sum(point_log.column(name) == 0))
+
+
+def test_saving_same_match_replaces_it(store: MatchStore):
+    point_log = stored_match(1)
+    partial_log = PointLog.from_columns({name: point_log.column(name)[:20] for name in POINT_LOG_DTYPES}, point_log.metadata)
+
+    match_id = store.save_match(partial_log)
+    assert store.save_match(point_log) == match_id
+
+    matches = store.matches()
+    assert matches.index.tolist() == [match_id]
+    assert matches.at[match_id, 'num_points'] == len(point_log)
+    assert_logs_equal(store.load_match(match_id), point_log)
+
+    other_id = store.save_match(stored_match(2, datetime='2025-01-02 10:00:00'))
+    assert other_id != match_id
+    assert len(store.matches()) == 2
+
+
+def test_deleting_match_removes_its_points(store: MatchStore):
+    kept_id, deleted_id = store.save_matches([stored_match(3), stored_match(4, datetime='2025-01-02 10:00:00')])
+    store.delete_match(deleted_id)
+
+    assert store.matches().index.tolist() == [kept_id]
+    with closing(sqlite3.connect(store.path)) as connection:
+        assert connection.execute('SELECT count(*) FROM points WHERE match_id = ?', (deleted_id,)).fetchone()[0] == 0
+    with pytest.raises(ValueError):
+        store.load_match(deleted_id)
+
+
+def test_player_summary_matches_overview_counts(store: MatchStore):
+    point_logs = [
+        stored_match(5, player1_name='Alice', player2_name='Bob', datetime='2025-01-01 10:00:00'),
+        stored_match(6, player1_name='Carol', player2_name='Alice', datetime='2025-01-02 10:00:00'),
+    ]
+    match_ids = store.save_matches(point_logs)
+
+    summary = store.player_summary('Alice')
+    assert summary.index.tolist() == match_ids[::-1]
+    assert summary['opponent'].tolist() == ['Carol', 'Bob']
+
+    for match_id, point_log, player in zip(match_ids, point_logs, (Players.PLAYER_1.value, Players.PLAYER_2.value)):
+        overview = point_log.stats.overview_table()[player]
+        for stat in summary.columns.drop(['opponent', 'datetime', 'return_points_won']):
+            assert summary.at[match_id, stat] == overview[stat], stat
+
+        won_on_return = (point_log.column('server') != player) & (point_log.column('winner') == player)
+        assert summary.at[match_id, 'return_points_won'] == int(won_on_return.sum())
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from src.tennis import Match
+from src.utils import Players
+
+
+PLAYER_1, PLAYER_2 = Players.PLAYER_1.value, Players.PLAYER_2.value
+
+MATCH_CONFIGS: list[dict] = [
+    dict(match_best_of=3, set_num_games=6, set_tiebreak_to=7, match_tiebreak=False, match_tiebreak_to=10),
+    dict(match_best_of=3, set_num_games=6, set_tiebreak_to=7, match_tiebreak=True, match_tiebreak_to=10),
+    dict(match_best_of=5, set_num_games=6, set_tiebreak_to=7, match_tiebreak=False, match_tiebreak_to=10),
+    dict(match_best_of=1, set_num_games=4, set_tiebreak_to=5, match_tiebreak=True, match_tiebreak_to=7),
+    dict(match_best_of=3, set_num_games=4, set_tiebreak_to=5, match_tiebreak=False, match_tiebreak_to=10),
+]
+
+
+@pytest.mark.parametrize('config', MATCH_CONFIGS)
+@pytest.mark.parametrize('seed', range(5))
+def test_replay_matches_add_point(config: dict, seed: int):
+    rng = np.random.default_rng(seed)
+    winners = rng.integers(PLAYER_1, PLAYER_2 + 1, size=600)
+
+    expected = Match(server=PLAYER_2, **config)
+    expected_context = {name: [] for name in ('set_id', 'game_id', 'point_id', 'server', 'side', 'break_point', 'set_point', 'match_point')}
+    for winner in winners.tolist():
+        for name, value in (
+            ('set_id', expected.set_number),
+            ('game_id', expected.game_number),
+            ('point_id', expected.point_number),
+            ('server', expected.current_server),
+            ('side', expected.side),
+            ('break_point', expected.break_point()),
+            ('set_point', expected.set_point()),
+            ('match_point', expected.match_point()),
+        ):
+            expected_context[name].append(value)
+        expected.add_point(winner)
+
+    replayed = Match(server=PLAYER_2, **config)
+    context = replayed._replay(winners)
+
+    for name, values in expected_context.items():
+        np.testing.assert_array_equal(context[name], values, err_msg=name)
+    assert replayed.get_score() == expected.get_score()
+    assert replayed.match_winner == expected.match_winner
+    assert (replayed.player1_sets, replayed.player2_sets) == (expected.player1_sets, expected.player2_sets)
+    assert (replayed.set_number, replayed.game_number, replayed.point_number) == (expected.set_number, expected.game_number, expected.point_number)
+
+
+def test_replay_undo_matches_add_point():
+    winners = np.random.default_rng(7).integers(PLAYER_1, PLAYER_2 + 1, size=150)
+    expected = Match()
+    for winner in winners.tolist():
+        expected.add_point(winner)
+    replayed = Match()
+    replayed._replay(winners)
+
+    for _ in range(40):
+        expected.undo()
+        replayed.undo()
+        assert replayed.get_score() == expected.get_score()
+        assert replayed.point_number == expected.point_number
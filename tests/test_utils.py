@@ -0,0 +1,25 @@
+import pytest
+
+from src.point_log import PointLog
+from src.tennis import Match
+from src.utils import Players, Serve, add_point
+
+
+def session_state(**values) -> dict:
+    point_values = dict(
+        winner=Players.PLAYER_1.value, serve=Serve.FIRST_SERVE.value, serve_type=0, serve_target=0, net_approach=False,
+        first_net_approacher=0, net_approach_type=0, rally_length=0, final_shot=0, final_shot_hand=0, final_shot_type=0,
+    )
+    return {'match': Match(server=Players.PLAYER_1.value), 'match_data': PointLog(), **point_values, **values}
+
+
+@pytest.mark.parametrize('values', [dict(winner=None), dict(serve=7)])
+def test_rejected_point_is_not_added(values: dict):
+    # The Track page only adds a point to the score once add_point succeeds, so a rejected point must leave the match data unchanged.
+    state = session_state()
+    add_point(state)
+
+    state.update(values)
+    with pytest.raises(ValueError):
+        add_point(state)
+    assert len(state['match_data']) == 1